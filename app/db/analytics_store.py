@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app.db import parquet_handler, timeseries_store
+from app.db.parquet_handler import BoundingBox
+
+# pm25_analytics/trend.parquet: one row per grid cell with at least two years
+# pm25_analytics/change/year=YYYY.parquet: one row per cell with a value that year
+# Rows follow the grid order, so row-group statistics prune latitude ranges.
+ANALYTICS_DIR = os.path.join(parquet_handler.PROCESSED_DATA_DIR, "pm25_analytics")
+TREND_FILE = "trend.parquet"
+CHANGE_DIR = "change"
+METADATA_FILE = "analytics.json"
+
+# Anomalies are measured against the mean of the first years by default
+DEFAULT_BASELINE_YEARS = 5
+
+TREND_COLUMNS = ("latitude", "longitude", "slope", "n_years")
+CHANGE_COLUMNS = (
+    "year",
+    "latitude",
+    "longitude",
+    "pm25_level",
+    "yoy_delta",
+    "anomaly",
+)
+TREND_SCHEMA = pa.schema(
+    [
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("slope", pa.float64()),
+        ("n_years", pa.int32()),
+    ]
+)
+CHANGE_SCHEMA = pa.schema(
+    [
+        ("year", pa.int64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("pm25_level", pa.float32()),
+        ("yoy_delta", pa.float32()),
+        ("anomaly", pa.float32()),
+    ]
+)
+
+
+def trend_slopes(
+    series: np.ndarray, years: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares slope of PM2.5 against year for every row of a
+    [cell, year] array, skipping NaN, and the number of years it is fitted
+    on. Rows with fewer than two values have a NaN slope.
+    """
+    valid = ~np.isnan(series)
+    n_years = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        year_mean = np.where(valid, years, 0).sum(axis=1) / n_years
+        level_mean = np.where(valid, series, 0.0).sum(axis=1) / n_years
+        dx = np.where(valid, years - year_mean[:, np.newaxis], 0.0)
+        dy = np.where(valid, series - level_mean[:, np.newaxis], 0.0)
+        slopes = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    slopes[n_years < 2] = np.nan
+    return slopes, n_years
+
+
+def year_over_year(series: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """Change from the previous year, NaN for the first year and after gaps."""
+    deltas = np.full(series.shape, np.nan, dtype=np.float32)
+    deltas[:, 1:] = series[:, 1:] - series[:, :-1]
+    deltas[:, 1:][:, np.diff(years) != 1] = np.nan
+    return deltas
+
+
+def anomalies(series: np.ndarray, baseline: np.ndarray) -> np.ndarray:
+    """Difference from the mean of the baseline columns, ignoring NaN."""
+    values = series[:, baseline]
+    count = (~np.isnan(values)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(np.isnan(values), 0.0, values).sum(axis=1) / count
+    return (series - mean[:, np.newaxis]).astype(np.float32)
+
+
+def write_analytics(
+    timeseries_dir: str = timeseries_store.TIMESERIES_DIR,
+    analytics_dir: str = ANALYTICS_DIR,
+    baseline: Optional[tuple[int, int]] = None,
+) -> int:
+    """
+    Compute per-cell trend slopes, year-over-year deltas and anomalies
+    against the mean of the baseline years (default: the first
+    DEFAULT_BASELINE_YEARS) in one pass over the time-series store, a row
+    group of cells at a time. Results replace any previous ones once
+    complete. Returns the number of cells with a trend.
+    """
+    store = timeseries_store.TimeSeriesStore(timeseries_dir)
+    opened = store.open()
+    if opened is None:
+        raise FileNotFoundError(f"No time-series store found in {timeseries_dir}")
+    metadata, series = opened
+    lat0, dlat, lon0, dlon, n_lon = (
+        metadata[key] for key in ("lat0", "dlat", "lon0", "dlon", "n_lon")
+    )
+
+    years = np.asarray(metadata["years"])
+    if baseline is None:
+        baseline = (int(years[0]), int(years[: DEFAULT_BASELINE_YEARS][-1]))
+    baseline_columns = (years >= baseline[0]) & (years <= baseline[1])
+    if not baseline_columns.any():
+        raise ValueError(f"No years of the store fall in the baseline {baseline}")
+
+    staging_dir = Path(f"{analytics_dir}.staging")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    (staging_dir / CHANGE_DIR).mkdir(parents=True)
+
+    trend_writer = pq.ParquetWriter(staging_dir / TREND_FILE, TREND_SCHEMA)
+    change_writers = [
+        pq.ParquetWriter(
+            staging_dir / CHANGE_DIR / f"year={year}.parquet", CHANGE_SCHEMA
+        )
+        for year in years
+    ]
+    trend_count = 0
+    try:
+        block_size = parquet_handler.ROW_GROUP_SIZE
+        for start in range(0, series.shape[0], block_size):
+            block = np.asarray(series[start : start + block_size], dtype=np.float64)
+            cells = np.arange(start, start + block.shape[0])
+            latitudes = lat0 + (cells // n_lon) * dlat
+            longitudes = lon0 + (cells % n_lon) * dlon
+
+            slopes, n_years = trend_slopes(block, years)
+            deltas = year_over_year(block, years)
+            anomaly = anomalies(block, baseline_columns)
+
+            has_trend = ~np.isnan(slopes)
+            if has_trend.any():
+                trend_writer.write_table(
+                    pa.table(
+                        {
+                            "latitude": latitudes[has_trend],
+                            "longitude": longitudes[has_trend],
+                            "slope": slopes[has_trend],
+                            "n_years": n_years[has_trend].astype(np.int32),
+                        },
+                        schema=TREND_SCHEMA,
+                    )
+                )
+                trend_count += int(has_trend.sum())
+
+            for index, (year, writer) in enumerate(zip(years, change_writers)):
+                has_value = ~np.isnan(block[:, index])
+                if not has_value.any():
+                    continue
+                writer.write_table(
+                    pa.table(
+                        {
+                            "year": np.full(has_value.sum(), year, dtype=np.int64),
+                            "latitude": latitudes[has_value],
+                            "longitude": longitudes[has_value],
+                            "pm25_level": block[has_value, index].astype(np.float32),
+                            "yoy_delta": deltas[has_value, index],
+                            "anomaly": anomaly[has_value, index],
+                        },
+                        schema=CHANGE_SCHEMA,
+                    )
+                )
+    finally:
+        trend_writer.close()
+        for writer in change_writers:
+            writer.close()
+
+    with open(staging_dir / METADATA_FILE, "w") as f:
+        json.dump({"years": years.tolist(), "baseline": list(baseline)}, f)
+
+    old_dir = Path(f"{analytics_dir}.old")
+    if os.path.exists(analytics_dir):
+        os.replace(analytics_dir, old_dir)
+    os.replace(staging_dir, analytics_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return trend_count
+
+
+def _bbox_filter(bbox: BoundingBox) -> ds.Expression:
+    lat_min, lat_max, long_min, long_max = bbox
+    return (
+        (ds.field("latitude") >= lat_min)
+        & (ds.field("latitude") <= lat_max)
+        & (ds.field("longitude") >= long_min)
+        & (ds.field("longitude") <= long_max)
+    )
+
+
+def _to_rows(table: pa.Table) -> list[tuple]:
+    return list(zip(*(column.to_pylist() for column in table.columns)))
+
+
+class AnalyticsStore:
+    """Reads the precomputed trend and change results in analytics_dir."""
+
+    def __init__(self, analytics_dir: str = ANALYTICS_DIR):
+        self.analytics_dir = analytics_dir
+
+    def get_metadata(self) -> Optional[dict]:
+        try:
+            with open(Path(self.analytics_dir) / METADATA_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def get_trend_rows(
+        self, bbox: BoundingBox, min_years: int = 2
+    ) -> Optional[list[tuple]]:
+        """TREND_COLUMNS rows within bbox, or None without results."""
+        trend_file = Path(self.analytics_dir) / TREND_FILE
+        if not trend_file.exists():
+            return None
+        expression = _bbox_filter(bbox) & (ds.field("n_years") >= min_years)
+        table = ds.dataset(trend_file, format="parquet").to_table(
+            columns=list(TREND_COLUMNS), filter=expression
+        )
+        return _to_rows(table)
+
+    def get_change_rows(self, year: int, bbox: BoundingBox) -> Optional[list[tuple]]:
+        """CHANGE_COLUMNS rows of a year within bbox, or None without results."""
+        change_file = Path(self.analytics_dir) / CHANGE_DIR / f"year={year}.parquet"
+        if not change_file.exists():
+            return None
+        table = ds.dataset(change_file, format="parquet").to_table(
+            columns=list(CHANGE_COLUMNS), filter=_bbox_filter(bbox)
+        )
+        return _to_rows(table)
@@ -0,0 +1,465 @@
+import io
+import logging
+import os
+import re
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import (
+    Column,
+    Connection,
+    Float,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    update,
+)
+
+from app.db.database_manager import DatabaseManager
+from app.db.dataset_version import DatasetVersion
+from app.db.models.air_quality import AirQualityData
+from app.db.models.ingestion_manifest import IngestionManifest
+from app.repositories.air_quality_summary_repository import (
+    rebuild_air_quality_summary,
+)
+from app.repositories.ingestion_manifest_repository import IngestionManifestRepository
+from app.utils.arg_utils import get_bulk_loader_args
+from app.utils.spatial_utils import compute_grid_cell
+
+logger = logging.getLogger(__name__)
+
+# Columns read from the processed Parquet files
+PARQUET_COLUMNS = ["year", "latitude", "longitude", "pm25_level"]
+
+# Columns loaded into air_quality_data and their PostgreSQL binary types
+COPY_COLUMNS = {
+    "year": ">i4",
+    "latitude": ">f8",
+    "longitude": ">f8",
+    "pm25_level": ">f8",
+    "grid_cell": ">i4",
+}
+
+DEFAULT_BATCH_SIZE = 500_000
+COPY_BUFFER_SIZE = 1 << 20
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+
+
+def batch_to_columns(batch: pa.RecordBatch) -> dict[str, np.ndarray]:
+    # Nulls come back as NaN for float columns and as masked entries of the
+    # grid_cell masked array, which the encoders write as NULL
+    columns = {
+        name: batch.column(name).to_numpy(zero_copy_only=False)
+        for name in PARQUET_COLUMNS
+    }
+    columns["grid_cell"] = compute_grid_cell(columns["latitude"], columns["longitude"])
+    return columns
+
+
+def _null_mask(values: np.ndarray) -> Optional[np.ndarray]:
+    if isinstance(values, np.ma.MaskedArray):
+        return np.ma.getmaskarray(values)
+    if values.dtype.kind == "f":
+        return np.isnan(values)
+    return None
+
+
+def _columns_to_frame(columns: dict[str, np.ndarray]) -> pd.DataFrame:
+    # Masked integers become a nullable integer column rather than floats
+    return pd.DataFrame(
+        {
+            name: pd.arrays.IntegerArray(values.data, np.ma.getmaskarray(values))
+            if isinstance(values, np.ma.MaskedArray)
+            else values
+            for name, values in columns.items()
+        }
+    )
+
+
+def batch_to_records(batch: pa.RecordBatch) -> list[dict]:
+    # Parameter sets for executemany, with NULL for NaN and masked entries
+    df = _columns_to_frame(batch_to_columns(batch)).astype(object)
+    return df.where(df.notna(), None).to_dict(orient="records")
+
+
+def encode_binary_rows(columns: dict[str, np.ndarray]) -> bytes:
+    """
+    Encode rows in PostgreSQL's binary COPY format without a Python loop per row.
+    Rows are grouped by which columns are NULL, since COPY does not care about
+    row order and each group then has a fixed-width record layout.
+    """
+    row_count = len(next(iter(columns.values())))
+    null_masks = {
+        name: mask
+        for name, values in columns.items()
+        if (mask := _null_mask(values)) is not None
+    }
+    null_pattern = np.zeros(row_count, dtype=np.int64)
+    for bit, mask in enumerate(null_masks.values()):
+        null_pattern |= mask.astype(np.int64) << bit
+
+    chunks = []
+    for pattern in np.unique(null_pattern):
+        selected = null_pattern == pattern
+        null_columns = {
+            name
+            for bit, name in enumerate(null_masks)
+            if pattern & (1 << bit)
+        }
+
+        fields = [("field_count", ">i2")]
+        for name, pg_dtype in COPY_COLUMNS.items():
+            fields.append((f"{name}_length", ">i4"))
+            if name not in null_columns:
+                fields.append((name, pg_dtype))
+
+        rows = np.empty(int(selected.sum()), dtype=fields)
+        rows["field_count"] = len(COPY_COLUMNS)
+        for name, pg_dtype in COPY_COLUMNS.items():
+            if name in null_columns:
+                rows[f"{name}_length"] = -1
+            else:
+                rows[f"{name}_length"] = np.dtype(pg_dtype).itemsize
+                rows[name] = np.ma.getdata(columns[name])[selected]
+        chunks.append(rows.tobytes())
+
+    return b"".join(chunks)
+
+
+def encode_csv_rows(columns: dict[str, np.ndarray]) -> bytes:
+    # NaN and masked entries are written as empty fields, which
+    # COPY ... (FORMAT csv) reads as NULL
+    buffer = io.StringIO()
+    _columns_to_frame(columns).to_csv(buffer, header=False, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _staging_table() -> Table:
+    return Table(
+        f"{AirQualityData.__tablename__}_staging",
+        MetaData(),
+        Column("year", Integer, nullable=False),
+        Column("latitude", Float),
+        Column("longitude", Float),
+        Column("pm25_level", Float),
+        Column("grid_cell", Integer),
+        prefixes=["TEMPORARY"],
+    )
+
+
+class _ChunkReader(io.RawIOBase):
+    """File-like view over an iterator of byte chunks, as consumed by copy_expert."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._current = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._current[self._offset :] + b"".join(self._chunks)
+            self._current, self._offset = b"", 0
+            return data
+
+        while self._offset >= len(self._current):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b""
+            self._current, self._offset = chunk, 0
+
+        data = self._current[self._offset : self._offset + size]
+        self._offset += len(data)
+        return data
+
+
+def find_year_files(
+    processed_data_dir: Path, start_year: int, end_year: int
+) -> list[tuple[int, Path]]:
+    year_files = []
+    for file_name in sorted(os.listdir(processed_data_dir)):
+        if not file_name.endswith(".parquet"):
+            continue
+
+        # Extract the year from the file name
+        match = re.search(r"\d{4}", file_name)
+        if not match:
+            logger.warning(f"No year found in {file_name}. Skipping file.")
+            continue
+
+        file_year = int(match.group(0))
+        if start_year <= file_year <= end_year:
+            year_files.append((file_year, Path(processed_data_dir) / file_name))
+        else:
+            logger.info(f"Skipping {file_name} as it is outside the year range.")
+    return year_files
+
+
+class BulkLoader:
+    """
+    Streams processed Parquet row groups into air_quality_data with COPY.
+    Databases other than PostgreSQL fall back to batched multi-row inserts.
+    With a dataset_version, every committed load bumps it, so the API's
+    workers drop cached responses and ETags.
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        copy_format: str = "binary",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dataset_version: Optional[DatasetVersion] = None,
+    ):
+        if copy_format not in ("binary", "csv"):
+            raise ValueError(f"Unsupported COPY format: {copy_format}")
+        self.db_manager = db_manager
+        self.copy_format = copy_format
+        self.batch_size = batch_size
+        self.dataset_version = dataset_version
+
+    def _bump_dataset_version(self) -> None:
+        if self.dataset_version is not None:
+            self.dataset_version.bump()
+
+    def load_file(self, file_path: Path) -> int:
+        parquet_file = pq.ParquetFile(file_path)
+        logger.info(
+            f"Loading {Path(file_path).name} ({parquet_file.metadata.num_rows} records, "
+            f"{parquet_file.num_row_groups} row groups) into PostgreSQL..."
+        )
+
+        batches = parquet_file.iter_batches(
+            batch_size=self.batch_size, columns=PARQUET_COLUMNS
+        )
+        with self.db_manager.engine.begin() as conn:
+            row_count = self.copy_batches(conn, batches)
+        self._bump_dataset_version()
+
+        logger.info(f"Loaded {row_count} records from {Path(file_path).name}.")
+        return row_count
+
+    def load_directory(
+        self,
+        processed_data_dir: Path,
+        start_year: int = 1998,
+        end_year: int = 2022,
+        drop_indexes: bool = False,
+    ) -> int:
+        year_files = find_year_files(processed_data_dir, start_year, end_year)
+
+        if not drop_indexes:
+            row_count = sum(self.load_file(file_path) for _, file_path in year_files)
+        else:
+            with self.indexes_dropped():
+                row_count = sum(
+                    self.load_file(file_path) for _, file_path in year_files
+                )
+
+        self.rebuild_summary(sorted({year for year, _ in year_files}))
+        return row_count
+
+    def rebuild_summary(self, years: Optional[list[int]] = None) -> None:
+        """Recompute air_quality_summary for the given years (default: all)."""
+        with self.db_manager.engine.begin() as conn:
+            rebuild_air_quality_summary(conn, years)
+        self._bump_dataset_version()
+        logger.info(f"Rebuilt air_quality_summary for {years or 'all years'}.")
+
+    def replace_year(self, year: int, file_path: Path, source_checksum: str) -> int:
+        """
+        Atomically replace one year's rows with the contents of its Parquet file.
+        Rows are copied into a temporary staging table first, so the lock on
+        air_quality_data is only held for the short delete and insert-select.
+        """
+        parquet_file = pq.ParquetFile(file_path)
+        batches = parquet_file.iter_batches(
+            batch_size=self.batch_size, columns=PARQUET_COLUMNS
+        )
+        staging = _staging_table()
+        table = AirQualityData.__table__
+        columns = list(COPY_COLUMNS)
+
+        with self.db_manager.engine.begin() as conn:
+            staging.create(conn)
+            row_count = self.copy_batches(conn, batches, staging)
+
+            conn.execute(delete(table).where(table.c.year == year))
+            conn.execute(
+                insert(table).from_select(
+                    columns, select(*(staging.c[name] for name in columns))
+                )
+            )
+            rebuild_air_quality_summary(conn, [year])
+            conn.execute(
+                update(IngestionManifest)
+                .where(IngestionManifest.year == year)
+                .values(
+                    db_status="completed",
+                    db_checksum=source_checksum,
+                    row_count=row_count,
+                    updated_at=func.now(),
+                )
+            )
+            staging.drop(conn)
+        self._bump_dataset_version()
+
+        logger.info(f"Replaced year {year} with {row_count} records.")
+        return row_count
+
+    def load_changed_years(self, start_year: int = 1998, end_year: int = 2022) -> int:
+        # Only years the ingestion manifest marks as changed since their last load
+        with self.db_manager.get_db() as db:
+            entries = IngestionManifestRepository(db).get_pending_db_loads(
+                start_year, end_year
+            )
+            pending = [
+                (entry.year, entry.parquet_file, entry.source_checksum)
+                for entry in entries
+            ]
+
+        if not pending:
+            logger.info("All years in the database are up to date.")
+            return 0
+
+        logger.info(f"Reloading years {[year for year, _, _ in pending]}.")
+        return sum(
+            self.replace_year(year, Path(file_path), checksum)
+            for year, file_path, checksum in pending
+        )
+
+    def copy_batches(
+        self,
+        conn: Connection,
+        batches: Iterable[pa.RecordBatch],
+        table: Table = AirQualityData.__table__,
+    ) -> int:
+        if conn.dialect.name != "postgresql":
+            return self._insert_batches(conn, batches, table)
+
+        row_count = 0
+
+        def chunks() -> Iterator[bytes]:
+            nonlocal row_count
+            if self.copy_format == "binary":
+                yield PGCOPY_HEADER
+            for batch in batches:
+                columns = batch_to_columns(batch)
+                row_count += batch.num_rows
+                if self.copy_format == "binary":
+                    yield encode_binary_rows(columns)
+                else:
+                    yield encode_csv_rows(columns)
+            if self.copy_format == "binary":
+                yield PGCOPY_TRAILER
+
+        sql = (
+            f"COPY {table.name} ({', '.join(COPY_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT {self.copy_format})"
+        )
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(sql, _ChunkReader(chunks()), size=COPY_BUFFER_SIZE)
+        finally:
+            cursor.close()
+        return row_count
+
+    def _insert_batches(
+        self, conn: Connection, batches: Iterable[pa.RecordBatch], table: Table
+    ) -> int:
+        row_count = 0
+        for batch in batches:
+            records = batch_to_records(batch)
+            conn.execute(insert(table), records)
+            row_count += len(records)
+        return row_count
+
+    def insert_batch_returning_ids(
+        self, conn: Connection, batch: pa.RecordBatch
+    ) -> list[int]:
+        """
+        Insert one batch with multi-row INSERT ... RETURNING instead of COPY,
+        for callers that need the new ids, in the order of the batch's rows.
+        """
+        table = AirQualityData.__table__
+        result = conn.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            batch_to_records(batch),
+        )
+        return list(result.scalars())
+
+    @contextmanager
+    def indexes_dropped(self):
+        # Maintaining B-trees row by row is slower than building them once at the end
+        table = AirQualityData.__table__
+        with self.db_manager.engine.begin() as conn:
+            for index in table.indexes:
+                index.drop(conn, checkfirst=True)
+        logger.info(f"Dropped indexes on {table.name}.")
+
+        try:
+            yield
+        finally:
+            with self.db_manager.engine.begin() as conn:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+                if conn.dialect.name == "postgresql":
+                    conn.execute(text(f"ANALYZE {table.name}"))
+            logger.info(f"Rebuilt indexes on {table.name}.")
+
+
+def main():
+    args = get_bulk_loader_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    db_manager = DatabaseManager(database_url=args.database_url)
+    if args.recreate_tables:
+        db_manager.recreate_tables()
+    else:
+        db_manager.create_tables()
+
+    loader = BulkLoader(
+        db_manager,
+        copy_format=args.copy_format,
+        batch_size=args.batch_size,
+        dataset_version=DatasetVersion(args.dataset_version_file),
+    )
+    if args.rebuild_summary:
+        loader.rebuild_summary()
+        return
+
+    if args.incremental:
+        row_count = loader.load_changed_years(
+            start_year=args.start_year, end_year=args.end_year
+        )
+    else:
+        row_count = loader.load_directory(
+            Path(args.processed_data_dir),
+            start_year=args.start_year,
+            end_year=args.end_year,
+            drop_indexes=args.drop_indexes,
+        )
+    logger.info(
+        f"All Parquet files have been loaded into PostgreSQL ({row_count} records)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,129 @@
 import logging
-from contextlib import contextmanager
-from sqlalchemy import create_engine
+import math
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+from app.db.pool_metrics import (
+    MeteredAsyncAdaptedQueuePool,
+    MeteredQueuePool,
+    get_pool_status,
+)
+
+if TYPE_CHECKING:
+    from app.schemas.settings import Settings
+
 Base = declarative_base()
 
+# Async driver used in place of each sync dialect's default driver
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Swap the driver of a sync database URL for its asyncio counterpart."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} URLs")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+def _is_in_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def _add_sqlite_ln(dbapi_connection, connection_record) -> None:
+    # SQLite builds without math functions lack ln(), which the PM2.5
+    # histogram rebuild uses to estimate buckets (see bucket_expression)
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT ln(1)")
+    except Exception:
+        dbapi_connection.create_function("ln", 1, math.log, deterministic=True)
+    finally:
+        cursor.close()
+
 
 class DatabaseManager:
-    def __init__(self, database_url: str):
+    """
+    Owns the sync engine used by the bulk loader and the sync request path
+    and, when created with async_mode, an asyncio engine over the same
+    database for the async request path. Both engines get their own pool
+    with the same settings, metered by app.db.pool_metrics.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        async_mode: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        pool_timeout: float = 30.0,
+    ):
         self.database_url = database_url
-        self.engine = create_engine(database_url)
+        self.pool_size = pool_size
+        pool_options = dict(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            pool_timeout=pool_timeout,
+        )
+        # In-memory SQLite keeps its default single-connection pool
+        pooled = not _is_in_memory_sqlite(make_url(database_url))
+
+        self.engine = create_engine(
+            database_url,
+            **(dict(poolclass=MeteredQueuePool, **pool_options) if pooled else {}),
+        )
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _add_sqlite_ln)
         self.SessionLocal = sessionmaker(
             autocommit=False, autoflush=False, bind=self.engine
         )
 
+        self.async_engine = None
+        self.AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+        if async_mode:
+            self.async_engine = create_async_engine(
+                get_async_database_url(database_url),
+                **(
+                    dict(poolclass=MeteredAsyncAdaptedQueuePool, **pool_options)
+                    if pooled
+                    else {}
+                ),
+            )
+            if self.async_engine.dialect.name == "sqlite":
+                event.listen(self.async_engine.sync_engine, "connect", _add_sqlite_ln)
+            # Attributes are not lazy-loaded after commit in async sessions
+            self.AsyncSessionLocal = async_sessionmaker(
+                self.async_engine, autoflush=False, expire_on_commit=False
+            )
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "DatabaseManager":
+        return cls(
+            database_url=settings.db_url,
+            async_mode=settings.db_mode == "async",
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_timeout=settings.db_pool_timeout,
+        )
+
     @contextmanager
     def get_db(self):
         db = self.SessionLocal()
@@ -23,6 +132,45 @@ class DatabaseManager:
         finally:
             db.close()
 
+    @asynccontextmanager
+    async def get_async_db(self) -> AsyncIterator[AsyncSession]:
+        if self.AsyncSessionLocal is None:
+            raise RuntimeError("DatabaseManager was not created with async_mode.")
+        async with self.AsyncSessionLocal() as db:
+            yield db
+
+    async def dispose_async(self) -> None:
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+
+    def prewarm_pool(self, connections: Optional[int] = None) -> int:
+        """
+        Open connections (default: the pool size) up front and return them to
+        the pool, so the first requests do not pay for connection setup.
+        """
+        connections = self.pool_size if connections is None else connections
+        with ExitStack() as stack:
+            for _ in range(connections):
+                stack.enter_context(self.engine.connect())
+        return connections
+
+    async def prewarm_async_pool(self, connections: Optional[int] = None) -> int:
+        if self.async_engine is None:
+            raise RuntimeError("DatabaseManager was not created with async_mode.")
+        connections = self.pool_size if connections is None else connections
+        async with AsyncExitStack() as stack:
+            for _ in range(connections):
+                await stack.enter_async_context(self.async_engine.connect())
+        return connections
+
+    def get_pool_status(self) -> dict:
+        return {
+            "sync": get_pool_status(self.engine),
+            "async": get_pool_status(
+                self.async_engine.sync_engine if self.async_engine else None
+            ),
+        }
+
     def create_tables(self):
         Base.metadata.create_all(bind=self.engine)
         logging.info("All tables created successfully.")
@@ -0,0 +1,42 @@
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Union
+
+from app.db import parquet_handler
+
+# Replaced by every writer of the data the API serves: API writes, the bulk
+# loader and the ingestion pipeline. Worker processes sharing the file see
+# each other's writes as soon as it changes.
+DATASET_VERSION_FILE = os.path.join(
+    parquet_handler.PROCESSED_DATA_DIR, "dataset_version"
+)
+
+
+class DatasetVersion:
+    """
+    A version of the served dataset shared by every process on the host,
+    kept as a file that each write replaces. Reading it is a single stat.
+    """
+
+    def __init__(self, path: Union[str, Path] = DATASET_VERSION_FILE):
+        self.path = Path(path)
+
+    def current(self) -> str:
+        """An opaque token that changes whenever the version is bumped."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return "0"
+        # A replaced file has a new inode even if the clock did not move
+        identity = f"{stat.st_ino}:{stat.st_mtime_ns}".encode()
+        return hashlib.blake2b(identity, digest_size=8).hexdigest()
+
+    def bump(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".version-")
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{time.time_ns()}\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,329 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.db import parquet_handler
+from app.errors.grid_unavailable_error import GridUnavailableError
+
+if TYPE_CHECKING:
+    # grid_pyramid imports this module for scan_grid_axes
+    from app.db.grid_pyramid import GridPyramid, YearPyramid
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+@dataclass
+class YearGrid:
+    """
+    One year of the regular SEDAC lat/lon grid held as a dense array, so a
+    coordinate maps to its cell by arithmetic instead of a search.
+    Cells without a PM2.5 value (oceans) are NaN.
+    """
+
+    year: int
+    lat0: float
+    dlat: float
+    lon0: float
+    dlon: float
+    values: np.ndarray  # float32, shape (n_lat, n_lon)
+
+    @property
+    def n_lat(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def n_lon(self) -> int:
+        return self.values.shape[1]
+
+    @property
+    def wraps_longitude(self) -> bool:
+        return math.isclose(self.n_lon * self.dlon, 360.0, rel_tol=1e-6)
+
+    def cell_of(self, latitude: float, longitude: float) -> tuple[int, int]:
+        row = int(round((latitude - self.lat0) / self.dlat))
+        column = int(round((longitude - self.lon0) / self.dlon))
+        if self.wraps_longitude:
+            column %= self.n_lon
+        return (
+            min(max(row, 0), self.n_lat - 1),
+            min(max(column, 0), self.n_lon - 1),
+        )
+
+    def _window(self, row: int, column: int, radius: int):
+        rows = np.arange(max(row - radius, 0), min(row + radius, self.n_lat - 1) + 1)
+        if self.wraps_longitude and 2 * radius + 1 >= self.n_lon:
+            columns = np.arange(self.n_lon)
+        elif self.wraps_longitude:
+            columns = np.arange(column - radius, column + radius + 1) % self.n_lon
+        else:
+            columns = np.arange(
+                max(column - radius, 0), min(column + radius, self.n_lon - 1) + 1
+            )
+        return rows, columns
+
+    def _covers_grid(self, row: int, column: int, radius: int) -> bool:
+        covers_rows = row - radius <= 0 and row + radius >= self.n_lat - 1
+        if self.wraps_longitude:
+            return covers_rows and 2 * radius + 1 >= self.n_lon
+        covers_columns = column - radius <= 0 and column + radius >= self.n_lon - 1
+        return covers_rows and covers_columns
+
+    def _distance_outside(self, row: int, radius: int) -> float:
+        # Lower bound on the distance to any cell outside the window: it is
+        # either more than radius rows away, or within the window's latitudes
+        # and more than radius columns away (hav(d) >= cos^2(phi_max) hav(dlon))
+        offset = radius + 0.5
+        lat_bound = math.radians(offset * self.dlat)
+        lat_edge = min(
+            90.0,
+            max(
+                abs(self.lat0 + (row - offset) * self.dlat),
+                abs(self.lat0 + (row + offset) * self.dlat),
+            ),
+        )
+        dlon = math.radians(min(offset * self.dlon, 180.0))
+        lon_bound = 2 * math.asin(
+            min(1.0, math.cos(math.radians(lat_edge)) * math.sin(dlon / 2))
+        )
+        return EARTH_RADIUS_KM * min(lat_bound, lon_bound)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> list[dict]:
+        """
+        Return the k cells with a PM2.5 value closest to the coordinate,
+        nearest first, searching square windows of doubling radius around
+        the coordinate's own cell.
+        """
+        row, column = self.cell_of(latitude, longitude)
+        radius = 0
+        while True:
+            rows, columns = self._window(row, column, radius)
+            window = self.values[np.ix_(rows, columns)]
+            cell_rows, cell_columns = np.nonzero(~np.isnan(window))
+            cell_values = window[cell_rows, cell_columns]
+            if cell_rows.size >= k or self._covers_grid(row, column, radius):
+                cell_latitudes = self.lat0 + rows[cell_rows] * self.dlat
+                cell_longitudes = self.lon0 + columns[cell_columns] * self.dlon
+                distances = haversine_km(
+                    latitude, longitude, cell_latitudes, cell_longitudes
+                )
+                order = np.argsort(distances, kind="stable")[:k]
+                done = self._covers_grid(row, column, radius) or (
+                    order.size == k
+                    and distances[order[-1]]
+                    <= self._distance_outside(row, radius)
+                )
+                if done:
+                    return [
+                        {
+                            "year": self.year,
+                            "latitude": float(cell_latitudes[i]),
+                            "longitude": float(cell_longitudes[i]),
+                            "pm25_level": float(cell_values[i]),
+                            "distance_km": float(distances[i]),
+                        }
+                        for i in order
+                    ]
+            radius = max(1, radius * 2)
+
+
+def haversine_km(
+    latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def grid_axis(coordinates: np.ndarray) -> tuple[float, float, int]:
+    axis = np.unique(coordinates)
+    if axis.size == 1:
+        return float(axis[0]), 1.0, 1
+    step = float(np.median(np.diff(axis)))
+    size = int(round((axis[-1] - axis[0]) / step)) + 1
+    return float(axis[0]), step, size
+
+
+def scan_grid_axes(
+    file_paths: Iterable[Union[str, Path]],
+) -> Optional[tuple[tuple[float, float, int], tuple[float, float, int]]]:
+    """
+    The latitude and longitude axes of the regular grid covering processed
+    Parquet files, from the distinct coordinates of each batch, so the
+    coordinate columns are never loaded whole. None when there are no rows.
+    """
+    return _scan_batch_axes(
+        batch
+        for file_path in file_paths
+        for batch in pq.ParquetFile(file_path).iter_batches(
+            batch_size=parquet_handler.ROW_GROUP_SIZE * 4,
+            columns=["latitude", "longitude"],
+        )
+    )
+
+
+def _scan_batch_axes(
+    batches: Iterable[pa.RecordBatch],
+) -> Optional[tuple[tuple[float, float, int], tuple[float, float, int]]]:
+    latitudes = longitudes = np.empty(0)
+    for batch in batches:
+        latitudes = np.union1d(latitudes, batch.column("latitude").to_numpy())
+        longitudes = np.union1d(longitudes, batch.column("longitude").to_numpy())
+    if not latitudes.size:
+        return None
+    return grid_axis(latitudes), grid_axis(longitudes)
+
+
+def build_year_grid(
+    year: int, dataset_dir: str = parquet_handler.DATASET_DIR
+) -> Optional[YearGrid]:
+    """
+    The year's grid from the partitioned dataset, read in batches: one pass
+    over the coordinates for the axes, then one filling the dense array, so
+    only the array, not the year's rows, is ever held whole.
+    """
+    axes = _scan_batch_axes(
+        parquet_handler.iter_dataset_batches(
+            year=year, columns=["latitude", "longitude"], dataset_dir=dataset_dir
+        )
+    )
+    if axes is None:
+        return None
+    (lat0, dlat, n_lat), (lon0, dlon, n_lon) = axes
+
+    values = np.full((n_lat, n_lon), np.nan, dtype=np.float32)
+    for batch in parquet_handler.iter_dataset_batches(
+        year=year,
+        columns=["latitude", "longitude", "pm25_level"],
+        dataset_dir=dataset_dir,
+    ):
+        latitudes = batch.column("latitude").to_numpy()
+        longitudes = batch.column("longitude").to_numpy()
+        rows = np.rint((latitudes - lat0) / dlat).astype(np.int64)
+        columns = np.rint((longitudes - lon0) / dlon).astype(np.int64)
+        values[rows, columns] = batch.column("pm25_level").to_numpy(
+            zero_copy_only=False
+        )
+    return YearGrid(year, lat0, dlat, lon0, dlon, values)
+
+
+def pyramid_year_grid(pyramid: "YearPyramid") -> YearGrid:
+    """
+    The year's native pyramid level as a YearGrid. Its values are the
+    pyramid's read-only memory map, so no copy of the grid is made and a
+    lookup only pages in the cells around the coordinate.
+    """
+    grid = pyramid.derived.get("year_grid")
+    if grid is None:
+        grid = YearGrid(
+            pyramid.year,
+            pyramid.lat0,
+            pyramid.dlat,
+            pyramid.lon0,
+            pyramid.dlon,
+            pyramid.native_values(),
+        )
+        pyramid.derived["year_grid"] = grid
+    return grid
+
+
+class GridIndex:
+    """
+    Per-year grids for nearest-neighbour lookups. Years in grid_pyramid are
+    read from its memory-mapped native level; other years are built from the
+    partitioned Parquet dataset on first use, keeping the most recently used
+    max_years of them in memory until their partition is rewritten. At most
+    max_years are built at once, so no more than twice that many dense grids
+    are ever held. With max_years=0 only years with a pyramid are served, and
+    others raise GridUnavailableError.
+    """
+
+    def __init__(
+        self,
+        dataset_dir: str = parquet_handler.DATASET_DIR,
+        max_years: int = 2,
+        grid_pyramid: Optional["GridPyramid"] = None,
+    ):
+        self.dataset_dir = dataset_dir
+        self.max_years = max_years
+        self.grid_pyramid = grid_pyramid
+        # year -> (partition version, grid)
+        self._grids: OrderedDict[int, tuple[tuple[int, int], Optional[YearGrid]]] = (
+            OrderedDict()
+        )
+        self._build_locks: dict[int, threading.Lock] = {}
+        self._build_slots = threading.BoundedSemaphore(max(max_years, 1))
+        self._lock = threading.Lock()
+
+    def get_latest_year(self) -> Optional[int]:
+        years = parquet_handler.get_available_years(self.dataset_dir)
+        if not years and self.grid_pyramid is not None:
+            years = self.grid_pyramid.get_years()
+        return years[-1] if years else None
+
+    def _cached_grid(
+        self, year: int, version: tuple[int, int]
+    ) -> tuple[bool, Optional[YearGrid]]:
+        # Callers hold self._lock
+        cached = self._grids.get(year)
+        if cached is None or cached[0] != version:
+            return False, None
+        self._grids.move_to_end(year)
+        return True, cached[1]
+
+    def get_year_grid(self, year: int) -> Optional[YearGrid]:
+        if self.grid_pyramid is not None:
+            pyramid = self.grid_pyramid.get_year_pyramid(year)
+            if pyramid is not None:
+                return pyramid_year_grid(pyramid)
+
+        version = parquet_handler.get_year_version(year, self.dataset_dir)
+        if version is None:
+            return None
+        if self.max_years <= 0:
+            raise GridUnavailableError(year)
+        with self._lock:
+            found, grid = self._cached_grid(year, version)
+            if found:
+                return grid
+            build_lock = self._build_locks.setdefault(year, threading.Lock())
+
+        # Built outside self._lock, so lookups in other years are not held up;
+        # concurrent first requests for this year wait for a single build
+        with build_lock:
+            with self._lock:
+                found, grid = self._cached_grid(year, version)
+                if found:
+                    return grid
+            with self._build_slots:
+                grid = build_year_grid(year, self.dataset_dir)
+            with self._lock:
+                self._grids[year] = (version, grid)
+                self._grids.move_to_end(year)
+                while len(self._grids) > self.max_years:
+                    self._grids.popitem(last=False)
+            return grid
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int = 1, year: Optional[int] = None
+    ) -> list[dict]:
+        if year is None:
+            year = self.get_latest_year()
+            if year is None:
+                return []
+        grid = self.get_year_grid(year)
+        return grid.nearest(latitude, longitude, k) if grid else []
+
+    def clear(self) -> None:
+        with self._lock:
+            self._grids.clear()
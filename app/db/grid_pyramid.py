@@ -0,0 +1,291 @@
+import json
+import math
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Optional, Union
+
+import numpy as np
+import pyarrow.parquet as pq
+from numpy.lib.format import open_memmap
+
+from app.db import parquet_handler
+from app.db.grid_index import scan_grid_axes
+from app.db.parquet_handler import BoundingBox
+
+# pm25_pyramid/year=YYYY/level=L/{mean,max,count}.npy and year=YYYY/pyramid.json.
+# Level L averages blocks of 2**L x 2**L native cells; level 0 is the native
+# grid and only holds mean.npy.
+PYRAMID_DIR = os.path.join(parquet_handler.PROCESSED_DATA_DIR, "pm25_pyramid")
+METADATA_FILE = "pyramid.json"
+
+Aggregate = Literal["mean", "max"]
+
+# Rows of the finer level reduced at a time, so building a level never holds
+# more than a stripe of the grid in memory
+STRIPE_ROWS = 2048
+
+
+@dataclass
+class GridWindow:
+    """
+    The cells of one pyramid level that intersect a bounding box, rows south
+    to north and columns west to east. Cells without a PM2.5 value are NaN.
+    """
+
+    year: int
+    level: int
+    cell_lat: float
+    cell_lon: float
+    latitudes: np.ndarray  # cell centres
+    longitudes: np.ndarray
+    values: np.ndarray  # float32, shape (len(latitudes), len(longitudes))
+
+
+def _cell_range(
+    origin: float, step: float, factor: int, size: int, lower: float, upper: float
+) -> range:
+    # Cell i of a level spans native cells i * factor to (i + 1) * factor - 1,
+    # whose edges lie half a native step around their centres
+    first = math.floor(((lower - origin) / step + 0.5) / factor)
+    last = math.floor(((upper - origin) / step + 0.5) / factor)
+    return range(max(first, 0), min(last, size - 1) + 1)
+
+
+@dataclass
+class YearPyramid:
+    year: int
+    lat0: float
+    dlat: float
+    lon0: float
+    dlon: float
+    shapes: list[tuple[int, int]]  # (n_lat, n_lon) of each level
+    year_dir: Path
+    # Results derived from the native level by readers, kept as long as this
+    # version of the year is loaded
+    derived: dict = field(default_factory=dict, init=False, repr=False)
+    _native: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+
+    def native_values(self) -> np.ndarray:
+        """
+        The native float32 grid, rows south to north and columns west to
+        east, NaN where there is no value. A read-only memory map opened once,
+        so workers share its pages through the OS page cache.
+        """
+        if self._native is None:
+            native_file = self.year_dir / "level=0" / "mean.npy"
+            self._native = np.load(native_file, mmap_mode="r")
+        return self._native
+
+    def cell_size(self, level: int) -> tuple[float, float]:
+        return self.dlat * 2**level, self.dlon * 2**level
+
+    def select_level(self, resolution: float) -> int:
+        """
+        The coarsest level whose cells are at most resolution degrees on a
+        side, or the native grid when its own cells are already coarser.
+        """
+        level = 0
+        for candidate in range(1, len(self.shapes)):
+            if max(self.cell_size(candidate)) <= resolution * (1 + 1e-9):
+                level = candidate
+        return level
+
+    def cell_ranges(self, level: int, bbox: BoundingBox) -> tuple[range, range]:
+        lat_min, lat_max, long_min, long_max = bbox
+        n_lat, n_lon = self.shapes[level]
+        factor = 2**level
+        return (
+            _cell_range(self.lat0, self.dlat, factor, n_lat, lat_min, lat_max),
+            _cell_range(self.lon0, self.dlon, factor, n_lon, long_min, long_max),
+        )
+
+    def read(
+        self, level: int, agg: Aggregate, rows: range, columns: range
+    ) -> GridWindow:
+        # Both aggregates of a single native cell are its value
+        name = "mean" if level == 0 else agg
+        level_file = self.year_dir / f"level={level}" / f"{name}.npy"
+        values = np.load(level_file, mmap_mode="r")
+        factor = 2**level
+        offset = (factor - 1) / 2
+        cell_lat, cell_lon = self.cell_size(level)
+        return GridWindow(
+            year=self.year,
+            level=level,
+            cell_lat=cell_lat,
+            cell_lon=cell_lon,
+            latitudes=self.lat0 + (np.asarray(rows) * factor + offset) * self.dlat,
+            longitudes=self.lon0 + (np.asarray(columns) * factor + offset) * self.dlon,
+            values=np.array(
+                values[rows.start : rows.stop, columns.start : columns.stop]
+            ),
+        )
+
+
+def _block_reduce(
+    mean: np.ndarray, maximum: np.ndarray, count: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Odd edges are padded with empty cells; sums are taken in float64 so
+    # coarse means do not drift as levels are stacked
+    n_lat, n_lon = count.shape
+    pad = ((0, n_lat % 2), (0, n_lon % 2))
+    blocks = (n_lat + n_lat % 2) // 2, 2, (n_lon + n_lon % 2) // 2, 2
+
+    total = np.where(count > 0, mean.astype(np.float64) * count, 0.0)
+    total = np.pad(total, pad).reshape(blocks).sum(axis=(1, 3))
+    count = np.pad(count, pad).reshape(blocks).sum(axis=(1, 3), dtype=np.uint32)
+    maximum = np.pad(maximum, pad, constant_values=np.nan).reshape(blocks)
+    maximum = np.fmax.reduce(maximum, axis=(1, 3))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan).astype(np.float32)
+    return mean, maximum, count
+
+
+def _build_level(year_dir: Path, level: int) -> tuple[int, int]:
+    finer_dir = year_dir / f"level={level - 1}"
+    mean = np.load(finer_dir / "mean.npy", mmap_mode="r")
+    if level == 1:
+        maximum, count = mean, None
+    else:
+        maximum = np.load(finer_dir / "max.npy", mmap_mode="r")
+        count = np.load(finer_dir / "count.npy", mmap_mode="r")
+
+    shape = ((mean.shape[0] + 1) // 2, (mean.shape[1] + 1) // 2)
+    level_dir = year_dir / f"level={level}"
+    level_dir.mkdir()
+    outputs = [
+        open_memmap(level_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+        for name, dtype in (
+            ("mean", np.float32),
+            ("max", np.float32),
+            ("count", np.uint32),
+        )
+    ]
+
+    for start in range(0, mean.shape[0], STRIPE_ROWS):
+        stop = start + STRIPE_ROWS
+        if count is None:
+            # Every native cell with a value counts once
+            stripe_count = (~np.isnan(mean[start:stop])).astype(np.uint32)
+        else:
+            stripe_count = count[start:stop]
+        reduced = _block_reduce(mean[start:stop], maximum[start:stop], stripe_count)
+        for output, values in zip(outputs, reduced):
+            output[start // 2 : start // 2 + values.shape[0]] = values
+
+    for output in outputs:
+        output.flush()
+    return shape
+
+
+def write_year_pyramid_from_file(
+    file_path: Union[str, Path], year: int, pyramid_dir: str = PYRAMID_DIR
+) -> int:
+    """
+    Build one year's pyramid from its processed Parquet file: the dense native
+    grid, then levels of 2x2 block means and maxima down to a single cell.
+    Arrays are written to disk as they are built and the year is swapped in
+    once complete, replacing any previous version. Returns the level count.
+    """
+    axes = scan_grid_axes([file_path])
+    if axes is None:
+        return 0
+    (lat0, dlat, n_lat), (lon0, dlon, n_lon) = axes
+
+    staging_dir = Path(pyramid_dir) / f".staging-{year}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    (staging_dir / "level=0").mkdir(parents=True)
+
+    values = open_memmap(
+        staging_dir / "level=0" / "mean.npy",
+        mode="w+",
+        dtype=np.float32,
+        shape=(n_lat, n_lon),
+    )
+    values[:] = np.nan
+    for batch in pq.ParquetFile(file_path).iter_batches(
+        batch_size=parquet_handler.ROW_GROUP_SIZE * 4,
+        columns=["latitude", "longitude", "pm25_level"],
+    ):
+        rows = np.rint((batch.column("latitude").to_numpy() - lat0) / dlat)
+        columns = np.rint((batch.column("longitude").to_numpy() - lon0) / dlon)
+        values[rows.astype(np.int64), columns.astype(np.int64)] = batch.column(
+            "pm25_level"
+        ).to_numpy(zero_copy_only=False)
+    values.flush()
+    del values
+
+    shapes = [(n_lat, n_lon)]
+    while max(shapes[-1]) > 1:
+        shapes.append(_build_level(staging_dir, len(shapes)))
+
+    metadata = {
+        "year": year,
+        "lat0": lat0,
+        "dlat": dlat,
+        "lon0": lon0,
+        "dlon": dlon,
+        "shapes": shapes,
+    }
+    with open(staging_dir / METADATA_FILE, "w") as f:
+        json.dump(metadata, f)
+
+    year_dir = Path(pyramid_dir) / f"year={year}"
+    old_dir = Path(pyramid_dir) / f".old-{year}"
+    if year_dir.exists():
+        os.replace(year_dir, old_dir)
+    os.replace(staging_dir, year_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return len(shapes)
+
+
+def load_year_pyramid(year_dir: Union[str, Path]) -> YearPyramid:
+    with open(Path(year_dir) / METADATA_FILE) as f:
+        metadata = json.load(f)
+    metadata["shapes"] = [tuple(shape) for shape in metadata["shapes"]]
+    return YearPyramid(year_dir=Path(year_dir), **metadata)
+
+
+class GridPyramid:
+    """
+    The per-year pyramids under pyramid_dir. Levels are read through memory
+    maps, so a request only pages in the cells it returns.
+    """
+
+    def __init__(self, pyramid_dir: str = PYRAMID_DIR):
+        self.pyramid_dir = pyramid_dir
+        self._pyramids: dict[int, tuple[int, YearPyramid]] = {}
+        self._lock = threading.Lock()
+
+    def get_years(self) -> list[int]:
+        # Read from the year directory names; staging directories are hidden
+        if not os.path.isdir(self.pyramid_dir):
+            return []
+        return sorted(
+            int(name.split("=", 1)[1])
+            for name in os.listdir(self.pyramid_dir)
+            if name.startswith("year=")
+        )
+
+    def get_latest_year(self) -> Optional[int]:
+        years = self.get_years()
+        return years[-1] if years else None
+
+    def get_year_pyramid(self, year: int) -> Optional[YearPyramid]:
+        # Keyed on the metadata's mtime, so a rebuilt year is picked up
+        metadata_file = Path(self.pyramid_dir) / f"year={year}" / METADATA_FILE
+        try:
+            mtime_ns = metadata_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._pyramids.get(year)
+            if cached is None or cached[0] != mtime_ns:
+                cached = (mtime_ns, load_year_pyramid(metadata_file.parent))
+                self._pyramids[year] = cached
+            return cached[1]
@@ -1,15 +1,25 @@
-from sqlalchemy import Column, Integer, Float
+from sqlalchemy import Column, Integer, Float, Index, event
 from app.db.database_manager import Base
+from app.utils.spatial_utils import compute_grid_cell
 
 
 class AirQualityData(Base):
     __tablename__ = "air_quality_data"
+    __table_args__ = (
+        # Bounding-box queries seek grid cell ranges and filter the exact
+        # coordinates from the index without visiting the table
+        Index("ix_air_quality_data_grid_cell", "grid_cell", "latitude", "longitude"),
+        # Keyset pagination seeks on (year, id)
+        Index("ix_air_quality_data_year_id", "year", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     year = Column(Integer, index=True, nullable=False)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     pm25_level = Column(Float, nullable=True)
+    # Derived from latitude/longitude, see app.utils.spatial_utils
+    grid_cell = Column(Integer, nullable=True)
 
     def __repr__(self):
         return (
@@ -17,3 +27,23 @@ class AirQualityData(Base):
             f"latitude={self.latitude}, longitude={self.longitude}, "
             f"pm25_level={self.pm25_level})>"
         )
+
+
+# Top-N queries read a year's highest values straight off this index
+Index(
+    "ix_air_quality_data_year_pm25_level",
+    AirQualityData.year,
+    AirQualityData.pm25_level.desc(),
+    postgresql_where=AirQualityData.pm25_level.isnot(None),
+    sqlite_where=AirQualityData.pm25_level.isnot(None),
+)
+
+
+@event.listens_for(AirQualityData, "before_insert")
+@event.listens_for(AirQualityData, "before_update")
+def set_grid_cell(mapper, connection, target: AirQualityData):
+    # Rows without valid coordinates, including NULL ones, get no grid cell
+    if target.latitude is None or target.longitude is None:
+        target.grid_cell = None
+    else:
+        target.grid_cell = compute_grid_cell(target.latitude, target.longitude)
@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, Column, Integer
+from app.db.database_manager import Base
+
+
+class AirQualityPM25Histogram(Base):
+    """
+    Per-year, per-latitude-band counts of pm25_level in the buckets of
+    app.utils.quantile_sketch, maintained with air_quality_summary.
+    """
+
+    __tablename__ = "air_quality_pm25_histogram"
+
+    year = Column(Integer, primary_key=True)
+    # See app.utils.spatial_utils.get_lat_band
+    lat_band = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<AirQualityPM25Histogram(year={self.year}, lat_band={self.lat_band}, "
+            f"bucket={self.bucket}, count={self.count})>"
+        )
@@ -0,0 +1,35 @@
+from sqlalchemy import BigInteger, Boolean, Column, Float, Integer, false
+from app.db.database_manager import Base
+
+# lat_band of rows without coordinates
+UNKNOWN_LAT_BAND = -999
+
+
+class AirQualitySummary(Base):
+    """
+    Per-year, per-latitude-band aggregates of air_quality_data, kept current
+    by AirQualityRepository writes and rebuilt by the bulk loader.
+    """
+
+    __tablename__ = "air_quality_summary"
+
+    year = Column(Integer, primary_key=True)
+    # See app.utils.spatial_utils.get_lat_band
+    lat_band = Column(Integer, primary_key=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
+    # Aggregates over the rows with a pm25_level
+    pm25_count = Column(BigInteger, nullable=False, default=0)
+    pm25_sum = Column(Float, nullable=False, default=0.0)
+    pm25_min = Column(Float, nullable=True)
+    pm25_max = Column(Float, nullable=True)
+    # Set when a write removed the group's minimum or maximum, so the bounds
+    # above are only outer bounds until the next read recomputes them
+    pm25_bounds_stale = Column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
+
+    def __repr__(self):
+        return (
+            f"<AirQualitySummary(year={self.year}, lat_band={self.lat_band}, "
+            f"row_count={self.row_count}, pm25_count={self.pm25_count})>"
+        )
@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, func
+from app.db.database_manager import Base
+
+
+class IngestionManifest(Base):
+    __tablename__ = "ingestion_manifest"
+
+    year = Column(Integer, primary_key=True)
+    source_file = Column(String, nullable=True)
+    source_size = Column(BigInteger, nullable=True)
+    source_mtime_ns = Column(BigInteger, nullable=True)
+    source_checksum = Column(String(64), nullable=True)
+    row_count = Column(BigInteger, nullable=True)
+    parquet_file = Column(String, nullable=True)
+    parquet_status = Column(String(16), nullable=False, default="pending")
+    # Checksum of the source whose rows are currently loaded in air_quality_data
+    db_checksum = Column(String(64), nullable=True)
+    db_status = Column(String(16), nullable=False, default="pending")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return (
+            f"<IngestionManifest(year={self.year}, "
+            f"source_checksum={self.source_checksum}, row_count={self.row_count}, "
+            f"parquet_status={self.parquet_status}, db_status={self.db_status})>"
+        )
@@ -1,8 +1,35 @@
 import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app.utils.quantile_sketch import QuantileSketch
 
 PROCESSED_DATA_DIR = "processed_data"
 
+# Hive-partitioned dataset: pm25_dataset/year=YYYY/lat_band=NN/part-*.parquet
+DATASET_DIR = os.path.join(PROCESSED_DATA_DIR, "pm25_dataset")
+LAT_BAND_DEGREES = 10
+ROW_GROUP_SIZE = 250_000
+
+# Dataset ids are year * ID_YEAR_STRIDE + the row's position in that year's grid,
+# so the year partition of any id is known without a lookup.
+ID_YEAR_STRIDE = 10**10
+
+DATASET_PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int64()), ("lat_band", pa.int32())]), flavor="hive"
+)
+
+# (lat_min, lat_max, long_min, long_max)
+BoundingBox = tuple[float, float, float, float]
+
 
 def load_parquet_files():
     data_frames = []
@@ -20,3 +47,342 @@ def load_parquet_files():
 def save_processed_data(df: pd.DataFrame, year: int):
     file_path = os.path.join(PROCESSED_DATA_DIR, f"pm25_processed_{year}.parquet")
     df.to_parquet(file_path, index=False)
+
+
+def get_lat_band(latitude: float) -> int:
+    return int(np.floor(latitude / LAT_BAND_DEGREES) * LAT_BAND_DEGREES)
+
+
+def _with_lat_band(table: pa.Table) -> pa.Table:
+    latitude = table.column("latitude").to_numpy()
+    lat_band = np.floor(latitude / LAT_BAND_DEGREES) * LAT_BAND_DEGREES
+    return table.append_column("lat_band", pa.array(lat_band.astype(np.int32)))
+
+
+def write_year_partitions(
+    tables: Iterable[Union[pa.Table, pa.RecordBatch]],
+    year: int,
+    dataset_dir: str = DATASET_DIR,
+) -> int:
+    """
+    Write one year of processed rows into the partitioned dataset.
+    The year is written to a hidden staging directory and swapped in once
+    complete, replacing any previous version of that year.
+    """
+    staging_dir = Path(dataset_dir) / f".staging-{year}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    write_options = ds.ParquetFileFormat().make_write_options(write_statistics=True)
+
+    row_count = 0
+    for index, table in enumerate(tables):
+        if isinstance(table, pa.RecordBatch):
+            table = pa.Table.from_batches([table])
+        if "id" not in table.column_names:
+            ids = year * ID_YEAR_STRIDE + row_count + np.arange(table.num_rows)
+            table = table.append_column("id", pa.array(ids, type=pa.int64()))
+        ds.write_dataset(
+            _with_lat_band(table),
+            staging_dir,
+            format="parquet",
+            partitioning=DATASET_PARTITIONING,
+            basename_template=f"part-{index}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=write_options,
+            max_rows_per_group=ROW_GROUP_SIZE,
+            min_rows_per_group=min(ROW_GROUP_SIZE, table.num_rows),
+            # Keeping the source order keeps each row group's latitude range tight
+            preserve_order=True,
+        )
+        row_count += table.num_rows
+
+    year_dir = Path(dataset_dir) / f"year={year}"
+    old_dir = Path(dataset_dir) / f".old-{year}"
+    if year_dir.exists():
+        os.replace(year_dir, old_dir)
+    if row_count:
+        os.replace(staging_dir / f"year={year}", year_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return row_count
+
+
+def write_year_partitions_from_file(
+    file_path: Union[str, Path], year: int, dataset_dir: str = DATASET_DIR
+) -> int:
+    parquet_file = pq.ParquetFile(file_path)
+    columns = ["latitude", "longitude", "pm25_level"]
+    batches = (
+        batch.append_column(
+            "year", pa.array(np.full(batch.num_rows, year, dtype=np.int64))
+        )
+        for batch in parquet_file.iter_batches(
+            batch_size=ROW_GROUP_SIZE * 4, columns=columns
+        )
+    )
+    return write_year_partitions(batches, year, dataset_dir)
+
+
+# A year directory's (inode, mtime) changes whenever write_year_partitions
+# swaps in a new version, whichever process ran it, so caches keyed on it
+# never serve a year that has since been rewritten
+YearVersion = tuple[int, int, int]
+
+
+def get_year_versions(dataset_dir: str = DATASET_DIR) -> tuple[YearVersion, ...]:
+    """(year, inode, mtime_ns) of every year directory, in year order."""
+    versions = []
+    try:
+        with os.scandir(dataset_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("year="):
+                    stat = entry.stat()
+                    year = int(entry.name.split("=", 1)[1])
+                    versions.append((year, stat.st_ino, stat.st_mtime_ns))
+    except FileNotFoundError:
+        return ()
+    return tuple(sorted(versions))
+
+
+def get_year_version(
+    year: int, dataset_dir: str = DATASET_DIR
+) -> Optional[tuple[int, int]]:
+    """(inode, mtime_ns) of one year directory, or None when it is missing."""
+    try:
+        stat = os.stat(Path(dataset_dir) / f"year={year}")
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _versions_of(
+    versions: tuple[YearVersion, ...], year: Optional[int]
+) -> tuple[YearVersion, ...]:
+    if year is None:
+        return versions
+    return tuple(version for version in versions if version[0] == year)
+
+
+@lru_cache(maxsize=16)
+def _open_dataset(
+    dataset_dir: str, versions: tuple[YearVersion, ...]
+) -> ds.Dataset:
+    return ds.dataset(dataset_dir, format="parquet", partitioning=DATASET_PARTITIONING)
+
+
+def get_dataset(dataset_dir: str = DATASET_DIR) -> ds.Dataset:
+    """
+    The partitioned dataset, rediscovered whenever a year directory has been
+    added, removed or rewritten since it was last opened.
+    """
+    dataset_dir = str(dataset_dir)
+    return _open_dataset(dataset_dir, get_year_versions(dataset_dir))
+
+
+def build_filter(
+    year: Optional[Union[int, Sequence[int]]] = None,
+    bbox: Optional[BoundingBox] = None,
+) -> Optional[ds.Expression]:
+    """
+    Build a filter expression that prunes partitions by year and latitude band
+    and row groups by the latitude/longitude min/max statistics.
+    """
+    expressions = []
+    if year is not None:
+        if isinstance(year, int):
+            expressions.append(ds.field("year") == year)
+        else:
+            expressions.append(ds.field("year").isin(list(year)))
+
+    if bbox is not None:
+        lat_min, lat_max, long_min, long_max = bbox
+        expressions.extend(
+            [
+                ds.field("lat_band") >= get_lat_band(lat_min),
+                ds.field("lat_band") <= get_lat_band(lat_max),
+                ds.field("latitude") >= lat_min,
+                ds.field("latitude") <= lat_max,
+                ds.field("longitude") >= long_min,
+                ds.field("longitude") <= long_max,
+            ]
+        )
+
+    if not expressions:
+        return None
+
+    expression = expressions[0]
+    for other in expressions[1:]:
+        expression = expression & other
+    return expression
+
+
+def _combine_filters(
+    year: Optional[Union[int, Sequence[int]]],
+    bbox: Optional[BoundingBox],
+    extra_filter: Optional[ds.Expression],
+) -> Optional[ds.Expression]:
+    expression = build_filter(year, bbox)
+    if extra_filter is None:
+        return expression
+    return extra_filter if expression is None else expression & extra_filter
+
+
+def query_dataset(
+    year: Optional[Union[int, Sequence[int]]] = None,
+    bbox: Optional[BoundingBox] = None,
+    columns: Optional[list[str]] = None,
+    extra_filter: Optional[ds.Expression] = None,
+    dataset_dir: str = DATASET_DIR,
+) -> pa.Table:
+    expression = _combine_filters(year, bbox, extra_filter)
+    return get_dataset(dataset_dir).to_table(columns=columns, filter=expression)
+
+
+def iter_dataset_batches(
+    year: Optional[Union[int, Sequence[int]]] = None,
+    bbox: Optional[BoundingBox] = None,
+    columns: Optional[list[str]] = None,
+    extra_filter: Optional[ds.Expression] = None,
+    dataset_dir: str = DATASET_DIR,
+) -> Iterator[pa.RecordBatch]:
+    expression = _combine_filters(year, bbox, extra_filter)
+    scanner = get_dataset(dataset_dir).scanner(columns=columns, filter=expression)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch
+
+
+def iter_row_groups_by_max(
+    column: str,
+    year: Optional[Union[int, Sequence[int]]] = None,
+    bbox: Optional[BoundingBox] = None,
+    dataset_dir: str = DATASET_DIR,
+) -> Iterator[tuple[float, pa.Table]]:
+    """
+    Yield (column max, filtered rows) for each row group matching the filters,
+    highest maximum first as recorded in the row-group statistics. Row groups
+    holding no values of the column are skipped, so top-N callers can stop as
+    soon as the next maximum cannot beat what they already have.
+    """
+    dataset = get_dataset(dataset_dir)
+    expression = build_filter(year, bbox)
+    # Row groups can only be pruned on columns stored in the files
+    file_expression = None
+    if bbox is not None:
+        lat_min, lat_max, long_min, long_max = bbox
+        file_expression = (
+            (ds.field("latitude") >= lat_min)
+            & (ds.field("latitude") <= lat_max)
+            & (ds.field("longitude") >= long_min)
+            & (ds.field("longitude") <= long_max)
+        )
+
+    row_groups = []
+    for fragment in dataset.get_fragments(filter=expression):
+        metadata = fragment.metadata
+        index = metadata.schema.to_arrow_schema().get_field_index(column)
+        for row_group in fragment.split_by_row_group(file_expression):
+            row_group_id = row_group.row_groups[0].id
+            statistics = metadata.row_group(row_group_id).column(index).statistics
+            if statistics is None:
+                row_groups.append((np.inf, row_group))
+            elif statistics.has_min_max:
+                row_groups.append((statistics.max, row_group))
+
+    row_groups.sort(key=lambda item: item[0], reverse=True)
+    for upper, row_group in row_groups:
+        yield upper, row_group.to_table(schema=dataset.schema, filter=expression)
+
+
+def count_rows(
+    year: Optional[Union[int, Sequence[int]]] = None,
+    bbox: Optional[BoundingBox] = None,
+    dataset_dir: str = DATASET_DIR,
+) -> int:
+    return get_dataset(dataset_dir).count_rows(filter=build_filter(year, bbox))
+
+
+@lru_cache(maxsize=256)
+def _column_bounds(
+    dataset_dir: str,
+    column: str,
+    year: Optional[int],
+    versions: tuple[YearVersion, ...],
+) -> Optional[tuple[float, float]]:
+    dataset = get_dataset(dataset_dir)
+    lower, upper = np.inf, -np.inf
+    for fragment in dataset.get_fragments(filter=build_filter(year)):
+        metadata = fragment.metadata
+        index = metadata.schema.to_arrow_schema().get_field_index(column)
+        for row_group in range(metadata.num_row_groups):
+            statistics = metadata.row_group(row_group).column(index).statistics
+            if statistics is None:
+                # No statistics written: read the column of this file instead
+                values = fragment.to_table(columns=[column]).column(column)
+                values = values.to_numpy(zero_copy_only=False)
+                values = values[~np.isnan(values)]
+                if values.size:
+                    lower = min(lower, float(values.min()))
+                    upper = max(upper, float(values.max()))
+                break
+            # Row groups holding only nulls and NaN have no min/max
+            if statistics.has_min_max:
+                lower = min(lower, statistics.min)
+                upper = max(upper, statistics.max)
+    return None if lower > upper else (lower, upper)
+
+
+def get_column_bounds(
+    column: str, year: Optional[int] = None, dataset_dir: str = DATASET_DIR
+) -> Optional[tuple[float, float]]:
+    """
+    Min and max of a numeric column, ignoring nulls and NaN, read from the
+    row-group statistics instead of the data. Cached until a year is rewritten.
+    """
+    dataset_dir = str(dataset_dir)
+    versions = _versions_of(get_year_versions(dataset_dir), year)
+    return _column_bounds(dataset_dir, column, year, versions)
+
+
+@lru_cache(maxsize=1024)
+def _partition_sketch(
+    dataset_dir: str,
+    column: str,
+    year: int,
+    lat_band: int,
+    versions: tuple[YearVersion, ...],
+) -> QuantileSketch:
+    expression = (ds.field("year") == year) & (ds.field("lat_band") == lat_band)
+    sketch = QuantileSketch()
+    scanner = get_dataset(dataset_dir).scanner(columns=[column], filter=expression)
+    for batch in scanner.to_batches():
+        values = batch.column(column).to_numpy(zero_copy_only=False)
+        sketch = sketch.merge(QuantileSketch.from_values(values))
+    return sketch
+
+
+def get_partition_sketch(
+    column: str, year: int, lat_band: int, dataset_dir: str = DATASET_DIR
+) -> QuantileSketch:
+    """
+    Quantile sketch of a numeric column in one (year, lat_band) partition,
+    ignoring nulls and NaN. Computed on first use and cached until a year is
+    rewritten; callers merge partitions instead of rescanning them.
+    """
+    dataset_dir = str(dataset_dir)
+    versions = _versions_of(get_year_versions(dataset_dir), year)
+    return _partition_sketch(dataset_dir, column, year, lat_band, versions)
+
+
+def get_year_from_id(record_id: int) -> int:
+    return record_id // ID_YEAR_STRIDE
+
+
+def get_available_years(dataset_dir: str = DATASET_DIR) -> list[int]:
+    # Read from the partition directory names, not the data
+    if not os.path.isdir(dataset_dir):
+        return []
+    return sorted(
+        int(name.split("=", 1)[1])
+        for name in os.listdir(dataset_dir)
+        if name.startswith("year=")
+    )
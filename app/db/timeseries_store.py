@@ -0,0 +1,148 @@
+import json
+import math
+import os
+import shutil
+import threading
+from itertools import zip_longest
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pyarrow.parquet as pq
+from numpy.lib.format import open_memmap
+
+from app.db import parquet_handler
+from app.db.grid_index import scan_grid_axes
+
+# pm25_timeseries/series.npy holds one row per grid cell (row-major over the
+# native lat/lon grid) and one float32 column per year, so the whole history
+# of a cell is a single contiguous read. timeseries.json describes the grid.
+TIMESERIES_DIR = os.path.join(parquet_handler.PROCESSED_DATA_DIR, "pm25_timeseries")
+SERIES_FILE = "series.npy"
+METADATA_FILE = "timeseries.json"
+
+
+def write_timeseries_store(
+    year_files: dict[int, Union[str, Path]], timeseries_dir: str = TIMESERIES_DIR
+) -> int:
+    """
+    Transpose the processed Parquet file of each year into the cell-major
+    store. The yearly files are read in lockstep, a batch of each at a time,
+    so the rows written together cover the same cells and land in the same
+    pages of the store. The store is swapped in once complete, replacing any
+    previous one. Returns the number of cells.
+    """
+    years = sorted(year_files)
+    axes = scan_grid_axes(year_files[year] for year in years)
+    if axes is None:
+        return 0
+    (lat0, dlat, n_lat), (lon0, dlon, n_lon) = axes
+
+    staging_dir = Path(f"{timeseries_dir}.staging")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+
+    series = open_memmap(
+        staging_dir / SERIES_FILE,
+        mode="w+",
+        dtype=np.float32,
+        shape=(n_lat * n_lon, len(years)),
+    )
+    series[:] = np.nan
+    batches = [
+        pq.ParquetFile(year_files[year]).iter_batches(
+            batch_size=parquet_handler.ROW_GROUP_SIZE,
+            columns=["latitude", "longitude", "pm25_level"],
+        )
+        for year in years
+    ]
+    for year_batches in zip_longest(*batches):
+        for year_index, batch in enumerate(year_batches):
+            if batch is None:
+                continue
+            rows = np.rint((batch.column("latitude").to_numpy() - lat0) / dlat)
+            columns = np.rint((batch.column("longitude").to_numpy() - lon0) / dlon)
+            cells = rows.astype(np.int64) * n_lon + columns.astype(np.int64)
+            series[cells, year_index] = batch.column("pm25_level").to_numpy(
+                zero_copy_only=False
+            )
+    series.flush()
+    del series
+
+    metadata = {
+        "lat0": lat0,
+        "dlat": dlat,
+        "n_lat": n_lat,
+        "lon0": lon0,
+        "dlon": dlon,
+        "n_lon": n_lon,
+        "years": years,
+    }
+    with open(staging_dir / METADATA_FILE, "w") as f:
+        json.dump(metadata, f)
+
+    old_dir = Path(f"{timeseries_dir}.old")
+    if os.path.exists(timeseries_dir):
+        os.replace(timeseries_dir, old_dir)
+    os.replace(staging_dir, timeseries_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return n_lat * n_lon
+
+
+class TimeSeriesStore:
+    """
+    Per-cell PM2.5 histories read from the store in timeseries_dir through a
+    memory map, reopened when the store is rebuilt.
+    """
+
+    def __init__(self, timeseries_dir: str = TIMESERIES_DIR):
+        self.timeseries_dir = timeseries_dir
+        self._store: Optional[tuple[int, dict, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def open(self) -> Optional[tuple[dict, np.ndarray]]:
+        """The store's metadata and [cell, year] memory map, or None."""
+        metadata_file = Path(self.timeseries_dir) / METADATA_FILE
+        try:
+            mtime_ns = metadata_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            if self._store is None or self._store[0] != mtime_ns:
+                with open(metadata_file) as f:
+                    metadata = json.load(f)
+                series = np.load(
+                    Path(self.timeseries_dir) / SERIES_FILE, mmap_mode="r"
+                )
+                self._store = (mtime_ns, metadata, series)
+            return self._store[1], self._store[2]
+
+    def get_years(self) -> list[int]:
+        store = self.open()
+        return store[0]["years"] if store else []
+
+    def get_series(self, latitude: float, longitude: float) -> Optional[dict]:
+        """
+        The grid cell containing the coordinate and its PM2.5 level in every
+        year of the store (NaN where it has none), or None when the store is
+        missing or the coordinate lies outside the grid.
+        """
+        store = self.open()
+        if store is None:
+            return None
+        metadata, series = store
+
+        row = math.floor((latitude - metadata["lat0"]) / metadata["dlat"] + 0.5)
+        column = math.floor((longitude - metadata["lon0"]) / metadata["dlon"] + 0.5)
+        if math.isclose(metadata["n_lon"] * metadata["dlon"], 360.0, rel_tol=1e-6):
+            column %= metadata["n_lon"]
+        if not (0 <= row < metadata["n_lat"] and 0 <= column < metadata["n_lon"]):
+            return None
+
+        return {
+            "latitude": metadata["lat0"] + row * metadata["dlat"],
+            "longitude": metadata["lon0"] + column * metadata["dlon"],
+            "years": metadata["years"],
+            "pm25_levels": np.array(series[row * metadata["n_lon"] + column]),
+        }
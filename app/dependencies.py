@@ -1,11 +1,35 @@
 import logging
+from typing import AsyncIterator, Optional
+
 from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.analytics_store import AnalyticsStore
 from app.db.database_manager import DatabaseManager
+from app.db.grid_index import GridIndex
+from app.db.grid_pyramid import GridPyramid
+from app.db.timeseries_store import TimeSeriesStore
 from app.schemas.settings import Settings
+from app.services.analytics_service import AnalyticsService
+from app.services.air_quality_bulk_service import AirQualityBulkService
+from app.services.air_quality_export_service import AirQualityExportService
 from app.services.air_quality_service import AirQualityService
+from app.services.async_air_quality_service import AsyncAirQualityService
+from app.services.cached_air_quality_service import (
+    CachedAirQualityService,
+    CachedAsyncAirQualityService,
+)
+from app.services.grid_service import GridService
+from app.services.timeseries_service import TimeSeriesService
+from app.services.threadpool_air_quality_service import ThreadPoolAirQualityService
 from app.repositories.air_quality_repository import AirQualityRepository
+from app.repositories.async_air_quality_repository import AsyncAirQualityRepository
+from app.repositories.grid_air_quality_repository import GridAirQualityRepository
+from app.repositories.parquet_air_quality_repository import (
+    ParquetAirQualityRepository,
+)
+from app.utils.response_cache import ResponseCache
 
 # Configure logger (ensure consistency with your main logger configuration)
 logger = logging.getLogger("data_processing_pipeline_development")
@@ -27,6 +51,47 @@ def get_db_manager(request: Request) -> DatabaseManager:
     return db_manager
 
 
+def get_grid_index(request: Request) -> GridIndex:
+    grid_index: GridIndex = getattr(request.app.state, "grid_index", None)
+    if not grid_index:
+        logger.error("GridIndex instance not found in app state.")
+        raise RuntimeError("GridIndex not initialized.")
+    return grid_index
+
+
+def get_grid_pyramid(request: Request) -> GridPyramid:
+    grid_pyramid: GridPyramid = getattr(request.app.state, "grid_pyramid", None)
+    if not grid_pyramid:
+        logger.error("GridPyramid instance not found in app state.")
+        raise RuntimeError("GridPyramid not initialized.")
+    return grid_pyramid
+
+
+def get_timeseries_store(request: Request) -> TimeSeriesStore:
+    timeseries_store: TimeSeriesStore = getattr(
+        request.app.state, "timeseries_store", None
+    )
+    if not timeseries_store:
+        logger.error("TimeSeriesStore instance not found in app state.")
+        raise RuntimeError("TimeSeriesStore not initialized.")
+    return timeseries_store
+
+
+def get_analytics_store(request: Request) -> AnalyticsStore:
+    analytics_store: AnalyticsStore = getattr(
+        request.app.state, "analytics_store", None
+    )
+    if not analytics_store:
+        logger.error("AnalyticsStore instance not found in app state.")
+        raise RuntimeError("AnalyticsStore not initialized.")
+    return analytics_store
+
+
+def get_response_cache(request: Request) -> Optional[ResponseCache]:
+    # Optional: without a cache in app state, reads go straight to the repository
+    return getattr(request.app.state, "response_cache", None)
+
+
 def get_db_session(db_manager: DatabaseManager = Depends(get_db_manager)) -> Session:
     with db_manager.get_db() as session:
         try:
@@ -38,13 +103,84 @@ def get_db_session(db_manager: DatabaseManager = Depends(get_db_manager)) -> Ses
             pass  # Session is automatically closed by the context manager
 
 
+async def get_async_db_session(
+    settings: Settings = Depends(get_settings),
+    db_manager: DatabaseManager = Depends(get_db_manager),
+) -> AsyncIterator[Optional[AsyncSession]]:
+    # None unless the database backend is served in async mode
+    if settings.db_mode != "async" or settings.repository_backend != "database":
+        yield None
+        return
+    async with db_manager.get_async_db() as session:
+        yield session
+
+
 def get_air_quality_repository(
+    settings: Settings = Depends(get_settings),
     db: Session = Depends(get_db_session),
-) -> AirQualityRepository:
+    grid_pyramid: GridPyramid = Depends(get_grid_pyramid),
+) -> AirQualityRepository | ParquetAirQualityRepository | GridAirQualityRepository:
+    # The session only checks out a connection once a query runs, so the
+    # Parquet and grid backends never touch the database
+    if settings.repository_backend == "parquet":
+        return ParquetAirQualityRepository(settings.parquet_dataset_dir)
+    if settings.repository_backend == "grid":
+        return GridAirQualityRepository(grid_pyramid)
     return AirQualityRepository(db)
 
 
 def get_air_quality_service(
-    repository: AirQualityRepository = Depends(get_air_quality_repository),
-) -> AirQualityService:
-    return AirQualityService(repository)
+    repository: AirQualityRepository | ParquetAirQualityRepository = Depends(
+        get_air_quality_repository
+    ),
+    async_db: Optional[AsyncSession] = Depends(get_async_db_session),
+    cache: Optional[ResponseCache] = Depends(get_response_cache),
+) -> AsyncAirQualityService | ThreadPoolAirQualityService:
+    """
+    The routes await every service call: natively in async mode, otherwise
+    by running the sync service in the threadpool.
+    """
+    if async_db is not None:
+        async_repository = AsyncAirQualityRepository(async_db)
+        if cache is not None:
+            return CachedAsyncAirQualityService(async_repository, cache)
+        return AsyncAirQualityService(async_repository)
+
+    if cache is not None:
+        return ThreadPoolAirQualityService(CachedAirQualityService(repository, cache))
+    return ThreadPoolAirQualityService(AirQualityService(repository))
+
+
+def get_air_quality_export_service(
+    settings: Settings = Depends(get_settings),
+    db_manager: DatabaseManager = Depends(get_db_manager),
+    grid_pyramid: GridPyramid = Depends(get_grid_pyramid),
+) -> AirQualityExportService:
+    return AirQualityExportService(settings, db_manager, grid_pyramid)
+
+
+def get_air_quality_bulk_service(
+    settings: Settings = Depends(get_settings),
+    db_manager: DatabaseManager = Depends(get_db_manager),
+    cache: Optional[ResponseCache] = Depends(get_response_cache),
+) -> AirQualityBulkService:
+    return AirQualityBulkService(settings, db_manager, cache)
+
+
+def get_grid_service(
+    grid_index: GridIndex = Depends(get_grid_index),
+    grid_pyramid: GridPyramid = Depends(get_grid_pyramid),
+) -> GridService:
+    return GridService(grid_index, grid_pyramid)
+
+
+def get_timeseries_service(
+    store: TimeSeriesStore = Depends(get_timeseries_store),
+) -> TimeSeriesService:
+    return TimeSeriesService(store)
+
+
+def get_analytics_service(
+    store: AnalyticsStore = Depends(get_analytics_store),
+) -> AnalyticsService:
+    return AnalyticsService(store)
@@ -0,0 +1,10 @@
+class GridTooLargeError(Exception):
+    def __init__(self, cells, max_cells, message=None):
+        if message is None:
+            message = (
+                f"The requested grid has {cells} cells, more than {max_cells}. "
+                "Request a coarser resolution or a smaller bounding box."
+            )
+        super().__init__(message)
+        self.cells = cells
+        self.max_cells = max_cells
@@ -0,0 +1,9 @@
+class GridUnavailableError(Exception):
+    def __init__(self, year, message=None):
+        if message is None:
+            message = (
+                f"Year {year} has no aggregation pyramid to look up locations in. "
+                "Build it with the ingestion pipeline's --pyramid_dir."
+            )
+        super().__init__(message)
+        self.year = year
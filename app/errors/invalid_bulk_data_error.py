@@ -0,0 +1,6 @@
+class InvalidBulkDataError(Exception):
+    def __init__(self, errors, message=None):
+        if message is None:
+            message = f"Bulk data failed validation with {len(errors)} error(s)."
+        super().__init__(message)
+        self.errors = errors
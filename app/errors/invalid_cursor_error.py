@@ -0,0 +1,6 @@
+class InvalidCursorError(Exception):
+    def __init__(self, cursor, message=None):
+        if message is None:
+            message = f"Invalid pagination cursor: {cursor!r}."
+        super().__init__(message)
+        self.cursor = cursor
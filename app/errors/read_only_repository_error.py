@@ -0,0 +1,6 @@
+class ReadOnlyRepositoryError(Exception):
+    def __init__(self, backend, message=None):
+        if message is None:
+            message = f"The {backend} backend is read-only."
+        super().__init__(message)
+        self.backend = backend
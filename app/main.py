@@ -1,10 +1,37 @@
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 
+from app.errors.grid_too_large_error import GridTooLargeError
+from app.errors.grid_unavailable_error import GridUnavailableError
+from app.errors.invalid_bulk_data_error import InvalidBulkDataError
+from app.errors.invalid_cursor_error import InvalidCursorError
+from app.errors.read_only_repository_error import ReadOnlyRepositoryError
 from app.routers import air_quality
 from app.schemas.settings import Settings
+from app.db.analytics_store import AnalyticsStore
 from app.db.database_manager import DatabaseManager
+from app.db.dataset_version import DatasetVersion
+from app.db.grid_index import GridIndex
+from app.db.grid_pyramid import GridPyramid
+from app.db.timeseries_store import TimeSeriesStore
+from app.utils.response_cache import ResponseCache
+
+
+async def prewarm_pool(db_manager: DatabaseManager, settings: Settings) -> None:
+    # An unreachable database should not keep the API from starting
+    try:
+        if settings.db_mode == "async":
+            connections = await db_manager.prewarm_async_pool()
+        else:
+            connections = await run_in_threadpool(db_manager.prewarm_pool)
+        logging.info(f"Connection pool pre-warmed with {connections} connections.")
+    except SQLAlchemyError as e:
+        logging.warning(f"Could not pre-warm the connection pool: {e}")
 
 
 @asynccontextmanager
@@ -14,17 +41,49 @@ async def lifespan(app: FastAPI):
     logging.info("Settings loaded successfully.")
 
     # Initialize DatabaseManager and store in app state
-    db_manager = DatabaseManager(database_url=settings.db_url)
+    db_manager = DatabaseManager.from_settings(settings)
     logging.info("DatabaseManager initialized.")
 
-    # Store Settings and DatabaseManager in app state for global access
+    # The Parquet backend only reads from the dataset
+    if settings.db_pool_prewarm and settings.repository_backend == "database":
+        await prewarm_pool(db_manager, settings)
+
+    # Pyramid levels are memory-mapped per request
+    grid_pyramid = GridPyramid(settings.pyramid_dir)
+
+    # Year grids are read from the pyramid's native level, or built from the
+    # Parquet dataset on first use for years without a pyramid
+    grid_index = GridIndex(
+        dataset_dir=settings.parquet_dataset_dir,
+        max_years=settings.grid_index_max_years,
+        grid_pyramid=grid_pyramid,
+    )
+    timeseries_store = TimeSeriesStore(settings.timeseries_dir)
+    analytics_store = AnalyticsStore(settings.analytics_dir)
+
+    # Every worker and writer on the host shares the dataset version, so a
+    # write anywhere clears the cache and changes the ETags of every worker
+    response_cache = ResponseCache(
+        max_entries=settings.response_cache_max_entries,
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        dataset_version=DatasetVersion(settings.dataset_version_file),
+    )
+
+    # Store Settings, DatabaseManager, the grid stores and ResponseCache in app
+    # state for global access
     app.state.settings = settings
     app.state.db_manager = db_manager
+    app.state.grid_index = grid_index
+    app.state.grid_pyramid = grid_pyramid
+    app.state.timeseries_store = timeseries_store
+    app.state.analytics_store = analytics_store
+    app.state.response_cache = response_cache
 
     try:
         yield
     finally:
         # Clean up resources here
+        await db_manager.dispose_async()
         logging.info("Additional resources cleaned up.")
 
 
@@ -39,6 +98,63 @@ app = FastAPI(
 app.include_router(air_quality.router)
 
 
+def is_cached_read(request: Request) -> bool:
+    # Only the reads served by the cached service change with the dataset
+    # version; the grid, time-series and analytics stores are files of their own
+    if request.method != "GET":
+        return False
+    for route in air_quality.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.name in air_quality.CACHED_READ_ROUTES
+    return False
+
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    # Cached reads only change when the dataset version does, so the version
+    # and the request's URL make a validator for conditional GETs
+    cache: ResponseCache = getattr(request.app.state, "response_cache", None)
+    if cache is None or not is_cached_read(request):
+        return await call_next(request)
+
+    resource = f"{request.url.path}?{request.url.query}"
+    etag = cache.etag(resource)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response = await call_next(request)
+    if response.status_code == 200 and cache.etag(resource) == etag:
+        response.headers["ETag"] = etag
+    return response
+
+
+@app.exception_handler(ReadOnlyRepositoryError)
+def read_only_repository_error_handler(request: Request, exc: ReadOnlyRepositoryError):
+    return JSONResponse(status_code=405, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidCursorError)
+def invalid_cursor_error_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidBulkDataError)
+def invalid_bulk_data_error_handler(request: Request, exc: InvalidBulkDataError):
+    return JSONResponse(status_code=422, content={"detail": exc.errors})
+
+
+@app.exception_handler(GridTooLargeError)
+def grid_too_large_error_handler(request: Request, exc: GridTooLargeError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(GridUnavailableError)
+def grid_unavailable_error_handler(request: Request, exc: GridUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Air Quality API"}
@@ -47,3 +163,12 @@ def read_root():
 @app.get("/health", tags=["Health Check"])
 def health_check():
     return {"status": "API is running"}
+
+
+@app.get("/health/pool", tags=["Health Check"])
+def pool_health_check(request: Request):
+    """
+    Connection pool occupancy (checked out, overflow) and the time spent
+    obtaining connections, per engine, for this worker process.
+    """
+    return request.app.state.db_manager.get_pool_status()
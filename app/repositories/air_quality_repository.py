@@ -1,17 +1,169 @@
-from typing import Optional
+from typing import Iterator, Optional, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import Select, delete, desc, func, or_, select, tuple_, update
 
 from app.db.models.air_quality import AirQualityData
+from app.db.parquet_handler import BoundingBox
+from app.repositories.air_quality_summary_repository import (
+    AirQualitySummaryRepository,
+    lat_band_expression,
+)
+from app.utils.quantile_sketch import QuantileSketch
+from app.utils.spatial_utils import get_grid_cell_ranges
+
+
+def _region_filters(
+    lat_min: float, lat_max: float, long_min: float, long_max: float
+) -> list:
+    # Seek the grid cell ranges covering the box, then filter exact bounds
+    grid_cell_ranges = get_grid_cell_ranges(lat_min, lat_max, long_min, long_max)
+    return [
+        or_(
+            *(
+                AirQualityData.grid_cell.between(start, end)
+                for start, end in grid_cell_ranges
+            )
+        ),
+        AirQualityData.latitude.between(lat_min, lat_max),
+        AirQualityData.longitude.between(long_min, long_max),
+    ]
+
+
+# Column order of the row tuples returned by the *_rows methods, matching the
+# field order of AirQualityResponse
+RECORD_COLUMNS = ("year", "latitude", "longitude", "pm25_level", "id")
+
+
+def _select_records(
+    year: Optional[int] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    bbox: Optional[BoundingBox] = None,
+) -> Select:
+    query = select(*(getattr(AirQualityData, name) for name in RECORD_COLUMNS))
+    if year is not None:
+        query = query.where(AirQualityData.year == year)
+    if latitude is not None:
+        query = query.where(AirQualityData.latitude == latitude)
+    if longitude is not None:
+        query = query.where(AirQualityData.longitude == longitude)
+    if bbox is not None:
+        query = query.where(*_region_filters(*bbox))
+    return query
+
+
+def _predicate_filters(
+    year: Optional[int] = None,
+    bbox: Optional[BoundingBox] = None,
+    pm25_min: Optional[float] = None,
+    pm25_max: Optional[float] = None,
+) -> list:
+    # Rows without a PM2.5 value never match a PM2.5 range
+    filters = []
+    if year is not None:
+        filters.append(AirQualityData.year == year)
+    if bbox is not None:
+        filters.extend(_region_filters(*bbox))
+    if pm25_min is not None:
+        filters.append(AirQualityData.pm25_level >= pm25_min)
+    if pm25_max is not None:
+        filters.append(AirQualityData.pm25_level <= pm25_max)
+    if not filters:
+        raise ValueError("A predicate needs at least one condition")
+    return filters
+
+
+def _select_matching_groups(filters: list) -> Select:
+    # Summary groups holding rows matched by the filters
+    return select(AirQualityData.year, lat_band_expression()).where(*filters).distinct()
+
+
+def _affected_groups(matched_groups, updates: dict) -> set[tuple[int, int]]:
+    groups = {(year, lat_band) for year, lat_band in matched_groups}
+    if "year" in updates:
+        groups |= {(updates["year"], lat_band) for _, lat_band in groups}
+    return groups
+
+
+def _summary_key(record: AirQualityData) -> tuple:
+    return record.year, record.grid_cell, record.pm25_level
 
 
 class AirQualityRepository:
+    """
+    The *_rows methods are the read path of the API: they select plain
+    RECORD_COLUMNS tuples with Core, skipping ORM object construction.
+    """
+
     def __init__(self, db: Session):
         self.db = db
+        self.summary = AirQualitySummaryRepository(db)
 
     def get_all(self, skip: int = 0, limit: int = 100) -> list[AirQualityData]:
         return self.db.query(AirQualityData).offset(skip).limit(limit).all()
 
+    def _rows(self, query: Select) -> list[tuple]:
+        return [tuple(row) for row in self.db.execute(query)]
+
+    def get_all_rows(self, skip: int = 0, limit: int = 100) -> list[tuple]:
+        return self._rows(_select_records().offset(skip).limit(limit))
+
+    def get_page_rows(
+        self,
+        limit: int = 100,
+        after: Optional[tuple[int, int]] = None,
+        year: Optional[int] = None,
+        bbox: Optional[BoundingBox] = None,
+    ) -> list[tuple]:
+        """
+        Return the next page in (year, id) order, starting after the
+        (year, id) key of the previous page's last record. Seeking on the
+        composite index keeps every page as cheap as the first.
+        """
+        query = _select_records(year=year, bbox=bbox)
+        if after is not None:
+            query = query.where(
+                tuple_(AirQualityData.year, AirQualityData.id) > tuple_(*after)
+            )
+        return self._rows(
+            query.order_by(AirQualityData.year, AirQualityData.id).limit(limit)
+        )
+
+    def filter_rows(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[tuple]:
+        return self._rows(
+            _select_records(year=year, latitude=latitude, longitude=longitude)
+        )
+
+    def get_rows_within_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[tuple]:
+        return self._rows(_select_records(bbox=(lat_min, lat_max, long_min, long_max)))
+
+    def iter_record_batches(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        bbox: Optional[BoundingBox] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[tuple]]:
+        """
+        Yield matching rows as RECORD_COLUMNS tuples in (year, id) order,
+        batch_size rows at a time from a server-side cursor.
+        """
+        query = _select_records(
+            year=year, latitude=latitude, longitude=longitude, bbox=bbox
+        ).order_by(AirQualityData.year, AirQualityData.id)
+
+        result = self.db.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
     def get_by_id(self, record_id: int) -> Optional[AirQualityData]:
         return (
             self.db.query(AirQualityData).filter(AirQualityData.id == record_id).first()
@@ -19,21 +171,69 @@ class AirQualityRepository:
 
     def create(self, data: AirQualityData) -> AirQualityData:
         self.db.add(data)
+        # Flushing sets grid_cell, see AirQualityData.set_grid_cell
+        self.db.flush()
+        self.summary.record_changes(added=[_summary_key(data)])
         self.db.commit()
         self.db.refresh(data)
         return data
 
     def update(self, record: AirQualityData, updates: dict) -> AirQualityData:
+        removed = _summary_key(record)
         for key, value in updates.items():
             setattr(record, key, value)
+        self.db.flush()
+        self.summary.record_changes(
+            removed=[removed], added=[_summary_key(record)]
+        )
         self.db.commit()
         self.db.refresh(record)
         return record
 
     def delete(self, record: AirQualityData) -> None:
+        removed = _summary_key(record)
         self.db.delete(record)
+        self.db.flush()
+        self.summary.record_changes(removed=[removed])
         self.db.commit()
 
+    def count_matching(self, **predicate) -> int:
+        """Rows an update_matching or delete_matching call would affect."""
+        query = select(func.count()).where(*_predicate_filters(**predicate))
+        return self.db.execute(query).scalar_one()
+
+    def update_matching(self, updates: dict, **predicate) -> int:
+        """
+        Set year and/or pm25_level on every row matching the predicate (year,
+        bbox, pm25_min, pm25_max) with one UPDATE, refreshing the affected
+        summary groups in the same transaction. Returns the affected row count.
+        """
+        filters = _predicate_filters(**predicate)
+        groups = _affected_groups(
+            self.db.execute(_select_matching_groups(filters)), updates
+        )
+        result = self.db.execute(
+            update(AirQualityData)
+            .where(*filters)
+            .values(**updates)
+            .execution_options(synchronize_session=False)
+        )
+        self.summary.refresh_groups(groups)
+        self.db.commit()
+        return result.rowcount
+
+    def delete_matching(self, **predicate) -> int:
+        filters = _predicate_filters(**predicate)
+        groups = _affected_groups(self.db.execute(_select_matching_groups(filters)), {})
+        result = self.db.execute(
+            delete(AirQualityData)
+            .where(*filters)
+            .execution_options(synchronize_session=False)
+        )
+        self.summary.refresh_groups(groups)
+        self.db.commit()
+        return result.rowcount
+
     def filter(
         self,
         year: Optional[int] = None,
@@ -49,56 +249,52 @@ class AirQualityRepository:
             query = query.filter(AirQualityData.longitude == longitude)
         return query.all()
 
-    def get_stats(self) -> dict:
-        stats = self.db.query(
-            func.count(AirQualityData.id),
-            func.avg(AirQualityData.pm25_level),
-            func.min(AirQualityData.pm25_level),
-            func.max(AirQualityData.pm25_level),
-        ).first()
-        return {
-            "count": stats[0],
-            "average_pm25": float(stats[1]) if stats[1] is not None else 0.0,
-            "min_pm25": float(stats[2]) if stats[2] is not None else 0.0,
-            "max_pm25": float(stats[3]) if stats[3] is not None else 0.0,
-        }
+    def _refresh_stale_bounds(self, year: Optional[int] = None) -> None:
+        # Bounds a write left stale are recomputed by the first read after it
+        if self.summary.refresh_stale_bounds(year):
+            self.db.commit()
+
+    def get_stats(self, year: Optional[int] = None) -> dict:
+        # Read from the per-year summary, not air_quality_data
+        self._refresh_stale_bounds(year)
+        return self.summary.get_stats(year=year)
+
+    def get_stats_by_year(self) -> list[dict]:
+        self._refresh_stale_bounds()
+        return self.summary.get_stats_by_year()
 
     def get_data_within_region(
         self, lat_min: float, lat_max: float, long_min: float, long_max: float
     ) -> list[AirQualityData]:
         return (
             self.db.query(AirQualityData)
-            .filter(
-                AirQualityData.latitude.between(lat_min, lat_max),
-                AirQualityData.longitude.between(long_min, long_max),
-            )
+            .filter(*_region_filters(lat_min, lat_max, long_min, long_max))
             .all()
         )
 
     def get_top_polluted_locations(
-        self, year: int, top_n: int = 10
+        self, year: int, top_n: int = 10, bbox: Optional[BoundingBox] = None
     ) -> list[AirQualityData]:
-        return (
-            self.db.query(AirQualityData)
-            .filter(AirQualityData.year == year)
-            .order_by(desc(AirQualityData.pm25_level))
-            .limit(top_n)
-            .all()
+        # Walks ix_air_quality_data_year_pm25_level from the top of the year;
+        # missing values would otherwise sort first in PostgreSQL
+        query = self.db.query(AirQualityData).filter(
+            AirQualityData.year == year, AirQualityData.pm25_level.isnot(None)
         )
+        if bbox is not None:
+            query = query.filter(*_region_filters(*bbox))
+        return query.order_by(desc(AirQualityData.pm25_level)).limit(top_n).all()
+
+    def get_pm25_bounds(
+        self, year: Optional[int] = None
+    ) -> Optional[tuple[float, float]]:
+        # Precomputed in air_quality_summary and kept current by every write
+        self._refresh_stale_bounds(year)
+        return self.summary.get_pm25_bounds(year=year)
 
-    def get_pm25_normalized(self) -> list[AirQualityData]:
-        # To normalize PM2.5 levels between 0 and 1
-        min_pm25 = self.db.query(func.min(AirQualityData.pm25_level)).scalar()
-        max_pm25 = self.db.query(func.max(AirQualityData.pm25_level)).scalar()
-        if min_pm25 is None or max_pm25 is None or max_pm25 == min_pm25:
-            return []
-        normalized_data = self.db.query(
-            AirQualityData.id,
-            AirQualityData.year,
-            AirQualityData.latitude,
-            AirQualityData.longitude,
-            ((AirQualityData.pm25_level - min_pm25) / (max_pm25 - min_pm25)).label(
-                "pm25_level_normalized"
-            ),
-        ).all()
-        return normalized_data
+    def get_pm25_sketch(
+        self,
+        years: Optional[Sequence[int]] = None,
+        lat_bands: Optional[tuple[int, int]] = None,
+    ) -> QuantileSketch:
+        # Merged from the per-group histograms kept next to the summary
+        return self.summary.get_pm25_sketch(years=years, lat_bands=lat_bands)
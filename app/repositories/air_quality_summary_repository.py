@@ -0,0 +1,569 @@
+import math
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import (
+    Connection,
+    Float,
+    Integer,
+    case,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.models.air_quality import AirQualityData
+from app.db.models.air_quality_pm25_histogram import AirQualityPM25Histogram
+from app.db.models.air_quality_summary import UNKNOWN_LAT_BAND, AirQualitySummary
+from app.utils import quantile_sketch
+from app.utils.quantile_sketch import QuantileSketch
+from app.utils.spatial_utils import (
+    GRID_COLUMNS,
+    GRID_ROWS_PER_LAT_BAND,
+    LAT_BAND_DEGREES,
+    get_lat_band,
+    get_lat_band_grid_cell_range,
+)
+
+SUMMARY_TABLE = AirQualitySummary.__table__
+SUMMARY_COLUMNS = [
+    "year",
+    "lat_band",
+    "row_count",
+    "pm25_count",
+    "pm25_sum",
+    "pm25_min",
+    "pm25_max",
+]
+
+# (year, grid_cell, pm25_level) of a row added to or removed from the table
+RowChange = tuple[int, Optional[int], Optional[float]]
+
+# (year, lat_band, row_count, pm25_count, pm25_sum, pm25_min, pm25_max) of rows
+# added to one group at once
+GroupAggregate = tuple[int, int, int, int, float, Optional[float], Optional[float]]
+
+HISTOGRAM_TABLE = AirQualityPM25Histogram.__table__
+HISTOGRAM_COLUMNS = ["year", "lat_band", "bucket", "count"]
+
+# Change in the count of one (year, lat_band, bucket) of the PM2.5 histogram
+BucketCounts = dict[tuple[int, int, int], int]
+
+
+def lat_band_expression():
+    # Same arithmetic as spatial_utils.get_lat_band, on integers in SQL
+    return func.coalesce(
+        AirQualityData.grid_cell
+        // GRID_COLUMNS
+        // GRID_ROWS_PER_LAT_BAND
+        * LAT_BAND_DEGREES
+        - 90,
+        UNKNOWN_LAT_BAND,
+    )
+
+
+def _bucket_edges():
+    # Exact bounds of every bucket as bucket_index assigns values, NULL where
+    # the bucket is unbounded, as an inline VALUES list
+    lower_bounds = quantile_sketch.BUCKET_LOWER_BOUNDS.tolist()
+    last_bucket = quantile_sketch.BUCKET_COUNT - 1
+    edges = values(
+        column("bucket", Integer),
+        column("lower_bound", Float),
+        column("upper_bound", Float),
+        name="pm25_bucket_edges",
+        literal_binds=True,
+    ).data(
+        [
+            (
+                bucket,
+                lower_bounds[bucket] if bucket > 0 else None,
+                lower_bounds[bucket + 1] if bucket < last_bucket else None,
+            )
+            for bucket in range(quantile_sketch.BUCKET_COUNT)
+        ]
+    )
+    return edges.cte("pm25_bucket_edges")
+
+
+def _estimated_bucket():
+    # quantile_sketch.bucket_index in SQL; the database's ln() may round a
+    # value next to a bucket edge into the neighbouring bucket
+    pm25_level = AirQualityData.pm25_level
+    ratio = pm25_level / quantile_sketch.MIN_VALUE
+    lower_bounds = quantile_sketch.BUCKET_LOWER_BOUNDS
+    return case(
+        (pm25_level >= lower_bounds[-1], quantile_sketch.BUCKET_COUNT - 1),
+        (
+            pm25_level >= lower_bounds[1],
+            cast(func.ceil(func.ln(ratio) / quantile_sketch.LOG_GAMMA), Integer),
+        ),
+        else_=0,
+    )
+
+
+def bucket_expression(edges):
+    """
+    Bucket of each PM2.5 level, exactly as quantile_sketch.bucket_index puts
+    it: the estimate joined to its row of edges is moved into the
+    neighbouring bucket when the level falls outside that bucket's bounds.
+    """
+    pm25_level = AirQualityData.pm25_level
+    return case(
+        (pm25_level < edges.c.lower_bound, edges.c.bucket - 1),
+        (pm25_level >= edges.c.upper_bound, edges.c.bucket + 1),
+        else_=edges.c.bucket,
+    )
+
+
+def _select_bucket_counts():
+    edges = _bucket_edges()
+    lat_band = lat_band_expression()
+    bucket = bucket_expression(edges)
+    return (
+        select(AirQualityData.year, lat_band, bucket, func.count())
+        .select_from(AirQualityData)
+        .join(edges, edges.c.bucket == _estimated_bucket())
+        .where(AirQualityData.pm25_level.isnot(None))
+        .group_by(AirQualityData.year, lat_band, bucket)
+    )
+
+
+# Dialects whose INSERT ... ON CONFLICT DO UPDATE applies summary deltas, so
+# concurrent writes into a new group cannot both insert it
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _in_lat_band(lat_band: int):
+    if lat_band == UNKNOWN_LAT_BAND:
+        return AirQualityData.grid_cell.is_(None)
+    return AirQualityData.grid_cell.between(*get_lat_band_grid_cell_range(lat_band))
+
+
+def _select_aggregates():
+    lat_band = lat_band_expression()
+    return select(
+        AirQualityData.year,
+        lat_band,
+        func.count(AirQualityData.id),
+        func.count(AirQualityData.pm25_level),
+        func.coalesce(func.sum(AirQualityData.pm25_level), 0.0),
+        func.min(AirQualityData.pm25_level),
+        func.max(AirQualityData.pm25_level),
+    ).group_by(AirQualityData.year, lat_band)
+
+
+def rebuild_air_quality_summary(
+    conn: Connection, years: Optional[Iterable[int]] = None
+) -> None:
+    """
+    Recompute the summary rows and PM2.5 histogram of the given years
+    (default: all) from scratch.
+    """
+    delete_summary = delete(SUMMARY_TABLE)
+    delete_histogram = delete(HISTOGRAM_TABLE)
+    aggregates = _select_aggregates()
+    bucket_counts = _select_bucket_counts()
+    if years is not None:
+        years = list(years)
+        delete_summary = delete_summary.where(SUMMARY_TABLE.c.year.in_(years))
+        delete_histogram = delete_histogram.where(HISTOGRAM_TABLE.c.year.in_(years))
+        aggregates = aggregates.where(AirQualityData.year.in_(years))
+        bucket_counts = bucket_counts.where(AirQualityData.year.in_(years))
+    conn.execute(delete_summary)
+    conn.execute(insert(SUMMARY_TABLE).from_select(SUMMARY_COLUMNS, aggregates))
+    conn.execute(delete_histogram)
+    conn.execute(
+        insert(HISTOGRAM_TABLE).from_select(HISTOGRAM_COLUMNS, bucket_counts)
+    )
+
+
+def _lat_bands(grid_cells: np.ndarray) -> np.ndarray:
+    # Rows without a grid cell, masked in grid_cells, are in UNKNOWN_LAT_BAND
+    grid_cells = np.ma.asarray(grid_cells)
+    return np.ma.filled(get_lat_band(grid_cells), UNKNOWN_LAT_BAND)
+
+
+def aggregate_rows(
+    years: np.ndarray, grid_cells: np.ndarray, pm25_levels: np.ndarray
+) -> list[GroupAggregate]:
+    """Aggregate added rows per (year, lat_band) group, NaN as missing PM2.5."""
+    df = pd.DataFrame(
+        {
+            "year": years,
+            "lat_band": _lat_bands(grid_cells),
+            "pm25_level": pm25_levels,
+        }
+    )
+    grouped = df.groupby(["year", "lat_band"])["pm25_level"].agg(
+        ["size", "count", "sum", "min", "max"]
+    )
+    return [
+        (
+            int(year),
+            int(lat_band),
+            int(row["size"]),
+            int(row["count"]),
+            float(row["sum"]),
+            _pm25_value(float(row["min"])),
+            _pm25_value(float(row["max"])),
+        )
+        for (year, lat_band), row in grouped.iterrows()
+    ]
+
+
+def aggregate_buckets(
+    years: np.ndarray, grid_cells: np.ndarray, pm25_levels: np.ndarray
+) -> BucketCounts:
+    """Count added PM2.5 values per (year, lat_band, bucket), skipping NaN."""
+    pm25_levels = np.asarray(pm25_levels, dtype=np.float64)
+    valid = ~np.isnan(pm25_levels)
+    df = pd.DataFrame(
+        {
+            "year": np.asarray(years)[valid],
+            "lat_band": _lat_bands(grid_cells)[valid],
+            "bucket": quantile_sketch.bucket_index(pm25_levels[valid]),
+        }
+    )
+    counts = df.groupby(["year", "lat_band", "bucket"]).size()
+    return {
+        (int(year), int(lat_band), int(bucket)): int(count)
+        for (year, lat_band, bucket), count in counts.items()
+    }
+
+
+def _pm25_value(pm25_level: Optional[float]) -> Optional[float]:
+    if pm25_level is None or math.isnan(pm25_level):
+        return None
+    return pm25_level
+
+
+def _stats(row) -> dict:
+    count, pm25_count, pm25_sum, min_pm25, max_pm25 = row
+    return {
+        "count": count or 0,
+        "average_pm25": pm25_sum / pm25_count if pm25_count else 0.0,
+        "min_pm25": min_pm25 if min_pm25 is not None else 0.0,
+        "max_pm25": max_pm25 if max_pm25 is not None else 0.0,
+    }
+
+
+class AirQualitySummaryRepository:
+    """
+    Reads and maintains air_quality_summary and the PM2.5 histogram next to
+    it. Changes are applied as deltas in the caller's transaction. Removing
+    a group's current minimum or maximum only marks its bounds stale; they
+    are recomputed from that group's rows by refresh_stale_bounds, which
+    callers run before reading them.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_changes(
+        self, removed: Iterable[RowChange] = (), added: Iterable[RowChange] = ()
+    ) -> None:
+        """
+        Apply rows removed from and added to air_quality_data, without
+        reading air_quality_data itself.
+        """
+        bucket_counts: BucketCounts = {}
+
+        def count_bucket(group: tuple[int, int], pm25_level, delta: int):
+            if pm25_level is not None:
+                key = (*group, int(quantile_sketch.bucket_index(pm25_level)))
+                bucket_counts[key] = bucket_counts.get(key, 0) + delta
+
+        for year, grid_cell, pm25_level in removed:
+            group = self._group(year, grid_cell)
+            pm25_level = _pm25_value(pm25_level)
+            if self._is_group_bound(group, pm25_level):
+                self._mark_bounds_stale(group)
+            self._apply_removal(group, pm25_level)
+            count_bucket(group, pm25_level, -1)
+
+        for year, grid_cell, pm25_level in added:
+            group = self._group(year, grid_cell)
+            pm25_level = _pm25_value(pm25_level)
+            self._apply_addition(group, pm25_level)
+            count_bucket(group, pm25_level, 1)
+
+        self.record_bucket_counts(bucket_counts)
+
+    def refresh_stale_bounds(self, year: Optional[int] = None) -> int:
+        """
+        Recompute the minimum and maximum of the groups (of one year, or all)
+        whose bounds record_changes marked stale, each from its own rows.
+        Returns the number of groups refreshed, which callers commit.
+
+        The stale group rows are locked first, in key order. A concurrent
+        caller waits for the first one to commit, then finds the groups no
+        longer stale instead of recomputing them again.
+        """
+        query = (
+            select(SUMMARY_TABLE.c.year, SUMMARY_TABLE.c.lat_band)
+            .where(SUMMARY_TABLE.c.pm25_bounds_stale.is_(True))
+            .order_by(SUMMARY_TABLE.c.year, SUMMARY_TABLE.c.lat_band)
+            .with_for_update()
+        )
+        if year is not None:
+            query = query.where(SUMMARY_TABLE.c.year == year)
+        groups = [tuple(row) for row in self.db.execute(query)]
+        for group in groups:
+            group_year, lat_band = group
+            rows = select(
+                func.min(AirQualityData.pm25_level),
+                func.max(AirQualityData.pm25_level),
+            ).where(AirQualityData.year == group_year, _in_lat_band(lat_band))
+            pm25_min, pm25_max = self.db.execute(rows).one()
+            self.db.execute(
+                update(SUMMARY_TABLE)
+                .where(self._where_group(group))
+                .values(
+                    pm25_min=pm25_min, pm25_max=pm25_max, pm25_bounds_stale=False
+                )
+            )
+        return len(groups)
+
+    def refresh_groups(self, groups: Iterable[tuple[int, int]]) -> None:
+        """Recompute the given (year, lat_band) groups from air_quality_data."""
+        for group in groups:
+            self._refresh_group(group)
+
+    def record_aggregates(self, aggregates: Iterable[GroupAggregate]) -> None:
+        """Apply rows added in bulk, pre-aggregated per (year, lat_band) group."""
+        for year, lat_band, *aggregate in aggregates:
+            self._apply_aggregate((year, lat_band), *aggregate)
+
+    def record_bucket_counts(self, bucket_counts: BucketCounts) -> None:
+        """Add count deltas to the PM2.5 histogram, dropping emptied buckets."""
+        bucket_counts = {key: delta for key, delta in bucket_counts.items() if delta}
+        if not bucket_counts:
+            return
+        upsert = self._insert(HISTOGRAM_TABLE)
+        self.db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=HISTOGRAM_TABLE.primary_key.columns,
+                set_={"count": HISTOGRAM_TABLE.c.count + upsert.excluded.count},
+            ),
+            [
+                {"year": year, "lat_band": lat_band, "bucket": bucket, "count": delta}
+                for (year, lat_band, bucket), delta in bucket_counts.items()
+            ],
+        )
+        if any(delta < 0 for delta in bucket_counts.values()):
+            in_groups = or_(
+                *(
+                    self._where_histogram_group((year, lat_band))
+                    for year, lat_band in {key[:2] for key in bucket_counts}
+                )
+            )
+            self.db.execute(
+                delete(HISTOGRAM_TABLE).where(in_groups, HISTOGRAM_TABLE.c.count <= 0)
+            )
+
+    def get_stats(self, year: Optional[int] = None) -> dict:
+        query = select(
+            func.sum(SUMMARY_TABLE.c.row_count),
+            func.sum(SUMMARY_TABLE.c.pm25_count),
+            func.sum(SUMMARY_TABLE.c.pm25_sum),
+            func.min(SUMMARY_TABLE.c.pm25_min),
+            func.max(SUMMARY_TABLE.c.pm25_max),
+        )
+        if year is not None:
+            query = query.where(SUMMARY_TABLE.c.year == year)
+        return _stats(self.db.execute(query).one())
+
+    def get_pm25_bounds(
+        self, year: Optional[int] = None
+    ) -> Optional[tuple[float, float]]:
+        query = select(
+            func.min(SUMMARY_TABLE.c.pm25_min), func.max(SUMMARY_TABLE.c.pm25_max)
+        )
+        if year is not None:
+            query = query.where(SUMMARY_TABLE.c.year == year)
+        min_pm25, max_pm25 = self.db.execute(query).one()
+        return None if min_pm25 is None else (min_pm25, max_pm25)
+
+    def get_stats_by_year(self) -> list[dict]:
+        query = (
+            select(
+                SUMMARY_TABLE.c.year,
+                func.sum(SUMMARY_TABLE.c.row_count),
+                func.sum(SUMMARY_TABLE.c.pm25_count),
+                func.sum(SUMMARY_TABLE.c.pm25_sum),
+                func.min(SUMMARY_TABLE.c.pm25_min),
+                func.max(SUMMARY_TABLE.c.pm25_max),
+            )
+            .group_by(SUMMARY_TABLE.c.year)
+            .order_by(SUMMARY_TABLE.c.year)
+        )
+        return [
+            {"year": row[0], **_stats(row[1:])} for row in self.db.execute(query)
+        ]
+
+    def get_pm25_sketch(
+        self,
+        years: Optional[Sequence[int]] = None,
+        lat_bands: Optional[tuple[int, int]] = None,
+    ) -> QuantileSketch:
+        """
+        The PM2.5 histograms of the given years and the inclusive range of
+        latitude bands (default: all, including rows without coordinates),
+        merged into one sketch.
+        """
+        query = select(
+            HISTOGRAM_TABLE.c.bucket, func.sum(HISTOGRAM_TABLE.c.count)
+        ).group_by(HISTOGRAM_TABLE.c.bucket)
+        if years is not None:
+            query = query.where(HISTOGRAM_TABLE.c.year.in_(list(years)))
+        if lat_bands is not None:
+            query = query.where(HISTOGRAM_TABLE.c.lat_band.between(*lat_bands))
+        return QuantileSketch.from_bucket_counts(
+            (bucket, int(count)) for bucket, count in self.db.execute(query)
+        )
+
+    def _insert(self, table):
+        return UPSERT_INSERTS[self.db.get_bind().dialect.name](table)
+
+    @staticmethod
+    def _group(year: int, grid_cell: Optional[int]) -> tuple[int, int]:
+        if grid_cell is None:
+            return year, UNKNOWN_LAT_BAND
+        return year, get_lat_band(grid_cell)
+
+    @staticmethod
+    def _where_group(group: tuple[int, int]):
+        year, lat_band = group
+        return (SUMMARY_TABLE.c.year == year) & (SUMMARY_TABLE.c.lat_band == lat_band)
+
+    @staticmethod
+    def _where_histogram_group(group: tuple[int, int]):
+        year, lat_band = group
+        return (HISTOGRAM_TABLE.c.year == year) & (
+            HISTOGRAM_TABLE.c.lat_band == lat_band
+        )
+
+    def _is_group_bound(
+        self, group: tuple[int, int], pm25_level: Optional[float]
+    ) -> bool:
+        if pm25_level is None:
+            return False
+        bounds = self.db.execute(
+            select(SUMMARY_TABLE.c.pm25_min, SUMMARY_TABLE.c.pm25_max).where(
+                self._where_group(group)
+            )
+        ).first()
+        return bounds is not None and (
+            bounds.pm25_min is None
+            or pm25_level <= bounds.pm25_min
+            or pm25_level >= bounds.pm25_max
+        )
+
+    def _mark_bounds_stale(self, group: tuple[int, int]):
+        self.db.execute(
+            update(SUMMARY_TABLE)
+            .where(self._where_group(group))
+            .values(pm25_bounds_stale=True)
+        )
+
+    def _apply_addition(self, group: tuple[int, int], pm25_level: Optional[float]):
+        if pm25_level is None:
+            self._apply_aggregate(group, 1, 0, 0.0, None, None)
+        else:
+            self._apply_aggregate(group, 1, 1, pm25_level, pm25_level, pm25_level)
+
+    def _apply_aggregate(
+        self,
+        group: tuple[int, int],
+        row_count: int,
+        pm25_count: int,
+        pm25_sum: float,
+        pm25_min: Optional[float],
+        pm25_max: Optional[float],
+    ):
+        year, lat_band = group
+        upsert = self._insert(SUMMARY_TABLE).values(
+            year=year,
+            lat_band=lat_band,
+            row_count=row_count,
+            pm25_count=pm25_count,
+            pm25_sum=pm25_sum,
+            pm25_min=pm25_min,
+            pm25_max=pm25_max,
+        )
+        added = upsert.excluded
+        group_min, group_max = SUMMARY_TABLE.c.pm25_min, SUMMARY_TABLE.c.pm25_max
+        self.db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=SUMMARY_TABLE.primary_key.columns,
+                set_={
+                    "row_count": SUMMARY_TABLE.c.row_count + added.row_count,
+                    "pm25_count": SUMMARY_TABLE.c.pm25_count + added.pm25_count,
+                    "pm25_sum": SUMMARY_TABLE.c.pm25_sum + added.pm25_sum,
+                    # A NULL bound of the added rows compares false and is ignored
+                    "pm25_min": case(
+                        (
+                            or_(group_min.is_(None), group_min > added.pm25_min),
+                            added.pm25_min,
+                        ),
+                        else_=group_min,
+                    ),
+                    "pm25_max": case(
+                        (
+                            or_(group_max.is_(None), group_max < added.pm25_max),
+                            added.pm25_max,
+                        ),
+                        else_=group_max,
+                    ),
+                },
+            )
+        )
+
+    def _apply_removal(self, group: tuple[int, int], pm25_level: Optional[float]):
+        # The group's bounds are left as they are: still exact for a value
+        # strictly inside them, marked stale by the caller otherwise
+        values = {"row_count": SUMMARY_TABLE.c.row_count - 1}
+        if pm25_level is not None:
+            values.update(
+                pm25_count=SUMMARY_TABLE.c.pm25_count - 1,
+                pm25_sum=SUMMARY_TABLE.c.pm25_sum - pm25_level,
+            )
+        self.db.execute(
+            update(SUMMARY_TABLE).where(self._where_group(group)).values(**values)
+        )
+        self.db.execute(
+            delete(SUMMARY_TABLE).where(
+                self._where_group(group), SUMMARY_TABLE.c.row_count <= 0
+            )
+        )
+
+    def _refresh_group(self, group: tuple[int, int]):
+        year, lat_band = group
+        in_band = _in_lat_band(lat_band)
+        self.db.execute(delete(SUMMARY_TABLE).where(self._where_group(group)))
+        self.db.execute(
+            insert(SUMMARY_TABLE).from_select(
+                SUMMARY_COLUMNS,
+                _select_aggregates().where(AirQualityData.year == year, in_band),
+            )
+        )
+        self.db.execute(
+            delete(HISTOGRAM_TABLE).where(self._where_histogram_group(group))
+        )
+        self.db.execute(
+            insert(HISTOGRAM_TABLE).from_select(
+                HISTOGRAM_COLUMNS,
+                _select_bucket_counts().where(AirQualityData.year == year, in_band),
+            )
+        )
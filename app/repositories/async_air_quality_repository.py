@@ -0,0 +1,196 @@
+from typing import AsyncIterator, Callable, Optional, Sequence, TypeVar
+
+from sqlalchemy import Select, delete, desc, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.air_quality import AirQualityData
+from app.db.parquet_handler import BoundingBox
+from app.repositories.air_quality_repository import (
+    _affected_groups,
+    _predicate_filters,
+    _region_filters,
+    _select_matching_groups,
+    _select_records,
+    _summary_key,
+)
+from app.repositories.air_quality_summary_repository import (
+    AirQualitySummaryRepository,
+)
+from app.utils.quantile_sketch import QuantileSketch
+
+T = TypeVar("T")
+
+
+class AsyncAirQualityRepository:
+    """
+    AirQualityRepository over an AsyncSession, with the same queries and
+    methods as coroutines. Summary maintenance and reads reuse the sync
+    AirQualitySummaryRepository on the session's underlying sync Session.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _summary(self, call: Callable[[AirQualitySummaryRepository], T]) -> T:
+        return await self.db.run_sync(
+            lambda session: call(AirQualitySummaryRepository(session))
+        )
+
+    async def _rows(self, query: Select) -> list[tuple]:
+        return [tuple(row) for row in await self.db.execute(query)]
+
+    async def get_all_rows(self, skip: int = 0, limit: int = 100) -> list[tuple]:
+        return await self._rows(_select_records().offset(skip).limit(limit))
+
+    async def get_page_rows(
+        self,
+        limit: int = 100,
+        after: Optional[tuple[int, int]] = None,
+        year: Optional[int] = None,
+        bbox: Optional[BoundingBox] = None,
+    ) -> list[tuple]:
+        query = _select_records(year=year, bbox=bbox)
+        if after is not None:
+            query = query.where(
+                tuple_(AirQualityData.year, AirQualityData.id) > tuple_(*after)
+            )
+        return await self._rows(
+            query.order_by(AirQualityData.year, AirQualityData.id).limit(limit)
+        )
+
+    async def filter_rows(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[tuple]:
+        return await self._rows(
+            _select_records(year=year, latitude=latitude, longitude=longitude)
+        )
+
+    async def get_rows_within_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[tuple]:
+        return await self._rows(
+            _select_records(bbox=(lat_min, lat_max, long_min, long_max))
+        )
+
+    async def iter_record_batches(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        bbox: Optional[BoundingBox] = None,
+        batch_size: int = 10_000,
+    ) -> AsyncIterator[list[tuple]]:
+        query = _select_records(
+            year=year, latitude=latitude, longitude=longitude, bbox=bbox
+        ).order_by(AirQualityData.year, AirQualityData.id)
+
+        result = await self.db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+    async def get_by_id(self, record_id: int) -> Optional[AirQualityData]:
+        return await self.db.get(AirQualityData, record_id)
+
+    async def create(self, data: AirQualityData) -> AirQualityData:
+        self.db.add(data)
+        # Flushing sets grid_cell, see AirQualityData.set_grid_cell
+        await self.db.flush()
+        added = _summary_key(data)
+        await self._summary(lambda summary: summary.record_changes(added=[added]))
+        await self.db.commit()
+        await self.db.refresh(data)
+        return data
+
+    async def update(self, record: AirQualityData, updates: dict) -> AirQualityData:
+        removed = _summary_key(record)
+        for key, value in updates.items():
+            setattr(record, key, value)
+        await self.db.flush()
+        added = _summary_key(record)
+        await self._summary(
+            lambda summary: summary.record_changes(removed=[removed], added=[added])
+        )
+        await self.db.commit()
+        await self.db.refresh(record)
+        return record
+
+    async def delete(self, record: AirQualityData) -> None:
+        removed = _summary_key(record)
+        await self.db.delete(record)
+        await self.db.flush()
+        await self._summary(lambda summary: summary.record_changes(removed=[removed]))
+        await self.db.commit()
+
+    async def count_matching(self, **predicate) -> int:
+        query = select(func.count()).where(*_predicate_filters(**predicate))
+        return (await self.db.execute(query)).scalar_one()
+
+    async def update_matching(self, updates: dict, **predicate) -> int:
+        filters = _predicate_filters(**predicate)
+        groups = _affected_groups(
+            await self.db.execute(_select_matching_groups(filters)), updates
+        )
+        result = await self.db.execute(
+            update(AirQualityData)
+            .where(*filters)
+            .values(**updates)
+            .execution_options(synchronize_session=False)
+        )
+        await self._summary(lambda summary: summary.refresh_groups(groups))
+        await self.db.commit()
+        return result.rowcount
+
+    async def delete_matching(self, **predicate) -> int:
+        filters = _predicate_filters(**predicate)
+        groups = _affected_groups(
+            await self.db.execute(_select_matching_groups(filters)), {}
+        )
+        result = await self.db.execute(
+            delete(AirQualityData)
+            .where(*filters)
+            .execution_options(synchronize_session=False)
+        )
+        await self._summary(lambda summary: summary.refresh_groups(groups))
+        await self.db.commit()
+        return result.rowcount
+
+    async def _refresh_stale_bounds(self, year: Optional[int] = None) -> None:
+        if await self._summary(lambda summary: summary.refresh_stale_bounds(year)):
+            await self.db.commit()
+
+    async def get_stats(self, year: Optional[int] = None) -> dict:
+        await self._refresh_stale_bounds(year)
+        return await self._summary(lambda summary: summary.get_stats(year=year))
+
+    async def get_stats_by_year(self) -> list[dict]:
+        await self._refresh_stale_bounds()
+        return await self._summary(lambda summary: summary.get_stats_by_year())
+
+    async def get_top_polluted_locations(
+        self, year: int, top_n: int = 10, bbox: Optional[BoundingBox] = None
+    ) -> list[AirQualityData]:
+        query = select(AirQualityData).where(
+            AirQualityData.year == year, AirQualityData.pm25_level.isnot(None)
+        )
+        if bbox is not None:
+            query = query.where(*_region_filters(*bbox))
+        query = query.order_by(desc(AirQualityData.pm25_level)).limit(top_n)
+        return list((await self.db.scalars(query)).all())
+
+    async def get_pm25_bounds(
+        self, year: Optional[int] = None
+    ) -> Optional[tuple[float, float]]:
+        await self._refresh_stale_bounds(year)
+        return await self._summary(lambda summary: summary.get_pm25_bounds(year=year))
+
+    async def get_pm25_sketch(
+        self,
+        years: Optional[Sequence[int]] = None,
+        lat_bands: Optional[tuple[int, int]] = None,
+    ) -> QuantileSketch:
+        return await self._summary(
+            lambda summary: summary.get_pm25_sketch(years=years, lat_bands=lat_bands)
+        )
@@ -0,0 +1,377 @@
+import math
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+from app.db import parquet_handler
+from app.db.grid_pyramid import STRIPE_ROWS, GridPyramid, YearPyramid
+from app.db.models.air_quality import AirQualityData
+from app.errors.read_only_repository_error import ReadOnlyRepositoryError
+from app.repositories.air_quality_repository import RECORD_COLUMNS
+from app.utils.quantile_sketch import QuantileSketch
+from app.utils.spatial_utils import compute_grid_cell, get_lat_band
+
+# Coordinates within this fraction of a step of a cell centre match the cell
+CENTRE_TOLERANCE = 1e-6
+
+
+def _axis_range(
+    origin: float, step: float, size: int, lower: float, upper: float
+) -> range:
+    # Cells whose centre lies within [lower, upper]
+    first = math.ceil((lower - origin) / step - CENTRE_TOLERANCE)
+    last = math.floor((upper - origin) / step + CENTRE_TOLERANCE)
+    return range(max(first, 0), min(last, size - 1) + 1)
+
+
+def _axis_point(origin: float, step: float, size: int, coordinate: float) -> range:
+    # The cell centred on the coordinate, if any
+    index = math.floor((coordinate - origin) / step + 0.5)
+    if 0 <= index < size and abs(origin + index * step - coordinate) <= (
+        CENTRE_TOLERANCE * step
+    ):
+        return range(index, index + 1)
+    return range(0)
+
+
+def _pm25_levels(values: np.ndarray) -> list[Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _cell_rows(grid: YearPyramid, cells: np.ndarray) -> list[tuple]:
+    """RECORD_COLUMNS rows of the given row-major native cells."""
+    n_lon = grid.shapes[0][1]
+    values = grid.native_values().reshape(-1)
+    if len(cells) and (np.diff(cells) == 1).all():
+        values = values[cells[0] : cells[-1] + 1]  # a contiguous run: no copy
+    else:
+        values = values[cells]
+    return list(
+        zip(
+            [grid.year] * len(cells),
+            (grid.lat0 + (cells // n_lon) * grid.dlat).tolist(),
+            (grid.lon0 + (cells % n_lon) * grid.dlon).tolist(),
+            _pm25_levels(values.astype(np.float64)),
+            (grid.year * parquet_handler.ID_YEAR_STRIDE + cells).tolist(),
+        )
+    )
+
+
+def _window_cells(n_lon: int, rows: range, columns: range) -> np.ndarray:
+    return (
+        np.arange(rows.start, rows.stop)[:, np.newaxis] * n_lon
+        + np.arange(columns.start, columns.stop)
+    ).ravel()
+
+
+def _to_records(rows: list[tuple]) -> list[AirQualityData]:
+    # Transient ORM objects, as with the Parquet backend
+    return [AirQualityData(**dict(zip(RECORD_COLUMNS, row))) for row in rows]
+
+
+def _grid_stats(grid: YearPyramid) -> tuple[int, int, float, float, float]:
+    # (cells, cells with a value, sum, min, max), computed a stripe at a time
+    # and kept with the loaded year
+    if "stats" not in grid.derived:
+        values = grid.native_values()
+        count, total = 0, 0.0
+        lower, upper = np.inf, -np.inf
+        for start in range(0, values.shape[0], STRIPE_ROWS):
+            stripe = values[start : start + STRIPE_ROWS]
+            valid = stripe[~np.isnan(stripe)]
+            if valid.size:
+                count += valid.size
+                total += float(valid.sum(dtype=np.float64))
+                lower = min(lower, float(valid.min()))
+                upper = max(upper, float(valid.max()))
+        grid.derived["stats"] = (values.size, count, total, lower, upper)
+    return grid.derived["stats"]
+
+
+def _band_sketches(grid: YearPyramid) -> dict[int, QuantileSketch]:
+    # Rows run south to north, so each latitude band is a contiguous run of
+    # rows; bands are those of app.utils.spatial_utils, as in the database
+    if "band_sketches" not in grid.derived:
+        values = grid.native_values()
+        latitudes = grid.lat0 + np.arange(values.shape[0]) * grid.dlat
+        lat_bands = get_lat_band(compute_grid_cell(latitudes, 0.0))
+        bands, starts = np.unique(lat_bands, return_index=True)
+        stops = [*starts[1:], values.shape[0]]
+        sketches = {}
+        for lat_band, start, stop in zip(bands.tolist(), starts, stops):
+            sketch = QuantileSketch()
+            for stripe in range(start, stop, STRIPE_ROWS):
+                stripe_values = values[stripe : min(stripe + STRIPE_ROWS, stop)]
+                sketch = sketch.merge(QuantileSketch.from_values(stripe_values.ravel()))
+            sketches[lat_band] = sketch
+        grid.derived["band_sketches"] = sketches
+    return grid.derived["band_sketches"]
+
+
+class GridAirQualityRepository:
+    """
+    Read-only repository serving the native level of the aggregation pyramid
+    (see app.db.grid_pyramid): one memory-mapped float32 grid per year with
+    its origin and step, exposing the same read methods as
+    AirQualityRepository. Point lookups are index arithmetic and regions are
+    slices of the map, so many workers share the grid through the OS page
+    cache instead of each holding its own copy.
+
+    Every native cell is a record, without a PM2.5 level where the grid holds
+    NaN, and its coordinates are its cell centre. Ids are
+    year * parquet_handler.ID_YEAR_STRIDE + the cell's row-major position,
+    rows south to north, which matches the Parquet backend's ids when the
+    source grid runs the same way.
+    """
+
+    def __init__(self, grid_pyramid: GridPyramid):
+        self.grid_pyramid = grid_pyramid
+
+    def _grids(self, year: Optional[int] = None) -> Iterator[YearPyramid]:
+        years = self.grid_pyramid.get_years()
+        for grid_year in years if year is None else [y for y in years if y == year]:
+            grid = self.grid_pyramid.get_year_pyramid(grid_year)
+            if grid is not None:
+                yield grid
+
+    def _windows(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+    ) -> Iterator[tuple[YearPyramid, range, range]]:
+        # The rows and columns of each year's grid matching the filters
+        for grid in self._grids(year):
+            n_lat, n_lon = grid.shapes[0]
+            rows, columns = range(n_lat), range(n_lon)
+            if bbox is not None:
+                lat_min, lat_max, long_min, long_max = bbox
+                rows = _axis_range(grid.lat0, grid.dlat, n_lat, lat_min, lat_max)
+                columns = _axis_range(grid.lon0, grid.dlon, n_lon, long_min, long_max)
+            if latitude is not None:
+                rows = _axis_point(grid.lat0, grid.dlat, n_lat, latitude)
+            if longitude is not None:
+                columns = _axis_point(grid.lon0, grid.dlon, n_lon, longitude)
+            if len(rows) and len(columns):
+                yield grid, rows, columns
+
+    def _window_rows(self, **filters) -> list[tuple]:
+        rows = []
+        for grid, window_rows, columns in self._windows(**filters):
+            rows.extend(
+                _cell_rows(grid, _window_cells(grid.shapes[0][1], window_rows, columns))
+            )
+        return rows
+
+    def get_all(self, skip: int = 0, limit: int = 100) -> list[AirQualityData]:
+        return _to_records(self.get_all_rows(skip=skip, limit=limit))
+
+    def get_all_rows(self, skip: int = 0, limit: int = 100) -> list[tuple]:
+        rows = []
+        for grid in self._grids():
+            size = grid.shapes[0][0] * grid.shapes[0][1]
+            if skip >= size:
+                skip -= size
+                continue
+            cells = np.arange(skip, min(skip + limit - len(rows), size))
+            rows.extend(_cell_rows(grid, cells))
+            skip = 0
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def get_page_rows(
+        self,
+        limit: int = 100,
+        after: Optional[tuple[int, int]] = None,
+        year: Optional[int] = None,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+    ) -> list[tuple]:
+        """
+        Return the next page in (year, id) order, reading the window's rows
+        from the cell after the cursor on.
+        """
+        rows = []
+        for grid, window_rows, columns in self._windows(year=year, bbox=bbox):
+            if after is not None and grid.year < after[0]:
+                continue
+            n_lon = grid.shapes[0][1]
+            start = 0
+            if after is not None and after[0] == grid.year:
+                start = after[1] - grid.year * parquet_handler.ID_YEAR_STRIDE + 1
+            for row in window_rows:
+                if row < start // n_lon:
+                    continue
+                first = columns.start
+                if row == start // n_lon:
+                    first = max(first, start % n_lon)
+                stop = min(columns.stop, first + limit - len(rows))
+                if first < stop:
+                    rows.extend(_cell_rows(grid, row * n_lon + np.arange(first, stop)))
+                if len(rows) >= limit:
+                    return rows
+        return rows
+
+    def get_by_id(self, record_id: int) -> Optional[AirQualityData]:
+        grid = self.grid_pyramid.get_year_pyramid(
+            parquet_handler.get_year_from_id(record_id)
+        )
+        cell = record_id % parquet_handler.ID_YEAR_STRIDE
+        if grid is None or cell >= grid.shapes[0][0] * grid.shapes[0][1]:
+            return None
+        return _to_records(_cell_rows(grid, np.array([cell])))[0]
+
+    def create(self, data: AirQualityData) -> AirQualityData:
+        raise ReadOnlyRepositoryError("grid")
+
+    def update(self, record: AirQualityData, updates: dict) -> AirQualityData:
+        raise ReadOnlyRepositoryError("grid")
+
+    def delete(self, record: AirQualityData) -> None:
+        raise ReadOnlyRepositoryError("grid")
+
+    def count_matching(self, **predicate) -> int:
+        # Only asked ahead of a predicate update or delete
+        raise ReadOnlyRepositoryError("grid")
+
+    def update_matching(self, updates: dict, **predicate) -> int:
+        raise ReadOnlyRepositoryError("grid")
+
+    def delete_matching(self, **predicate) -> int:
+        raise ReadOnlyRepositoryError("grid")
+
+    def filter(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[AirQualityData]:
+        return _to_records(
+            self.filter_rows(year=year, latitude=latitude, longitude=longitude)
+        )
+
+    def filter_rows(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[tuple]:
+        return self._window_rows(year=year, latitude=latitude, longitude=longitude)
+
+    def iter_record_batches(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[tuple]]:
+        if bbox is not None and (latitude is not None or longitude is not None):
+            raise ValueError("bbox cannot be combined with latitude or longitude")
+        windows = self._windows(
+            year=year, latitude=latitude, longitude=longitude, bbox=bbox
+        )
+        for grid, rows, columns in windows:
+            stripe_rows = max(batch_size // len(columns), 1)
+            for start in range(rows.start, rows.stop, stripe_rows):
+                stripe = range(start, min(start + stripe_rows, rows.stop))
+                stripe_cells = _window_cells(grid.shapes[0][1], stripe, columns)
+                for offset in range(0, len(stripe_cells), batch_size):
+                    yield _cell_rows(grid, stripe_cells[offset : offset + batch_size])
+
+    def get_stats(self, year: Optional[int] = None) -> dict:
+        count, valid_count, total = 0, 0, 0.0
+        min_pm25, max_pm25 = np.inf, -np.inf
+        for grid in self._grids(year):
+            size, grid_count, grid_total, lower, upper = _grid_stats(grid)
+            count += size
+            valid_count += grid_count
+            total += grid_total
+            min_pm25, max_pm25 = min(min_pm25, lower), max(max_pm25, upper)
+
+        return {
+            "count": count,
+            "average_pm25": total / valid_count if valid_count else 0.0,
+            "min_pm25": min_pm25 if valid_count else 0.0,
+            "max_pm25": max_pm25 if valid_count else 0.0,
+        }
+
+    def get_stats_by_year(self) -> list[dict]:
+        return [
+            {"year": year, **self.get_stats(year=year)}
+            for year in self.grid_pyramid.get_years()
+        ]
+
+    def get_data_within_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[AirQualityData]:
+        return _to_records(
+            self.get_rows_within_region(lat_min, lat_max, long_min, long_max)
+        )
+
+    def get_rows_within_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[tuple]:
+        return self._window_rows(bbox=(lat_min, lat_max, long_min, long_max))
+
+    def get_top_polluted_locations(
+        self,
+        year: int,
+        top_n: int = 10,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+    ) -> list[AirQualityData]:
+        if top_n <= 0:
+            return []
+
+        # Keep the running top_n cells of each stripe of the window
+        candidates = np.empty(0, dtype=np.int64)
+        candidate_values = np.empty(0)
+        for grid, rows, columns in self._windows(year=year, bbox=bbox):
+            n_lon = grid.shapes[0][1]
+            values = grid.native_values()
+            for start in range(rows.start, rows.stop, STRIPE_ROWS):
+                stripe = range(start, min(start + STRIPE_ROWS, rows.stop))
+                stripe_values = values[
+                    stripe.start : stripe.stop, columns.start : columns.stop
+                ].ravel()
+                valid = np.flatnonzero(~np.isnan(stripe_values))
+                cells = np.concatenate(
+                    [candidates, _window_cells(n_lon, stripe, columns)[valid]]
+                )
+                cell_values = np.concatenate(
+                    [candidate_values, stripe_values[valid].astype(np.float64)]
+                )
+                if cells.size > top_n:
+                    keep = np.argpartition(-cell_values, top_n - 1)[:top_n]
+                    cells, cell_values = cells[keep], cell_values[keep]
+                candidates, candidate_values = cells, cell_values
+
+            order = np.argsort(-candidate_values, kind="stable")
+            return _to_records(_cell_rows(grid, candidates[order]))
+        return []
+
+    def get_pm25_bounds(
+        self, year: Optional[int] = None
+    ) -> Optional[tuple[float, float]]:
+        stats = [_grid_stats(grid) for grid in self._grids(year)]
+        if not any(grid_count for _, grid_count, *_ in stats):
+            return None
+        return (
+            min(lower for *_, lower, _ in stats),
+            max(upper for *_, upper in stats),
+        )
+
+    def get_pm25_sketch(
+        self,
+        years: Optional[Sequence[int]] = None,
+        lat_bands: Optional[tuple[int, int]] = None,
+    ) -> QuantileSketch:
+        sketch = QuantileSketch()
+        for grid in self._grids():
+            if years is not None and grid.year not in years:
+                continue
+            for lat_band, band_sketch in _band_sketches(grid).items():
+                if lat_bands is None or lat_bands[0] <= lat_band <= lat_bands[1]:
+                    sketch = sketch.merge(band_sketch)
+        return sketch
@@ -0,0 +1,41 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.db.models.ingestion_manifest import IngestionManifest
+
+
+class IngestionManifestRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_all(self) -> dict[int, IngestionManifest]:
+        return {entry.year: entry for entry in self.db.query(IngestionManifest).all()}
+
+    def get_by_year(self, year: int) -> Optional[IngestionManifest]:
+        return self.db.get(IngestionManifest, year)
+
+    def upsert(self, year: int, updates: dict) -> IngestionManifest:
+        entry = self.get_by_year(year) or IngestionManifest(year=year)
+        for key, value in updates.items():
+            setattr(entry, key, value)
+        self.db.add(entry)
+        self.db.commit()
+        self.db.refresh(entry)
+        return entry
+
+    def get_pending_db_loads(
+        self, start_year: int, end_year: int
+    ) -> list[IngestionManifest]:
+        # Years whose Parquet output is newer than what is loaded in the database
+        return [
+            entry
+            for entry in self.db.query(IngestionManifest)
+            .filter(
+                IngestionManifest.year.between(start_year, end_year),
+                IngestionManifest.parquet_status == "completed",
+            )
+            .order_by(IngestionManifest.year)
+            .all()
+            if entry.db_status != "completed"
+            or entry.db_checksum != entry.source_checksum
+        ]
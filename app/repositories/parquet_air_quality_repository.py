@@ -0,0 +1,302 @@
+from typing import Iterator, Optional, Sequence, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from app.db import parquet_handler
+from app.db.models.air_quality import AirQualityData
+from app.errors.read_only_repository_error import ReadOnlyRepositoryError
+from app.repositories.air_quality_repository import RECORD_COLUMNS
+from app.utils.quantile_sketch import QuantileSketch
+
+COLUMNS = ["id", "year", "latitude", "longitude", "pm25_level"]
+
+
+def _to_records(table: pa.Table) -> list[AirQualityData]:
+    # Transient ORM objects, so callers and response schemas see the same type
+    # as with the database backend
+    return [AirQualityData(**row) for row in table.select(COLUMNS).to_pylist()]
+
+
+def _to_rows(table: Union[pa.Table, pa.RecordBatch]) -> list[tuple]:
+    columns = table.select(list(RECORD_COLUMNS)).to_pydict()
+    return list(zip(*columns.values()))
+
+
+def _point_bbox(
+    latitude: Optional[float], longitude: Optional[float]
+) -> Optional[parquet_handler.BoundingBox]:
+    # Exact matches are expressed as a degenerate bounding box so the
+    # latitude band partitions and row-group statistics still prune
+    if latitude is None and longitude is None:
+        return None
+    return (
+        latitude if latitude is not None else -90.0,
+        latitude if latitude is not None else 90.0,
+        longitude if longitude is not None else -180.0,
+        longitude if longitude is not None else 180.0,
+    )
+
+
+def _partition_lat_bands(lat_bands: Optional[tuple[int, int]]) -> range:
+    # Partitions band on floor(latitude), so latitude 90 has a band of its own
+    # that belongs with the northernmost band of the database summary
+    first, last = lat_bands if lat_bands is not None else (-90, 90)
+    if last == 90 - parquet_handler.LAT_BAND_DEGREES:
+        last = 90
+    return range(first, last + 1, parquet_handler.LAT_BAND_DEGREES)
+
+
+def _pm25_values(batch: pa.RecordBatch) -> np.ndarray:
+    values = batch.column("pm25_level").to_numpy(zero_copy_only=False)
+    return values[~np.isnan(values)]
+
+
+class ParquetAirQualityRepository:
+    """
+    Read-only repository serving the partitioned Parquet dataset in-process
+    with Arrow, exposing the same read methods as AirQualityRepository.
+    Ids are derived from the grid position (see parquet_handler.ID_YEAR_STRIDE)
+    and are not interchangeable with database ids.
+    """
+
+    def __init__(self, dataset_dir: str = parquet_handler.DATASET_DIR):
+        self.dataset_dir = dataset_dir
+
+    def _get_all_table(self, skip: int, limit: int) -> pa.Table:
+        dataset = parquet_handler.get_dataset(self.dataset_dir)
+        stop = max(min(skip + limit, dataset.count_rows()), skip)
+        indices = pa.array(range(skip, stop), type=pa.int64())
+        return dataset.take(indices, columns=COLUMNS)
+
+    def get_all(self, skip: int = 0, limit: int = 100) -> list[AirQualityData]:
+        return _to_records(self._get_all_table(skip, limit))
+
+    def get_all_rows(self, skip: int = 0, limit: int = 100) -> list[tuple]:
+        return _to_rows(self._get_all_table(skip, limit))
+
+    def get_page_rows(
+        self,
+        limit: int = 100,
+        after: Optional[tuple[int, int]] = None,
+        year: Optional[int] = None,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+    ) -> list[tuple]:
+        """
+        Return the next page in (year, id) order. Ids increase with the grid
+        position, so the page is read from a window of ids just past the
+        cursor that the row-group id statistics prune to, doubling the window
+        while the filters leave it short.
+        """
+        tables, remaining = [], limit
+        years = parquet_handler.get_available_years(self.dataset_dir)
+        for page_year in years if year is None else [y for y in years if y == year]:
+            if after is not None and page_year < after[0]:
+                continue
+            year_start = page_year * parquet_handler.ID_YEAR_STRIDE
+            year_end = year_start + parquet_handler.count_rows(
+                year=page_year, dataset_dir=self.dataset_dir
+            )
+            last_id = after[1] if after and after[0] == page_year else year_start - 1
+            window = max(remaining, 1)
+            while remaining and last_id < year_end - 1:
+                table = parquet_handler.query_dataset(
+                    year=page_year,
+                    bbox=bbox,
+                    columns=COLUMNS,
+                    extra_filter=(ds.field("id") > last_id)
+                    & (ds.field("id") <= last_id + window),
+                    dataset_dir=self.dataset_dir,
+                )
+                table = table.sort_by("id").slice(0, remaining)
+                tables.append(table)
+                remaining -= table.num_rows
+                last_id += window
+                window *= 2
+            if not remaining:
+                break
+
+        rows = []
+        for table in tables:
+            rows.extend(_to_rows(table))
+        return rows
+
+    def get_by_id(self, record_id: int) -> Optional[AirQualityData]:
+        table = parquet_handler.query_dataset(
+            year=parquet_handler.get_year_from_id(record_id),
+            columns=COLUMNS,
+            extra_filter=ds.field("id") == record_id,
+            dataset_dir=self.dataset_dir,
+        )
+        records = _to_records(table)
+        return records[0] if records else None
+
+    def create(self, data: AirQualityData) -> AirQualityData:
+        raise ReadOnlyRepositoryError("parquet")
+
+    def update(self, record: AirQualityData, updates: dict) -> AirQualityData:
+        raise ReadOnlyRepositoryError("parquet")
+
+    def delete(self, record: AirQualityData) -> None:
+        raise ReadOnlyRepositoryError("parquet")
+
+    def count_matching(self, **predicate) -> int:
+        # Only asked ahead of a predicate update or delete
+        raise ReadOnlyRepositoryError("parquet")
+
+    def update_matching(self, updates: dict, **predicate) -> int:
+        raise ReadOnlyRepositoryError("parquet")
+
+    def delete_matching(self, **predicate) -> int:
+        raise ReadOnlyRepositoryError("parquet")
+
+    def filter(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[AirQualityData]:
+        return _to_records(self._filter_table(year, latitude, longitude))
+
+    def _filter_table(
+        self,
+        year: Optional[int],
+        latitude: Optional[float],
+        longitude: Optional[float],
+    ) -> pa.Table:
+        return parquet_handler.query_dataset(
+            year=year,
+            bbox=_point_bbox(latitude, longitude),
+            columns=COLUMNS,
+            dataset_dir=self.dataset_dir,
+        )
+
+    def filter_rows(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[tuple]:
+        return _to_rows(self._filter_table(year, latitude, longitude))
+
+    def iter_record_batches(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[tuple]]:
+        # Unlike the database backend, rows come in dataset scan order
+        if bbox is None:
+            bbox = _point_bbox(latitude, longitude)
+        elif latitude is not None or longitude is not None:
+            raise ValueError("bbox cannot be combined with latitude or longitude")
+        for batch in parquet_handler.iter_dataset_batches(
+            year=year,
+            bbox=bbox,
+            columns=list(RECORD_COLUMNS),
+            dataset_dir=self.dataset_dir,
+        ):
+            for offset in range(0, batch.num_rows, batch_size):
+                yield _to_rows(batch.slice(offset, batch_size))
+
+    def get_stats(self, year: Optional[int] = None) -> dict:
+        count, total, valid_count = 0, 0.0, 0
+        min_pm25, max_pm25 = np.inf, -np.inf
+        for batch in parquet_handler.iter_dataset_batches(
+            year=year, columns=["pm25_level"], dataset_dir=self.dataset_dir
+        ):
+            values = _pm25_values(batch)
+            count += batch.num_rows
+            if values.size:
+                total += float(values.sum(dtype=np.float64))
+                valid_count += values.size
+                min_pm25 = min(min_pm25, float(values.min()))
+                max_pm25 = max(max_pm25, float(values.max()))
+
+        return {
+            "count": count,
+            "average_pm25": total / valid_count if valid_count else 0.0,
+            "min_pm25": min_pm25 if valid_count else 0.0,
+            "max_pm25": max_pm25 if valid_count else 0.0,
+        }
+
+    def _region_table(self, bbox: parquet_handler.BoundingBox) -> pa.Table:
+        return parquet_handler.query_dataset(
+            bbox=bbox, columns=COLUMNS, dataset_dir=self.dataset_dir
+        )
+
+    def get_stats_by_year(self) -> list[dict]:
+        return [
+            {"year": year, **self.get_stats(year=year)}
+            for year in parquet_handler.get_available_years(self.dataset_dir)
+        ]
+
+    def get_data_within_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[AirQualityData]:
+        return _to_records(self._region_table((lat_min, lat_max, long_min, long_max)))
+
+    def get_rows_within_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[tuple]:
+        return _to_rows(self._region_table((lat_min, lat_max, long_min, long_max)))
+
+    def get_top_polluted_locations(
+        self,
+        year: int,
+        top_n: int = 10,
+        bbox: Optional[parquet_handler.BoundingBox] = None,
+    ) -> list[AirQualityData]:
+        if top_n <= 0:
+            return []
+
+        # Visit row groups from the highest maximum down, keeping only the
+        # running top_n candidates, until no remaining row group can beat them
+        candidates, threshold = None, -np.inf
+        for upper, table in parquet_handler.iter_row_groups_by_max(
+            "pm25_level", year=year, bbox=bbox, dataset_dir=self.dataset_dir
+        ):
+            if upper < threshold:
+                break
+            table = table.select(COLUMNS)
+            if candidates is not None:
+                table = pa.concat_tables([candidates, table])
+            values = table.column("pm25_level").to_numpy(zero_copy_only=False)
+            valid = np.flatnonzero(~np.isnan(values))
+            if valid.size >= top_n:
+                valid = valid[np.argpartition(-values[valid], top_n - 1)[:top_n]]
+                threshold = float(values[valid].min())
+            candidates = table.take(pa.array(valid, type=pa.int64()))
+
+        if candidates is None:
+            return []
+        values = candidates.column("pm25_level").to_numpy(zero_copy_only=False)
+        order = np.argsort(-values, kind="stable")
+        return _to_records(candidates.take(pa.array(order)))
+
+    def get_pm25_bounds(
+        self, year: Optional[int] = None
+    ) -> Optional[tuple[float, float]]:
+        return parquet_handler.get_column_bounds(
+            "pm25_level", year=year, dataset_dir=self.dataset_dir
+        )
+
+    def get_pm25_sketch(
+        self,
+        years: Optional[Sequence[int]] = None,
+        lat_bands: Optional[tuple[int, int]] = None,
+    ) -> QuantileSketch:
+        if years is None:
+            years = parquet_handler.get_available_years(self.dataset_dir)
+        sketch = QuantileSketch()
+        for year in years:
+            for lat_band in _partition_lat_bands(lat_bands):
+                sketch = sketch.merge(
+                    parquet_handler.get_partition_sketch(
+                        "pm25_level", year, lat_band, dataset_dir=self.dataset_dir
+                    )
+                )
+        return sketch
@@ -1,16 +1,58 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.schemas.air_quality import (
+    AffectedRows,
+    AirQualityGrid,
+    AirQualityPredicateUpdate,
+    BulkInsertResult,
+    AirQualityChange,
     AirQualityCreate,
     AirQualityResponse,
     AirQualityUpdate,
     AirQualityStats,
+    AirQualityTimeSeries,
+    AirQualityTrend,
+    AirQualityYearStats,
+    AirQualityNormalized,
+    AirQualityPercentiles,
+    NearestLocation,
     TopPollutedLocation,
 )
-from app.dependencies import get_air_quality_service
+from app.dependencies import (
+    get_analytics_service,
+    get_air_quality_bulk_service,
+    get_air_quality_export_service,
+    get_air_quality_service,
+    get_grid_service,
+    get_timeseries_service,
+)
+from app.db.analytics_store import CHANGE_COLUMNS, TREND_COLUMNS
+from app.db.grid_pyramid import Aggregate
 from app.db.models.air_quality import AirQualityData
-from app.services.air_quality_service import AirQualityService
+from app.repositories.air_quality_repository import RECORD_COLUMNS
+from app.services.analytics_service import AnalyticsService
+from app.services.air_quality_bulk_service import (
+    DEFAULT_BULK_BATCH_SIZE,
+    AirQualityBulkService,
+)
+from app.services.air_quality_export_service import AirQualityExportService
+from app.services.air_quality_service import (
+    DEFAULT_HISTOGRAM_BIN_WIDTH,
+    DEFAULT_PERCENTILES,
+    NORMALIZED_COLUMNS,
+)
+from app.services.async_air_quality_service import AsyncAirQualityService
+from app.services.grid_service import GridService
+from app.services.timeseries_service import TimeSeriesService
+from app.utils.bulk_utils import BULK_MEDIA_TYPES, get_bulk_media_type
+from app.utils.json_utils import numpy_json_response, records_json_response
+from app.utils.stream_utils import STREAM_MEDIA_TYPES, resolve_stream_format
+
+StreamFormat = Literal["json", "ndjson", "csv"]
+FORMAT_DESCRIPTION = "Response format; ndjson and csv are streamed (default: Accept)"
 
 router = APIRouter(
     prefix="/data",
@@ -18,138 +60,655 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# GET routes answered from the cached service's reads (CACHED_READS), whose
+# responses carry the dataset version as an ETag
+CACHED_READ_ROUTES = frozenset(
+    {
+        "read_all_data",
+        "get_statistics",
+        "get_pm25_percentiles",
+        "get_data_in_region",
+        "get_top_polluted_locations",
+        "get_top_n_polluted_locations",
+        "filter_data",
+        "get_normalized_data",
+        "read_data_by_id",
+    }
+)
+
+
+def _validate_region(
+    lat_min: float, lat_max: float, long_min: float, long_max: float
+) -> None:
+    if lat_min > lat_max:
+        raise HTTPException(
+            status_code=400, detail="lat_min cannot be greater than lat_max"
+        )
+    if long_min > long_max:
+        raise HTTPException(
+            status_code=400, detail="long_min cannot be greater than long_max"
+        )
+
+
+def _optional_region(
+    lat_min: Optional[float],
+    lat_max: Optional[float],
+    long_min: Optional[float],
+    long_max: Optional[float],
+) -> Optional[tuple[float, float, float, float]]:
+    bbox = (lat_min, lat_max, long_min, long_max)
+    if all(value is None for value in bbox):
+        return None
+    if any(value is None for value in bbox):
+        raise HTTPException(
+            status_code=400,
+            detail="lat_min, lat_max, long_min and long_max must be given together",
+        )
+    _validate_region(*bbox)
+    return bbox
+
+
+def _streaming_response(
+    export_service: AirQualityExportService, stream_format: str, **filters
+) -> StreamingResponse:
+    return StreamingResponse(
+        export_service.stream_data(stream_format, **filters),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+    )
+
 
 @router.get("/", response_model=list[AirQualityResponse])
-def read_all_data(
-    skip: int = 0,
-    limit: int = 100,
-    service: AirQualityService = Depends(get_air_quality_service),
+async def read_all_data(
+    skip: Optional[int] = Query(
+        None, ge=0, description="Offset into the table (disables cursor paging)"
+    ),
+    limit: int = Query(100, ge=1, description="Maximum number of records"),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor header value from the previous page"
+    ),
+    year: Optional[int] = Query(None, ge=1900, le=2100, description="Filter by year"),
+    lat_min: Optional[float] = Query(
+        None, ge=-90, le=90, description="Minimum latitude"
+    ),
+    lat_max: Optional[float] = Query(
+        None, ge=-90, le=90, description="Maximum latitude"
+    ),
+    long_min: Optional[float] = Query(
+        None, ge=-180, le=180, description="Minimum longitude"
+    ),
+    long_max: Optional[float] = Query(
+        None, ge=-180, le=180, description="Maximum longitude"
+    ),
+    format: Optional[StreamFormat] = Query(None, description=FORMAT_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+    export_service: AirQualityExportService = Depends(get_air_quality_export_service),
 ):
     """
-    Retrieve all available air quality data.
+    Retrieve all available air quality data, one page at a time in (year, id)
+    order. The cursor for the next page is returned in the X-Next-Cursor
+    header, which is absent on the last page. Passing skip uses the legacy
+    offset paging instead. NDJSON and CSV stream every matching record in
+    one response, without paging.
     """
-    data: list[AirQualityData] = service.get_all_data(skip=skip, limit=limit)
+    bbox = _optional_region(lat_min, lat_max, long_min, long_max)
+
+    stream_format = resolve_stream_format(format, accept)
+    if stream_format:
+        if skip is not None or cursor is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Streamed responses cannot be combined with skip or cursor",
+            )
+        return _streaming_response(export_service, stream_format, year=year, bbox=bbox)
+
+    if skip is not None:
+        if cursor is not None or year is not None or bbox is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="skip cannot be combined with cursor, year or region filters",
+            )
+        rows = await service.get_all_data(skip=skip, limit=limit)
+        return records_json_response(RECORD_COLUMNS, rows)
 
-    return data
+    rows, next_cursor = await service.get_data_page(
+        limit=limit, cursor=cursor, year=year, bbox=bbox
+    )
+    response = records_json_response(RECORD_COLUMNS, rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @router.post("/", response_model=AirQualityResponse, status_code=201)
-def create_data(
+async def create_data(
     record: AirQualityCreate,
-    service: AirQualityService = Depends(get_air_quality_service),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
 ):
     """
     Add a new air quality data entry.
     """
     db_record = AirQualityData(**record.model_dump())
-    created_record: AirQualityData = service.create_data(db_record)
+    created_record: AirQualityData = await service.create_data(db_record)
     return created_record
 
 
+@router.post("/bulk", response_model=BulkInsertResult, status_code=201)
+async def bulk_insert_data(
+    request: Request,
+    content_type: Optional[str] = Header(None),
+    batch_size: int = Query(
+        DEFAULT_BULK_BATCH_SIZE, ge=1, le=500_000, description="Rows per transaction"
+    ),
+    return_ids: bool = Query(
+        False, description="Return the id range (uses INSERT instead of COPY)"
+    ),
+    service: AirQualityBulkService = Depends(get_air_quality_bulk_service),
+):
+    """
+    Insert many air quality data entries from a JSON array, NDJSON, an Arrow
+    IPC stream or file, or a Parquet file, chosen by Content-Type. All rows
+    are validated before any is inserted; they are then inserted in batches
+    of batch_size rows, one transaction each. Returns counts, not the rows.
+    """
+    media_type = get_bulk_media_type(content_type)
+    if media_type is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be one of {', '.join(BULK_MEDIA_TYPES)}",
+        )
+    body = await request.body()
+    return await run_in_threadpool(
+        service.insert_body,
+        body,
+        media_type,
+        batch_size=batch_size,
+        return_ids=return_ids,
+    )
+
+
+def _predicate(
+    year: Optional[int],
+    lat_min: Optional[float],
+    lat_max: Optional[float],
+    long_min: Optional[float],
+    long_max: Optional[float],
+    pm25_min: Optional[float],
+    pm25_max: Optional[float],
+) -> dict:
+    if pm25_min is not None and pm25_max is not None and pm25_min > pm25_max:
+        raise HTTPException(
+            status_code=400, detail="pm25_min cannot be greater than pm25_max"
+        )
+    predicate = {
+        "year": year,
+        "bbox": _optional_region(lat_min, lat_max, long_min, long_max),
+        "pm25_min": pm25_min,
+        "pm25_max": pm25_max,
+    }
+    # Refuse to touch the whole table by accident
+    if all(value is None for value in predicate.values()):
+        raise HTTPException(
+            status_code=400,
+            detail="At least one of year, a bounding box or a PM2.5 range is required",
+        )
+    return predicate
+
+
+@router.patch("/", response_model=AffectedRows)
+async def update_matching_data(
+    updates: AirQualityPredicateUpdate,
+    year: Optional[int] = Query(None, ge=1900, le=2100, description="Match a year"),
+    lat_min: Optional[float] = Query(
+        None, ge=-90, le=90, description="Minimum latitude"
+    ),
+    lat_max: Optional[float] = Query(
+        None, ge=-90, le=90, description="Maximum latitude"
+    ),
+    long_min: Optional[float] = Query(
+        None, ge=-180, le=180, description="Minimum longitude"
+    ),
+    long_max: Optional[float] = Query(
+        None, ge=-180, le=180, description="Maximum longitude"
+    ),
+    pm25_min: Optional[float] = Query(None, description="Minimum PM2.5 level"),
+    pm25_max: Optional[float] = Query(None, description="Maximum PM2.5 level"),
+    dry_run: bool = Query(False, description="Only count the matching records"),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+):
+    """
+    Set year and/or pm25_level on every record matching the predicate, with a
+    single UPDATE in one transaction. Returns the number of records affected,
+    or with dry_run the number that would be, without changing anything.
+    """
+    predicate = _predicate(
+        year, lat_min, lat_max, long_min, long_max, pm25_min, pm25_max
+    )
+    updated_data = updates.model_dump(exclude_unset=True)
+    if not updated_data:
+        raise HTTPException(
+            status_code=400, detail="At least one of year or pm25_level is required"
+        )
+    if dry_run:
+        affected = await service.count_matching_data(**predicate)
+    else:
+        affected = await service.update_matching_data(updated_data, **predicate)
+    return {"affected": affected, "dry_run": dry_run}
+
+
+@router.delete("/", response_model=AffectedRows)
+async def delete_matching_data(
+    year: Optional[int] = Query(None, ge=1900, le=2100, description="Match a year"),
+    lat_min: Optional[float] = Query(
+        None, ge=-90, le=90, description="Minimum latitude"
+    ),
+    lat_max: Optional[float] = Query(
+        None, ge=-90, le=90, description="Maximum latitude"
+    ),
+    long_min: Optional[float] = Query(
+        None, ge=-180, le=180, description="Minimum longitude"
+    ),
+    long_max: Optional[float] = Query(
+        None, ge=-180, le=180, description="Maximum longitude"
+    ),
+    pm25_min: Optional[float] = Query(None, description="Minimum PM2.5 level"),
+    pm25_max: Optional[float] = Query(None, description="Maximum PM2.5 level"),
+    dry_run: bool = Query(False, description="Only count the matching records"),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+):
+    """
+    Delete every record matching the predicate with a single DELETE in one
+    transaction. Returns the number of records deleted, or with dry_run the
+    number that would be.
+    """
+    predicate = _predicate(
+        year, lat_min, lat_max, long_min, long_max, pm25_min, pm25_max
+    )
+    if dry_run:
+        affected = await service.count_matching_data(**predicate)
+    else:
+        affected = await service.delete_matching_data(**predicate)
+    return {"affected": affected, "dry_run": dry_run}
+
+
 @router.put("/{record_id}", response_model=AirQualityResponse)
-def update_data(
+async def update_data(
     record_id: int,
     updates: AirQualityUpdate,
-    service: AirQualityService = Depends(get_air_quality_service),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
 ):
     """
     Update an existing air quality data entry.
     """
     updated_data = updates.model_dump(exclude_unset=True)
-    updated_record = service.update_data(record_id, updated_data)
+    updated_record = await service.update_data(record_id, updated_data)
     if not updated_record:
         raise HTTPException(status_code=404, detail="Record not found")
     return updated_record
 
 
 @router.delete("/{record_id}", response_model=dict)
-def delete_data(
-    record_id: int, service: AirQualityService = Depends(get_air_quality_service)
+async def delete_data(
+    record_id: int,
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
 ):
     """
     Delete an air quality data entry.
     """
-    success = service.delete_data(record_id)
+    success = await service.delete_data(record_id)
     if not success:
         raise HTTPException(status_code=404, detail="Record not found")
     return {"detail": "Record deleted successfully"}
 
 
-@router.get("/stats", response_model=AirQualityStats)
-def get_statistics(service: AirQualityService = Depends(get_air_quality_service)):
+@router.get("/stats", response_model=AirQualityStats | list[AirQualityYearStats])
+async def get_statistics(
+    year: Optional[int] = Query(None, ge=1900, le=2100, description="Filter by year"),
+    group_by: Optional[Literal["year"]] = Query(
+        None, description="Return one set of statistics per year"
+    ),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+):
     """
-    Provide basic statistics (count, average PM2.5, min, max) across the dataset.
+    Provide basic statistics (count, average PM2.5, min, max) across the dataset,
+    for a single year, or per year.
     """
-    stats = service.get_statistics()
+    if group_by == "year":
+        stats_by_year = await service.get_statistics_by_year()
+        if year is not None:
+            stats_by_year = [stats for stats in stats_by_year if stats["year"] == year]
+        return stats_by_year
+
+    stats = await service.get_statistics(year=year)
     return stats
 
 
+@router.get("/stats/percentiles", response_model=AirQualityPercentiles)
+async def get_pm25_percentiles(
+    percentiles: list[float] = Query(
+        list(DEFAULT_PERCENTILES), description="Percentiles to return, 0 to 100"
+    ),
+    year: Optional[list[int]] = Query(
+        None, description="Years to merge (default: all)"
+    ),
+    lat_min: Optional[float] = Query(
+        None, ge=-90, le=90, description="Minimum latitude"
+    ),
+    lat_max: Optional[float] = Query(
+        None, ge=-90, le=90, description="Maximum latitude"
+    ),
+    bin_width: float = Query(
+        DEFAULT_HISTOGRAM_BIN_WIDTH,
+        ge=0.5,
+        le=1000,
+        description="Width of the histogram bins in PM2.5 units",
+    ),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+):
+    """
+    PM2.5 percentiles and a fixed-bin histogram over the given years and
+    latitude range, answered from per-year, per-latitude-band sketches kept
+    current by every write instead of from the rows. Regions are rounded
+    out to whole 10 degree latitude bands.
+    """
+    if any(not 0 <= percentile <= 100 for percentile in percentiles):
+        raise HTTPException(
+            status_code=400, detail="Percentiles must be between 0 and 100"
+        )
+    if (lat_min is None) != (lat_max is None):
+        raise HTTPException(
+            status_code=400, detail="lat_min and lat_max must be given together"
+        )
+    if lat_min is not None and lat_min > lat_max:
+        raise HTTPException(
+            status_code=400, detail="lat_min cannot be greater than lat_max"
+        )
+    return await service.get_pm25_percentiles(
+        percentiles=percentiles,
+        years=year,
+        lat_min=lat_min,
+        lat_max=lat_max,
+        bin_width=bin_width,
+    )
+
+
 @router.get("/region", response_model=list[AirQualityResponse])
-def get_data_in_region(
+async def get_data_in_region(
     lat_min: float = Query(..., ge=-90, le=90, description="Minimum latitude"),
     lat_max: float = Query(..., ge=-90, le=90, description="Maximum latitude"),
     long_min: float = Query(..., ge=-180, le=180, description="Minimum longitude"),
     long_max: float = Query(..., ge=-180, le=180, description="Maximum longitude"),
-    service: AirQualityService = Depends(get_air_quality_service),
+    format: Optional[StreamFormat] = Query(None, description=FORMAT_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+    export_service: AirQualityExportService = Depends(get_air_quality_export_service),
 ):
     """
     Retrieve data within a bounding box (defined by latitude/longitude).
     """
-    if lat_min > lat_max:
-        raise HTTPException(
-            status_code=400, detail="lat_min cannot be greater than lat_max"
-        )
-    if long_min > long_max:
-        raise HTTPException(
-            status_code=400, detail="long_min cannot be greater than long_max"
+    _validate_region(lat_min, lat_max, long_min, long_max)
+
+    stream_format = resolve_stream_format(format, accept)
+    if stream_format:
+        return _streaming_response(
+            export_service, stream_format, bbox=(lat_min, lat_max, long_min, long_max)
         )
 
-    data = service.get_data_in_region(
+    rows = await service.get_data_in_region(
         lat_min=lat_min, lat_max=lat_max, long_min=long_min, long_max=long_max
     )
-    return data
+    return records_json_response(RECORD_COLUMNS, rows)
 
 
 @router.get("/top10", response_model=list[TopPollutedLocation])
-def get_top_polluted_locations(
+async def get_top_polluted_locations(
     year: int = Query(..., ge=1900, le=2100, description="Year to filter data"),
-    service: AirQualityService = Depends(get_air_quality_service),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
 ):
     """
     Return the top 10 most polluted locations in the dataset for a given year.
     """
-    top_locations = service.get_top_polluted_locations(year=year, top_n=10)
+    top_locations = await service.get_top_polluted_locations(year=year, top_n=10)
+    if not top_locations:
+        raise HTTPException(
+            status_code=404, detail="No records found for the specified year"
+        )
+    return [dict(zip(RECORD_COLUMNS, row)) for row in top_locations]
+
+
+@router.get("/top", response_model=list[TopPollutedLocation])
+async def get_top_n_polluted_locations(
+    year: int = Query(..., ge=1900, le=2100, description="Year to filter data"),
+    n: int = Query(10, ge=1, le=1000, description="Number of locations"),
+    lat_min: Optional[float] = Query(
+        None, ge=-90, le=90, description="Minimum latitude"
+    ),
+    lat_max: Optional[float] = Query(
+        None, ge=-90, le=90, description="Maximum latitude"
+    ),
+    long_min: Optional[float] = Query(
+        None, ge=-180, le=180, description="Minimum longitude"
+    ),
+    long_max: Optional[float] = Query(
+        None, ge=-180, le=180, description="Maximum longitude"
+    ),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+):
+    """
+    Return the n most polluted locations for a given year, optionally within a
+    bounding box. Locations without a PM2.5 value are skipped.
+    """
+    bbox = _optional_region(lat_min, lat_max, long_min, long_max)
+    top_locations = await service.get_top_polluted_locations(
+        year=year, top_n=n, bbox=bbox
+    )
     if not top_locations:
         raise HTTPException(
             status_code=404, detail="No records found for the specified year"
         )
-    return top_locations
+    return [dict(zip(RECORD_COLUMNS, row)) for row in top_locations]
 
 
 @router.get("/filter", response_model=list[AirQualityResponse])
-def filter_data(
+async def filter_data(
     year: Optional[int] = Query(None, ge=1900, le=2100, description="Filter by year"),
     lat: Optional[float] = Query(None, ge=-90, le=90, description="Filter by latitude"),
     long: Optional[float] = Query(
         None, ge=-180, le=180, description="Filter by longitude"
     ),
-    service: AirQualityService = Depends(get_air_quality_service),
+    format: Optional[StreamFormat] = Query(None, description=FORMAT_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+    export_service: AirQualityExportService = Depends(get_air_quality_export_service),
 ):
     """
     Filter the dataset based on year, latitude, and longitude.
     """
-    data = service.filter_data(year=year, latitude=lat, longitude=long)
-    return data
+    stream_format = resolve_stream_format(format, accept)
+    if stream_format:
+        return _streaming_response(
+            export_service, stream_format, year=year, latitude=lat, longitude=long
+        )
+
+    rows = await service.filter_data(year=year, latitude=lat, longitude=long)
+    return records_json_response(RECORD_COLUMNS, rows)
+
+
+@router.get("/normalized", response_model=list[AirQualityNormalized])
+async def get_normalized_data(
+    limit: int = Query(100, ge=1, description="Maximum number of records"),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor header value from the previous page"
+    ),
+    year: Optional[int] = Query(None, ge=1900, le=2100, description="Filter by year"),
+    bounds: Literal["global", "year"] = Query(
+        "global", description="Normalize against the global or per-year min/max"
+    ),
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
+):
+    """
+    Return PM2.5 levels scaled to [0, 1] between the minimum and maximum of the
+    whole dataset or of each record's year, one page at a time in (year, id)
+    order. The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    rows, next_cursor = await service.get_pm25_normalized(
+        limit=limit, cursor=cursor, year=year, bounds=bounds
+    )
+    response = records_json_response(NORMALIZED_COLUMNS, rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+@router.get("/nearest", response_model=list[NearestLocation])
+def get_nearest_locations(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the site"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the site"),
+    k: int = Query(1, ge=1, le=100, description="Number of grid cells to return"),
+    year: Optional[int] = Query(
+        None, ge=1900, le=2100, description="Year to query (default: latest)"
+    ),
+    service: GridService = Depends(get_grid_service),
+):
+    """
+    Return the k grid cells with a PM2.5 value nearest to a coordinate,
+    nearest first.
+    """
+    locations = service.get_nearest_locations(
+        latitude=lat, longitude=lon, k=k, year=year
+    )
+    if not locations:
+        raise HTTPException(
+            status_code=404, detail="No records found for the specified year"
+        )
+    return locations
+
+
+@router.get("/timeseries", response_model=AirQualityTimeSeries)
+def get_time_series(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the site"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the site"),
+    service: TimeSeriesService = Depends(get_timeseries_service),
+):
+    """
+    Return the PM2.5 level of the grid cell containing a coordinate in every
+    ingested year, oldest first, read from the cell-major time-series store
+    in a single contiguous read.
+    """
+    time_series = service.get_time_series(latitude=lat, longitude=lon)
+    if time_series is None:
+        raise HTTPException(
+            status_code=404, detail="No time series found for the location"
+        )
+    return time_series
+
+
+@router.get("/trend", response_model=list[AirQualityTrend])
+def get_trends(
+    lat_min: float = Query(..., ge=-90, le=90, description="Minimum latitude"),
+    lat_max: float = Query(..., ge=-90, le=90, description="Maximum latitude"),
+    long_min: float = Query(..., ge=-180, le=180, description="Minimum longitude"),
+    long_max: float = Query(..., ge=-180, le=180, description="Maximum longitude"),
+    min_years: int = Query(
+        2, ge=2, description="Minimum number of years a trend is fitted on"
+    ),
+    service: AnalyticsService = Depends(get_analytics_service),
+):
+    """
+    Return the least-squares PM2.5 trend, in units per year, of every grid
+    cell within a bounding box, as precomputed during ingestion.
+    """
+    _validate_region(lat_min, lat_max, long_min, long_max)
+    rows = service.get_trends(
+        (lat_min, lat_max, long_min, long_max), min_years=min_years
+    )
+    if rows is None:
+        raise HTTPException(status_code=404, detail="No trends have been computed")
+    return records_json_response(TREND_COLUMNS, rows)
+
+
+@router.get("/change", response_model=list[AirQualityChange])
+def get_changes(
+    year: int = Query(..., ge=1900, le=2100, description="Year to query"),
+    lat_min: float = Query(..., ge=-90, le=90, description="Minimum latitude"),
+    lat_max: float = Query(..., ge=-90, le=90, description="Maximum latitude"),
+    long_min: float = Query(..., ge=-180, le=180, description="Minimum longitude"),
+    long_max: float = Query(..., ge=-180, le=180, description="Maximum longitude"),
+    service: AnalyticsService = Depends(get_analytics_service),
+):
+    """
+    Return, for every grid cell with a value in a year within a bounding
+    box, the change from the previous year (null for the first year or after
+    a missing year) and the anomaly against the baseline mean, as
+    precomputed during ingestion.
+    """
+    _validate_region(lat_min, lat_max, long_min, long_max)
+    rows = service.get_changes(year, (lat_min, lat_max, long_min, long_max))
+    if rows is None:
+        raise HTTPException(
+            status_code=404, detail="No changes computed for the specified year"
+        )
+    return records_json_response(CHANGE_COLUMNS, rows)
+
+
+@router.get("/grid", response_model=AirQualityGrid)
+def get_grid(
+    resolution: float = Query(
+        ..., gt=0, le=360, description="Largest cell size wanted, in degrees"
+    ),
+    agg: Aggregate = Query("mean", description="Aggregate of the cells merged"),
+    year: Optional[int] = Query(
+        None, ge=1900, le=2100, description="Year to query (default: latest)"
+    ),
+    lat_min: Optional[float] = Query(
+        None, ge=-90, le=90, description="Minimum latitude"
+    ),
+    lat_max: Optional[float] = Query(
+        None, ge=-90, le=90, description="Maximum latitude"
+    ),
+    long_min: Optional[float] = Query(
+        None, ge=-180, le=180, description="Minimum longitude"
+    ),
+    long_max: Optional[float] = Query(
+        None, ge=-180, le=180, description="Maximum longitude"
+    ),
+    service: GridService = Depends(get_grid_service),
+):
+    """
+    Return PM2.5 within a bounding box (default: the whole grid) as a raster
+    read from the coarsest precomputed level whose cells are at most
+    resolution degrees, aggregated by mean or max. Values are one row per
+    latitude in the latitudes order, null where a cell has no data.
+    """
+    bbox = _optional_region(lat_min, lat_max, long_min, long_max)
+    window = service.get_grid(resolution=resolution, agg=agg, year=year, bbox=bbox)
+    if window is None:
+        raise HTTPException(
+            status_code=404, detail="No records found for the specified year"
+        )
+    return numpy_json_response(
+        {
+            "year": window.year,
+            "agg": agg,
+            "level": window.level,
+            "cell_lat": window.cell_lat,
+            "cell_lon": window.cell_lon,
+            "latitudes": window.latitudes,
+            "longitudes": window.longitudes,
+            "values": window.values,
+        }
+    )
 
 
 @router.get("/{record_id}", response_model=AirQualityResponse)
-def read_data_by_id(
-    record_id: int, service: AirQualityService = Depends(get_air_quality_service)
+async def read_data_by_id(
+    record_id: int,
+    service: AsyncAirQualityService = Depends(get_air_quality_service),
 ):
     """
     Fetch a specific data entry by ID.
     """
-    data: AirQualityData | None = service.get_data_by_id(record_id)
-    if not data:
+    row = await service.get_data_by_id(record_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Record not found")
-    return data
+    return dict(zip(RECORD_COLUMNS, row))
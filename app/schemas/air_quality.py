@@ -18,6 +18,12 @@ class AirQualityBase(BaseModel):
     @model_validator(mode="before")
     def check_nan_values(cls, values):
         # Check if pm25_level is NaN and replace it with None
+        if isinstance(values, dict):
+            # A record row zipped with RECORD_COLUMNS, as cached reads return
+            pm25_level = values.get("pm25_level")
+            if pm25_level is not None and math.isnan(pm25_level):
+                values["pm25_level"] = None
+            return values
         pm25_level = values.pm25_level
         if pm25_level is not None and math.isnan(pm25_level):
             values.pm25_level = None
@@ -101,6 +107,9 @@ class AirQualityStats(BaseModel):
     @model_validator(mode="before")
     def check_nan_values(cls, values):
         # Check if pm25_level is NaN and replace it with None
+        if not isinstance(values, dict):
+            # Not a stats mapping, e.g. the per-year list of /data/stats
+            return values
         average_pm25 = values["average_pm25"]
         min_pm25 = values["min_pm25"]
         max_pm25 = values["max_pm25"]
@@ -116,11 +125,47 @@ class AirQualityStats(BaseModel):
         from_attributes = True
 
 
+class AirQualityYearStats(AirQualityStats):
+    """
+    Schema for representing statistics of one year of air quality data.
+    Used for:
+    - GET /data/stats?group_by=year
+    """
+
+    year: int
+
+
+class PM25Percentile(BaseModel):
+    percentile: float
+    pm25_level: Optional[float] = Field(None)
+
+
+class AirQualityPercentiles(BaseModel):
+    """
+    Schema for PM2.5 percentiles and a histogram merged from the per-year,
+    per-latitude-band sketches. Levels are within relative_error of the
+    exact nearest-rank percentile; histogram[i] counts the levels in
+    [i * bin_width, (i + 1) * bin_width). lat_min and lat_max are the edges
+    of the latitude bands covered.
+    Used for:
+    - GET /data/stats/percentiles
+    """
+
+    years: Optional[list[int]] = Field(None)
+    lat_min: Optional[float] = Field(None)
+    lat_max: Optional[float] = Field(None)
+    count: int
+    relative_error: float
+    percentiles: list[PM25Percentile]
+    bin_width: float
+    histogram: list[int]
+
+
 class AirQualityNormalized(BaseModel):
     """
     Schema for representing normalized air quality data.
     Used for:
-    - (To be used for a future endpoint handling normalization of PM2.5 data)
+    - GET /data/normalized
     """
 
     id: int
@@ -138,6 +183,131 @@ class AirQualityNormalized(BaseModel):
         return values
 
 
+class AirQualityPredicateUpdate(BaseModel):
+    """
+    Schema for the values set on every record matching a predicate.
+    Used for:
+    - PATCH /data
+    """
+
+    year: Optional[PositiveInt] = Field(None, example=2023)
+    pm25_level: Optional[float] = Field(None, example=12.5)
+
+    @model_validator(mode="before")
+    def check_nan_values(cls, values):
+        # Check if pm25_level is NaN and replace it with None
+        pm25_level = values.get("pm25_level")
+        if pm25_level is not None and math.isnan(pm25_level):
+            values["pm25_level"] = None
+        return values
+
+
+class AffectedRows(BaseModel):
+    """
+    Schema for the number of records a predicate update or delete affected,
+    or would affect in a dry run.
+    Used for:
+    - PATCH /data
+    - DELETE /data
+    """
+
+    affected: int
+    dry_run: bool
+
+
+class BulkInsertResult(BaseModel):
+    """
+    Schema for the outcome of a bulk insert.
+    Used for:
+    - POST /data/bulk
+    """
+
+    inserted: int
+    batches: int
+    first_id: Optional[int] = Field(None)
+    last_id: Optional[int] = Field(None)
+
+
+class NearestLocation(BaseModel):
+    """
+    Schema for representing a grid cell near a requested coordinate.
+    Used for:
+    - GET /data/nearest?lat=:lat&lon=:lon
+    """
+
+    year: int
+    latitude: float
+    longitude: float
+    pm25_level: float
+    distance_km: float
+
+
+class AirQualityGrid(BaseModel):
+    """
+    Schema for PM2.5 aggregated onto a regular grid, one row of values per
+    latitude, null where a cell has no data.
+    Used for:
+    - GET /data/grid?year=:year&resolution=:resolution&agg=:agg
+    """
+
+    year: int
+    agg: str
+    level: int
+    cell_lat: float
+    cell_lon: float
+    latitudes: list[float]
+    longitudes: list[float]
+    values: list[list[Optional[float]]]
+
+
+class YearPM25Level(BaseModel):
+    year: int
+    pm25_level: Optional[float] = Field(None)
+
+
+class AirQualityTimeSeries(BaseModel):
+    """
+    Schema for the PM2.5 history of the grid cell containing a coordinate,
+    one entry per year, null where the cell has no value.
+    Used for:
+    - GET /data/timeseries?lat=:lat&lon=:lon
+    """
+
+    latitude: float
+    longitude: float
+    series: list[YearPM25Level]
+
+
+class AirQualityTrend(BaseModel):
+    """
+    Schema for the least-squares PM2.5 trend of a grid cell, in units per
+    year, and the number of years it is fitted on.
+    Used for:
+    - GET /data/trend
+    """
+
+    latitude: float
+    longitude: float
+    slope: float
+    n_years: int
+
+
+class AirQualityChange(BaseModel):
+    """
+    Schema for the PM2.5 level of a grid cell in a year, its change from the
+    previous year and its difference from the baseline mean.
+    Used for:
+    - GET /data/change?year=:year
+    """
+
+    year: int
+    latitude: float
+    longitude: float
+    pm25_level: float
+    yoy_delta: Optional[float] = Field(None)
+    anomaly: Optional[float] = Field(None)
+
+
 class TopPollutedLocation(AirQualityBase):
     """
     Schema for representing the top polluted locations.
@@ -1,6 +1,13 @@
+from typing import Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
+from app.db.analytics_store import ANALYTICS_DIR
+from app.db.dataset_version import DATASET_VERSION_FILE
+from app.db.grid_pyramid import PYRAMID_DIR
+from app.db.parquet_handler import DATASET_DIR
+from app.db.timeseries_store import TIMESERIES_DIR
+
 
 class Settings(BaseSettings):
     # Application Stage
@@ -13,6 +20,47 @@ class Settings(BaseSettings):
     db_port: int = Field(..., env="DB_PORT")
     db_name: str = Field(..., env="DB_NAME")
     db_url: str = Field(..., env="DB_URL")
+    # async serves the database backend through an asyncio engine (asyncpg or
+    # aiosqlite, derived from db_url) instead of the sync engine in a threadpool
+    db_mode: Literal["sync", "async"] = Field("sync", env="DB_MODE")
+
+    # Connection pool of each engine, per worker process
+    db_pool_size: int = Field(5, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, env="DB_MAX_OVERFLOW")
+    db_pool_recycle: int = Field(1800, env="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(True, env="DB_POOL_PRE_PING")
+    db_pool_timeout: float = Field(30.0, env="DB_POOL_TIMEOUT")
+    # Open db_pool_size connections at startup instead of on the first requests
+    db_pool_prewarm: bool = Field(True, env="DB_POOL_PREWARM")
+
+    # Repository Backend for read endpoints; grid serves the native level of
+    # the pyramid in pyramid_dir
+    repository_backend: Literal["database", "parquet", "grid"] = Field(
+        "database", env="REPOSITORY_BACKEND"
+    )
+    parquet_dataset_dir: str = Field(DATASET_DIR, env="PARQUET_DATASET_DIR")
+
+    # Years of the regular grid kept in memory for nearest-neighbour lookups
+    # in years without a pyramid; 0 answers those years with 503 instead
+    grid_index_max_years: int = Field(2, env="GRID_INDEX_MAX_YEARS")
+
+    # Multi-resolution grids built during ingestion, served by /data/grid
+    pyramid_dir: str = Field(PYRAMID_DIR, env="PYRAMID_DIR")
+
+    # Cell-major PM2.5 histories built during ingestion, served by
+    # /data/timeseries
+    timeseries_dir: str = Field(TIMESERIES_DIR, env="TIMESERIES_DIR")
+
+    # Per-cell trends and changes computed during ingestion, served by
+    # /data/trend and /data/change
+    analytics_dir: str = Field(ANALYTICS_DIR, env="ANALYTICS_DIR")
+
+    # In-process cache of read results, invalidated by writes through the API
+    # and, via the shared dataset version file, by other workers, the bulk
+    # loader and the ingestion pipeline; the TTL bounds staleness otherwise
+    response_cache_max_entries: int = Field(256, env="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_ttl_seconds: float = Field(60.0, env="RESPONSE_CACHE_TTL_SECONDS")
+    dataset_version_file: str = Field(DATASET_VERSION_FILE, env="DATASET_VERSION_FILE")
 
     # Logging Configuration
     log_group_name: str = Field(..., env="LOG_GROUP_NAME")
@@ -0,0 +1,102 @@
+from typing import Optional
+
+import pyarrow as pa
+from sqlalchemy.orm import Session
+
+from app.db.bulk_loader import BulkLoader, batch_to_columns
+from app.db.database_manager import DatabaseManager
+from app.errors.read_only_repository_error import ReadOnlyRepositoryError
+from app.repositories.air_quality_summary_repository import (
+    AirQualitySummaryRepository,
+    aggregate_buckets,
+    aggregate_rows,
+)
+from app.schemas.settings import Settings
+from app.utils.bulk_utils import read_bulk_table, validate_bulk_table
+from app.utils.response_cache import ResponseCache
+
+DEFAULT_BULK_BATCH_SIZE = 10_000
+
+
+class AirQualityBulkService:
+    """
+    Inserts uploaded rows into air_quality_data with one transaction per
+    batch: COPY on PostgreSQL and multi-row inserts elsewhere, as in
+    BulkLoader. Each batch updates air_quality_summary with one aggregate per
+    (year, lat_band) group, and the PM2.5 histogram with one count per
+    bucket, in the same transaction, so a failed batch leaves no trace and
+    the batches before it stay committed.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        db_manager: DatabaseManager,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.settings = settings
+        self.db_manager = db_manager
+        self.cache = cache
+
+    def insert_body(
+        self,
+        body: bytes,
+        media_type: str,
+        batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+        return_ids: bool = False,
+    ) -> dict:
+        if self.settings.repository_backend != "database":
+            raise ReadOnlyRepositoryError(self.settings.repository_backend)
+        table = validate_bulk_table(read_bulk_table(body, media_type))
+        return self.insert_table(table, batch_size=batch_size, return_ids=return_ids)
+
+    def insert_table(
+        self,
+        table: pa.Table,
+        batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+        return_ids: bool = False,
+    ) -> dict:
+        """
+        Insert a table already checked by validate_bulk_table. With
+        return_ids, rows go through INSERT ... RETURNING instead of COPY and
+        the smallest and largest new ids are returned; rows inserted
+        concurrently by others can fall between them.
+        """
+        loader = BulkLoader(self.db_manager, batch_size=batch_size)
+        result = {"inserted": 0, "batches": 0, "first_id": None, "last_id": None}
+        try:
+            for batch in table.to_batches(max_chunksize=batch_size):
+                with self.db_manager.engine.begin() as conn:
+                    if return_ids:
+                        ids = loader.insert_batch_returning_ids(conn, batch)
+                        self._update_id_range(result, ids)
+                    else:
+                        loader.copy_batches(conn, [batch])
+                    columns = batch_to_columns(batch)
+                    group_columns = (
+                        columns["year"],
+                        columns["grid_cell"],
+                        columns["pm25_level"],
+                    )
+                    with Session(bind=conn) as session:
+                        summary = AirQualitySummaryRepository(session)
+                        summary.record_aggregates(aggregate_rows(*group_columns))
+                        summary.record_bucket_counts(
+                            aggregate_buckets(*group_columns)
+                        )
+                result["inserted"] += batch.num_rows
+                result["batches"] += 1
+        finally:
+            if result["inserted"] and self.cache is not None:
+                self.cache.bump_version()
+        return result
+
+    @staticmethod
+    def _update_id_range(result: dict, ids: list[int]) -> None:
+        if not ids:
+            return
+        first_id, last_id = min(ids), max(ids)
+        if result["first_id"] is None or first_id < result["first_id"]:
+            result["first_id"] = first_id
+        if result["last_id"] is None or last_id > result["last_id"]:
+            result["last_id"] = last_id
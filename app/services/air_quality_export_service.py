@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, Optional, Union
+
+from app.db.database_manager import DatabaseManager
+from app.db.grid_pyramid import GridPyramid
+from app.db.parquet_handler import BoundingBox
+from app.repositories.air_quality_repository import (
+    RECORD_COLUMNS,
+    AirQualityRepository,
+)
+from app.repositories.async_air_quality_repository import AsyncAirQualityRepository
+from app.repositories.grid_air_quality_repository import GridAirQualityRepository
+from app.repositories.parquet_air_quality_repository import (
+    ParquetAirQualityRepository,
+)
+from app.schemas.settings import Settings
+from app.utils.stream_utils import encode_csv, encode_ndjson, encode_stream_async
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+class AirQualityExportService:
+    """
+    Streams query results as NDJSON or CSV. The response body is produced
+    after the request's dependencies have exited, so every stream opens and
+    closes its own session instead of using the request session.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        db_manager: DatabaseManager,
+        grid_pyramid: GridPyramid,
+    ):
+        self.settings = settings
+        self.db_manager = db_manager
+        self.grid_pyramid = grid_pyramid
+
+    @contextmanager
+    def _repository(self):
+        if self.settings.repository_backend == "parquet":
+            yield ParquetAirQualityRepository(self.settings.parquet_dataset_dir)
+        elif self.settings.repository_backend == "grid":
+            yield GridAirQualityRepository(self.grid_pyramid)
+        else:
+            with self.db_manager.get_db() as db:
+                yield AirQualityRepository(db)
+
+    def stream_data(
+        self,
+        stream_format: str,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        bbox: Optional[BoundingBox] = None,
+    ) -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+        """
+        Sync iterators are consumed by StreamingResponse in the threadpool;
+        in async mode the database backend streams from the async engine.
+        """
+        filters = dict(year=year, latitude=latitude, longitude=longitude, bbox=bbox)
+        is_async = self.settings.db_mode == "async"
+        if is_async and self.settings.repository_backend == "database":
+            return self._stream_data_async(stream_format, **filters)
+        return self._stream_data(stream_format, **filters)
+
+    def _stream_data(self, stream_format: str, **filters) -> Iterator[bytes]:
+        with self._repository() as repository:
+            batches = repository.iter_record_batches(**filters)
+            yield from ENCODERS[stream_format](RECORD_COLUMNS, batches)
+
+    async def _stream_data_async(
+        self, stream_format: str, **filters
+    ) -> AsyncIterator[bytes]:
+        async with self.db_manager.get_async_db() as db:
+            batches = AsyncAirQualityRepository(db).iter_record_batches(**filters)
+            async for chunk in encode_stream_async(
+                stream_format, RECORD_COLUMNS, batches
+            ):
+                yield chunk
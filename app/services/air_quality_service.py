@@ -1,19 +1,139 @@
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
 
 from app.db.models.air_quality import AirQualityData
-from app.schemas.air_quality import AirQualityNormalized
-from app.repositories.air_quality_repository import AirQualityRepository
+from app.db.parquet_handler import BoundingBox
+from app.repositories.air_quality_repository import (
+    RECORD_COLUMNS,
+    AirQualityRepository,
+)
+from app.utils.cursor_utils import decode_cursor, encode_cursor
+from app.utils.quantile_sketch import RELATIVE_ACCURACY, QuantileSketch
+from app.utils.spatial_utils import LAT_BAND_DEGREES, get_latitude_lat_band
+
+# Column order of get_pm25_normalized rows, as in AirQualityNormalized
+NORMALIZED_COLUMNS = ("id", "year", "latitude", "longitude", "pm25_level_normalized")
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 95.0, 99.0)
+DEFAULT_HISTOGRAM_BIN_WIDTH = 5.0
+
+
+def record_row(record: AirQualityData) -> tuple:
+    """
+    RECORD_COLUMNS row of an ORM record. Unlike the record, it stays valid
+    after the request's session ends, so it can be cached and shared.
+    """
+    return tuple(getattr(record, name) for name in RECORD_COLUMNS)
+
+
+def next_page_cursor(rows: list[tuple], limit: int) -> Optional[str]:
+    # A short page is the last one
+    if rows and len(rows) == limit:
+        last = dict(zip(RECORD_COLUMNS, rows[-1]))
+        return encode_cursor(last["year"], last["id"])
+    return None
+
+
+def get_bounds_years(rows: list[tuple], bounds: str) -> list[Optional[int]]:
+    """Years whose PM2.5 bounds normalize the rows; None stands for global."""
+    if bounds != "year":
+        return [None]
+    year_index = RECORD_COLUMNS.index("year")
+    return sorted({row[year_index] for row in rows})
+
+
+def normalize_pm25_rows(
+    rows: list[tuple], pm25_bounds: dict[Optional[int], Optional[tuple]]
+) -> list[tuple]:
+    """
+    Scale RECORD_COLUMNS rows to NORMALIZED_COLUMNS rows, given the bounds of
+    each of get_bounds_years(rows, bounds).
+    """
+    columns = dict(zip(RECORD_COLUMNS, zip(*rows)))
+    years = np.asarray(columns["year"])
+    lower = np.full(len(rows), np.nan)
+    upper = np.full(len(rows), np.nan)
+    for bounds_year, year_bounds in pm25_bounds.items():
+        if year_bounds is not None:
+            in_scope = slice(None) if bounds_year is None else years == bounds_year
+            lower[in_scope], upper[in_scope] = year_bounds
+
+    pm25_level = np.array(columns["pm25_level"], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = (pm25_level - lower) / (upper - lower)
+    # Degenerate bounds (a single distinct value) have no scale
+    normalized[~np.isfinite(normalized)] = np.nan
+
+    return list(
+        zip(
+            columns["id"],
+            columns["year"],
+            columns["latitude"],
+            columns["longitude"],
+            normalized.tolist(),
+        )
+    )
+
+
+def get_lat_bands(
+    lat_min: Optional[float], lat_max: Optional[float]
+) -> Optional[tuple[int, int]]:
+    """Inclusive range of the latitude bands covering lat_min to lat_max."""
+    if lat_min is None or lat_max is None:
+        return None
+    return get_latitude_lat_band(lat_min), get_latitude_lat_band(lat_max)
+
+
+def summarize_pm25_sketch(
+    sketch: QuantileSketch,
+    percentiles: Sequence[float],
+    bin_width: float,
+    years: Optional[Sequence[int]],
+    lat_bands: Optional[tuple[int, int]],
+) -> dict:
+    levels = sketch.quantiles([percentile / 100 for percentile in percentiles])
+    return {
+        "years": list(years) if years is not None else None,
+        # Sketches are kept per whole latitude band
+        "lat_min": lat_bands[0] if lat_bands else None,
+        "lat_max": lat_bands[1] + LAT_BAND_DEGREES if lat_bands else None,
+        "count": sketch.count,
+        "relative_error": RELATIVE_ACCURACY,
+        "percentiles": [
+            {"percentile": percentile, "pm25_level": level}
+            for percentile, level in zip(percentiles, levels)
+        ],
+        "bin_width": bin_width,
+        "histogram": sketch.histogram(bin_width),
+    }
 
 
 class AirQualityService:
     def __init__(self, repository: AirQualityRepository):
         self.repository = repository
 
-    def get_all_data(self, skip: int = 0, limit: int = 100) -> list[AirQualityData]:
-        return self.repository.get_all(skip=skip, limit=limit)
+    # Read methods return RECORD_COLUMNS row tuples, see AirQualityRepository
 
-    def get_data_by_id(self, record_id: int) -> Optional[AirQualityData]:
-        return self.repository.get_by_id(record_id)
+    def get_all_data(self, skip: int = 0, limit: int = 100) -> list[tuple]:
+        return self.repository.get_all_rows(skip=skip, limit=limit)
+
+    def get_data_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        year: Optional[int] = None,
+        bbox: Optional[BoundingBox] = None,
+    ) -> tuple[list[tuple], Optional[str]]:
+        after = decode_cursor(cursor) if cursor else None
+        rows = self.repository.get_page_rows(
+            limit=limit, after=after, year=year, bbox=bbox
+        )
+        return rows, next_page_cursor(rows, limit)
+
+    def get_data_by_id(self, record_id: int) -> Optional[tuple]:
+        record = self.repository.get_by_id(record_id)
+        return record_row(record) if record else None
 
     def create_data(self, data: AirQualityData) -> AirQualityData:
         return self.repository.create(data)
@@ -29,29 +149,81 @@ class AirQualityService:
         self.repository.delete(record)
         return True
 
+    def count_matching_data(self, **predicate) -> int:
+        return self.repository.count_matching(**predicate)
+
+    def update_matching_data(self, updates: dict, **predicate) -> int:
+        return self.repository.update_matching(updates, **predicate)
+
+    def delete_matching_data(self, **predicate) -> int:
+        return self.repository.delete_matching(**predicate)
+
     def filter_data(
         self,
         year: Optional[int] = None,
         latitude: Optional[float] = None,
         longitude: Optional[float] = None,
-    ) -> list[AirQualityData]:
-        return self.repository.filter(year=year, latitude=latitude, longitude=longitude)
+    ) -> list[tuple]:
+        return self.repository.filter_rows(
+            year=year, latitude=latitude, longitude=longitude
+        )
+
+    def get_statistics(self, year: Optional[int] = None) -> dict:
+        return self.repository.get_stats(year=year)
 
-    def get_statistics(self) -> dict:
-        return self.repository.get_stats()
+    def get_statistics_by_year(self) -> list[dict]:
+        return self.repository.get_stats_by_year()
+
+    def get_pm25_percentiles(
+        self,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        years: Optional[Sequence[int]] = None,
+        lat_min: Optional[float] = None,
+        lat_max: Optional[float] = None,
+        bin_width: float = DEFAULT_HISTOGRAM_BIN_WIDTH,
+    ) -> dict:
+        """
+        PM2.5 percentiles (0-100) and a fixed-bin histogram of the given years
+        and latitude range (default: all), merged from the per-year,
+        per-latitude-band sketches. See QuantileSketch for the error bounds.
+        """
+        lat_bands = get_lat_bands(lat_min, lat_max)
+        sketch = self.repository.get_pm25_sketch(years=years, lat_bands=lat_bands)
+        return summarize_pm25_sketch(sketch, percentiles, bin_width, years, lat_bands)
 
     def get_data_in_region(
         self, lat_min: float, lat_max: float, long_min: float, long_max: float
-    ) -> list[AirQualityData]:
-        return self.repository.get_data_within_region(
+    ) -> list[tuple]:
+        return self.repository.get_rows_within_region(
             lat_min=lat_min, lat_max=lat_max, long_min=long_min, long_max=long_max
         )
 
-    def get_pm25_normalized(self) -> list[AirQualityNormalized]:
-        normalized_data = self.repository.get_pm25_normalized()
-        return [AirQualityNormalized(**record._mapping) for record in normalized_data]
+    def get_pm25_normalized(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        year: Optional[int] = None,
+        bounds: str = "global",
+    ) -> tuple[list[tuple], Optional[str]]:
+        """
+        Return a page of NORMALIZED_COLUMNS rows with PM2.5 scaled to [0, 1]
+        between the global or per-year minimum and maximum. The bounds come
+        precomputed from the repository, so only the page itself is read.
+        """
+        rows, next_cursor = self.get_data_page(limit=limit, cursor=cursor, year=year)
+        if not rows:
+            return [], next_cursor
+
+        pm25_bounds = {
+            bounds_year: self.repository.get_pm25_bounds(year=bounds_year)
+            for bounds_year in get_bounds_years(rows, bounds)
+        }
+        return normalize_pm25_rows(rows, pm25_bounds), next_cursor
 
     def get_top_polluted_locations(
-        self, year: int, top_n: int = 10
-    ) -> list[AirQualityData]:
-        return self.repository.get_top_polluted_locations(year=year, top_n=top_n)
+        self, year: int, top_n: int = 10, bbox: Optional[BoundingBox] = None
+    ) -> list[tuple]:
+        records = self.repository.get_top_polluted_locations(
+            year=year, top_n=top_n, bbox=bbox
+        )
+        return [record_row(record) for record in records]
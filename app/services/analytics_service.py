@@ -0,0 +1,19 @@
+from typing import Optional
+
+from app.db.analytics_store import AnalyticsStore
+from app.db.parquet_handler import BoundingBox
+
+
+class AnalyticsService:
+    """Serves per-cell trends and changes computed during ingestion."""
+
+    def __init__(self, store: AnalyticsStore):
+        self.store = store
+
+    def get_trends(
+        self, bbox: BoundingBox, min_years: int = 2
+    ) -> Optional[list[tuple]]:
+        return self.store.get_trend_rows(bbox, min_years=min_years)
+
+    def get_changes(self, year: int, bbox: BoundingBox) -> Optional[list[tuple]]:
+        return self.store.get_change_rows(year, bbox)
@@ -0,0 +1,132 @@
+from typing import Optional, Sequence
+
+from app.db.models.air_quality import AirQualityData
+from app.db.parquet_handler import BoundingBox
+from app.repositories.async_air_quality_repository import AsyncAirQualityRepository
+from app.services.air_quality_service import (
+    DEFAULT_HISTOGRAM_BIN_WIDTH,
+    DEFAULT_PERCENTILES,
+    get_bounds_years,
+    get_lat_bands,
+    next_page_cursor,
+    normalize_pm25_rows,
+    record_row,
+    summarize_pm25_sketch,
+)
+from app.utils.cursor_utils import decode_cursor
+
+
+class AsyncAirQualityService:
+    """AirQualityService over an AsyncAirQualityRepository, for async routes."""
+
+    def __init__(self, repository: AsyncAirQualityRepository):
+        self.repository = repository
+
+    async def get_all_data(self, skip: int = 0, limit: int = 100) -> list[tuple]:
+        return await self.repository.get_all_rows(skip=skip, limit=limit)
+
+    async def get_data_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        year: Optional[int] = None,
+        bbox: Optional[BoundingBox] = None,
+    ) -> tuple[list[tuple], Optional[str]]:
+        after = decode_cursor(cursor) if cursor else None
+        rows = await self.repository.get_page_rows(
+            limit=limit, after=after, year=year, bbox=bbox
+        )
+        return rows, next_page_cursor(rows, limit)
+
+    async def get_data_by_id(self, record_id: int) -> Optional[tuple]:
+        record = await self.repository.get_by_id(record_id)
+        return record_row(record) if record else None
+
+    async def create_data(self, data: AirQualityData) -> AirQualityData:
+        return await self.repository.create(data)
+
+    async def update_data(
+        self, record_id: int, updates: dict
+    ) -> Optional[AirQualityData]:
+        record = await self.repository.get_by_id(record_id)
+        return await self.repository.update(record, updates) if record else None
+
+    async def delete_data(self, record_id: int) -> bool:
+        record = await self.repository.get_by_id(record_id)
+        if not record:
+            return False
+        await self.repository.delete(record)
+        return True
+
+    async def count_matching_data(self, **predicate) -> int:
+        return await self.repository.count_matching(**predicate)
+
+    async def update_matching_data(self, updates: dict, **predicate) -> int:
+        return await self.repository.update_matching(updates, **predicate)
+
+    async def delete_matching_data(self, **predicate) -> int:
+        return await self.repository.delete_matching(**predicate)
+
+    async def filter_data(
+        self,
+        year: Optional[int] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> list[tuple]:
+        return await self.repository.filter_rows(
+            year=year, latitude=latitude, longitude=longitude
+        )
+
+    async def get_statistics(self, year: Optional[int] = None) -> dict:
+        return await self.repository.get_stats(year=year)
+
+    async def get_statistics_by_year(self) -> list[dict]:
+        return await self.repository.get_stats_by_year()
+
+    async def get_pm25_percentiles(
+        self,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        years: Optional[Sequence[int]] = None,
+        lat_min: Optional[float] = None,
+        lat_max: Optional[float] = None,
+        bin_width: float = DEFAULT_HISTOGRAM_BIN_WIDTH,
+    ) -> dict:
+        lat_bands = get_lat_bands(lat_min, lat_max)
+        sketch = await self.repository.get_pm25_sketch(
+            years=years, lat_bands=lat_bands
+        )
+        return summarize_pm25_sketch(sketch, percentiles, bin_width, years, lat_bands)
+
+    async def get_data_in_region(
+        self, lat_min: float, lat_max: float, long_min: float, long_max: float
+    ) -> list[tuple]:
+        return await self.repository.get_rows_within_region(
+            lat_min=lat_min, lat_max=lat_max, long_min=long_min, long_max=long_max
+        )
+
+    async def get_pm25_normalized(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        year: Optional[int] = None,
+        bounds: str = "global",
+    ) -> tuple[list[tuple], Optional[str]]:
+        rows, next_cursor = await self.get_data_page(
+            limit=limit, cursor=cursor, year=year
+        )
+        if not rows:
+            return [], next_cursor
+
+        pm25_bounds = {
+            bounds_year: await self.repository.get_pm25_bounds(year=bounds_year)
+            for bounds_year in get_bounds_years(rows, bounds)
+        }
+        return normalize_pm25_rows(rows, pm25_bounds), next_cursor
+
+    async def get_top_polluted_locations(
+        self, year: int, top_n: int = 10, bbox: Optional[BoundingBox] = None
+    ) -> list[tuple]:
+        records = await self.repository.get_top_polluted_locations(
+            year=year, top_n=top_n, bbox=bbox
+        )
+        return [record_row(record) for record in records]
@@ -0,0 +1,124 @@
+import functools
+import inspect
+from typing import Any, Callable, Hashable
+
+from app.repositories.air_quality_repository import AirQualityRepository
+from app.repositories.async_air_quality_repository import AsyncAirQualityRepository
+from app.services.air_quality_service import AirQualityService
+from app.services.async_air_quality_service import AsyncAirQualityService
+from app.utils.response_cache import ResponseCache
+
+# Service reads served from the cache, and writes that bump its version when
+# they change anything. Both cached services wrap the same methods.
+CACHED_READS = (
+    "get_all_data",
+    "get_data_page",
+    "get_data_by_id",
+    "filter_data",
+    "get_statistics",
+    "get_statistics_by_year",
+    "get_pm25_percentiles",
+    "get_data_in_region",
+    "get_pm25_normalized",
+    "get_top_polluted_locations",
+)
+INVALIDATING_WRITES = (
+    "create_data",
+    "update_data",
+    "delete_data",
+    "update_matching_data",
+    "delete_matching_data",
+)
+
+
+def _key_value(value: Any) -> Hashable:
+    # Bounding boxes, percentiles and years arrive as lists or tuples
+    if isinstance(value, (list, tuple)):
+        return tuple(_key_value(item) for item in value)
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _read_signature(name: str) -> inspect.Signature:
+    return inspect.signature(getattr(AirQualityService, name))
+
+
+def cache_key(name: str, *args, **kwargs) -> tuple:
+    """
+    The cache key of a call to the read method name: its arguments bound to
+    AirQualityService's signature with defaults applied, so the sync and
+    async services key every call alike however it was spelled.
+    """
+    bound = _read_signature(name).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    arguments = list(bound.arguments.items())[1:]
+    return (name, *((key, _key_value(value)) for key, value in arguments))
+
+
+def _cached_read(name: str, method: Callable) -> Callable:
+    if inspect.iscoroutinefunction(method):
+
+        async def read(self, *args, **kwargs):
+            return await self.cache.get_or_compute_async(
+                cache_key(name, *args, **kwargs), method, self, *args, **kwargs
+            )
+
+    else:
+
+        def read(self, *args, **kwargs):
+            return self.cache.get_or_compute(
+                cache_key(name, *args, **kwargs), method, self, *args, **kwargs
+            )
+
+    return functools.wraps(method)(read)
+
+
+def _invalidating_write(method: Callable) -> Callable:
+    if inspect.iscoroutinefunction(method):
+
+        async def write(self, *args, **kwargs):
+            result = await method(self, *args, **kwargs)
+            if result:
+                self.cache.bump_version()
+            return result
+
+    else:
+
+        def write(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if result:
+                self.cache.bump_version()
+            return result
+
+    return functools.wraps(method)(write)
+
+
+def with_response_cache(cls: type) -> type:
+    """Wrap the reads and writes the class inherits from its service."""
+    (base,) = cls.__bases__
+    for name in CACHED_READS:
+        setattr(cls, name, _cached_read(name, getattr(base, name)))
+    for name in INVALIDATING_WRITES:
+        setattr(cls, name, _invalidating_write(getattr(base, name)))
+    return cls
+
+
+@with_response_cache
+class CachedAirQualityService(AirQualityService):
+    """
+    AirQualityService whose read results are served from a ResponseCache,
+    keyed by method and normalised arguments. Writes bump the cache version.
+    """
+
+    def __init__(self, repository: AirQualityRepository, cache: ResponseCache):
+        super().__init__(repository)
+        self.cache = cache
+
+
+@with_response_cache
+class CachedAsyncAirQualityService(AsyncAirQualityService):
+    """CachedAirQualityService for the async routes, sharing the same cache."""
+
+    def __init__(self, repository: AsyncAirQualityRepository, cache: ResponseCache):
+        super().__init__(repository)
+        self.cache = cache
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from app.db.grid_index import GridIndex
+from app.db.grid_pyramid import Aggregate, GridPyramid, GridWindow
+from app.db.parquet_handler import BoundingBox
+from app.errors.grid_too_large_error import GridTooLargeError
+from app.schemas.air_quality import NearestLocation
+
+WORLD_BBOX: BoundingBox = (-90.0, 90.0, -180.0, 180.0)
+
+# Roughly a 1000 x 1000 pixel map; finer views should narrow the bounding box
+MAX_GRID_CELLS = 1_000_000
+
+
+class GridService:
+    def __init__(self, grid_index: GridIndex, grid_pyramid: GridPyramid):
+        self.grid_index = grid_index
+        self.grid_pyramid = grid_pyramid
+
+    def get_nearest_locations(
+        self, latitude: float, longitude: float, k: int = 1, year: Optional[int] = None
+    ) -> list[NearestLocation]:
+        locations = self.grid_index.nearest(latitude, longitude, k=k, year=year)
+        return [NearestLocation(**location) for location in locations]
+
+    def get_grid(
+        self,
+        resolution: float,
+        agg: Aggregate = "mean",
+        year: Optional[int] = None,
+        bbox: Optional[BoundingBox] = None,
+        max_cells: int = MAX_GRID_CELLS,
+    ) -> Optional[GridWindow]:
+        """
+        PM2.5 within bbox from the coarsest pyramid level whose cells are no
+        larger than resolution degrees, so the response grows with the cells
+        a client can draw rather than with the source grid.
+        """
+        if year is None:
+            year = self.grid_pyramid.get_latest_year()
+            if year is None:
+                return None
+        pyramid = self.grid_pyramid.get_year_pyramid(year)
+        if pyramid is None:
+            return None
+
+        level = pyramid.select_level(resolution)
+        rows, columns = pyramid.cell_ranges(level, bbox or WORLD_BBOX)
+        if len(rows) * len(columns) > max_cells:
+            raise GridTooLargeError(len(rows) * len(columns), max_cells)
+        return pyramid.read(level, agg, rows, columns)
@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services.air_quality_service import AirQualityService
+
+
+class ThreadPoolAirQualityService:
+    """
+    Awaitable view of a sync AirQualityService for the async routes: every
+    method call runs in Starlette's threadpool, as the handlers themselves
+    did when the routes were sync. Used with the sync engine and the
+    Parquet backend.
+    """
+
+    def __init__(self, service: AirQualityService):
+        self.service = service
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        method = getattr(self.service, name)
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
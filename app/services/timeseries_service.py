@@ -0,0 +1,27 @@
+import math
+from typing import Optional
+
+from app.db.timeseries_store import TimeSeriesStore
+from app.schemas.air_quality import AirQualityTimeSeries
+
+
+class TimeSeriesService:
+    def __init__(self, store: TimeSeriesStore):
+        self.store = store
+
+    def get_time_series(
+        self, latitude: float, longitude: float
+    ) -> Optional[AirQualityTimeSeries]:
+        series = self.store.get_series(latitude, longitude)
+        if series is None:
+            return None
+        return AirQualityTimeSeries(
+            latitude=series["latitude"],
+            longitude=series["longitude"],
+            series=[
+                {"year": year, "pm25_level": None if math.isnan(level) else level}
+                for year, level in zip(
+                    series["years"], series["pm25_levels"].tolist()
+                )
+            ],
+        )
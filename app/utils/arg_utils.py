@@ -1,11 +1,36 @@
 import argparse
 
 
-def get_system_args():
-    # Configure system arguments
+def _get_base_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("--stage", required=True)
     parser.add_argument("--database_url", required=True)
     parser.add_argument("--log_group_name", required=True)
+    return parser
+
+
+def get_system_args():
+    # Configure system arguments
+    parser = _get_base_parser()
+    args = parser.parse_args()
+    return args
+
+
+def get_bulk_loader_args():
+    # Configure system arguments for the Parquet to PostgreSQL bulk loader
+    parser = _get_base_parser()
+    parser.add_argument("--processed_data_dir", default="processed_data")
+    parser.add_argument("--start_year", type=int, default=1998)
+    parser.add_argument("--end_year", type=int, default=2022)
+    parser.add_argument("--copy_format", choices=["binary", "csv"], default="binary")
+    parser.add_argument("--batch_size", type=int, default=500_000)
+    parser.add_argument("--drop_indexes", action="store_true")
+    parser.add_argument("--recreate_tables", action="store_true")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--rebuild_summary", action="store_true")
+    # Shared with the API, whose workers clear their caches when it changes
+    parser.add_argument(
+        "--dataset_version_file", default="processed_data/dataset_version"
+    )
     args = parser.parse_args()
     return args
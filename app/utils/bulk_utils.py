@@ -0,0 +1,127 @@
+from typing import Optional
+
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+from app.errors.invalid_bulk_data_error import InvalidBulkDataError
+from app.utils.spatial_utils import LATITUDE_RANGE, LONGITUDE_RANGE
+from app.utils.stream_utils import NDJSON_MEDIA_TYPE
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+BULK_MEDIA_TYPES = (
+    JSON_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    ARROW_STREAM_MEDIA_TYPE,
+    ARROW_FILE_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+)
+
+BULK_SCHEMA = pa.schema(
+    [
+        ("year", pa.int64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("pm25_level", pa.float64()),
+    ]
+)
+REQUIRED_COLUMNS = ("year", "latitude", "longitude")
+COORDINATE_LIMITS = {"latitude": LATITUDE_RANGE, "longitude": LONGITUDE_RANGE}
+
+# Enough to show what is wrong without echoing a whole upload back
+MAX_REPORTED_ERRORS = 100
+
+
+def get_bulk_media_type(content_type: Optional[str]) -> Optional[str]:
+    """Supported media type of a Content-Type header, or None."""
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return media_type if media_type in BULK_MEDIA_TYPES else None
+
+
+def _error(loc: list, msg: str) -> dict:
+    # Same shape as FastAPI's request validation errors
+    return {"loc": ["body", *loc], "msg": msg, "type": "value_error"}
+
+
+def read_bulk_table(body: bytes, media_type: str) -> pa.Table:
+    """Parse a request body of one of BULK_MEDIA_TYPES into an Arrow table."""
+    try:
+        if media_type == JSON_MEDIA_TYPE:
+            rows = orjson.loads(body)
+            if not isinstance(rows, list) or not all(
+                isinstance(row, dict) for row in rows
+            ):
+                raise InvalidBulkDataError(
+                    [_error([], "Expected a JSON array of objects")]
+                )
+            return pa.Table.from_pylist(rows)
+        if media_type == NDJSON_MEDIA_TYPE:
+            if not body.strip():
+                return pa.table({})
+            return pa_json.read_json(pa.BufferReader(body))
+        if media_type == ARROW_STREAM_MEDIA_TYPE:
+            return pa.ipc.open_stream(body).read_all()
+        if media_type == ARROW_FILE_MEDIA_TYPE:
+            return pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        return pq.read_table(pa.BufferReader(body))
+    except (orjson.JSONDecodeError, pa.ArrowException) as e:
+        raise InvalidBulkDataError([_error([], f"Could not parse the body: {e}")])
+
+
+def validate_bulk_table(table: pa.Table) -> pa.Table:
+    """
+    Check every row at once and return the table cast to BULK_SCHEMA, with
+    NaN PM2.5 levels as nulls. Other columns are ignored. Raises
+    InvalidBulkDataError listing up to MAX_REPORTED_ERRORS problems.
+    """
+    if not table.num_rows:
+        return BULK_SCHEMA.empty_table()
+    errors = [
+        _error([name], "Field required")
+        for name in REQUIRED_COLUMNS
+        if name not in table.column_names
+    ]
+    if errors:
+        raise InvalidBulkDataError(errors)
+
+    columns = {}
+    for field in BULK_SCHEMA:
+        if field.name not in table.column_names:
+            columns[field.name] = pa.nulls(table.num_rows, field.type)
+            continue
+        try:
+            columns[field.name] = table.column(field.name).cast(field.type)
+        except pa.ArrowException as e:
+            errors.append(_error([field.name], f"Invalid {field.type} values: {e}"))
+    if errors:
+        raise InvalidBulkDataError(errors)
+
+    year = columns["year"]
+    invalid = {"year": pc.fill_null(pc.less_equal(year, 0), True)}
+    for name, (lower, upper) in COORDINATE_LIMITS.items():
+        values = columns[name].to_numpy(zero_copy_only=False)
+        with np.errstate(invalid="ignore"):
+            invalid[name] = ~((values >= lower) & (values <= upper))
+
+    for name, mask in invalid.items():
+        rows = np.flatnonzero(np.asarray(mask))
+        for row in rows[: MAX_REPORTED_ERRORS - len(errors)]:
+            if name == "year":
+                msg = "Input should be a positive integer"
+            else:
+                lower, upper = COORDINATE_LIMITS[name]
+                msg = f"Input should be a number between {lower:g} and {upper:g}"
+            errors.append(_error([int(row), name], msg))
+    if errors:
+        raise InvalidBulkDataError(errors)
+
+    pm25_level = columns["pm25_level"]
+    columns["pm25_level"] = pc.if_else(pc.is_nan(pm25_level), None, pm25_level)
+    return pa.table(columns, schema=BULK_SCHEMA)
@@ -0,0 +1,22 @@
+import base64
+import binascii
+import json
+
+from app.errors.invalid_cursor_error import InvalidCursorError
+
+
+def encode_cursor(year: int, record_id: int) -> str:
+    """Opaque cursor for the (year, id) key of the last record of a page."""
+    payload = json.dumps([year, record_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        year, record_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorError(cursor)
+    if not isinstance(year, int) or not isinstance(record_id, int):
+        raise InvalidCursorError(cursor)
+    return year, record_id
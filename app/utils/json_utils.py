@@ -0,0 +1,49 @@
+import json
+import math
+import re
+from typing import Sequence
+
+import orjson
+from fastapi.responses import Response
+
+# orjson writes floats below 1e-4 in positional notation and uses exponents
+# without a sign ("1e16"), where Python's repr, and so FastAPI's default
+# JSONResponse, writes "1e-05" and "1e+16"
+_REPR_MISMATCH = re.compile(rb"\d[eE]|(?<![\d.])0\.0000")
+
+
+def _clean(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def encode_records_json(columns: Sequence[str], rows: Sequence[tuple]) -> bytes:
+    """
+    Encode row tuples as a JSON array of objects, byte for byte as the
+    response_model path would render them. orjson writes NaN as null, so
+    missing PM2.5 values need no per-row handling.
+    """
+    records = [dict(zip(columns, row)) for row in rows]
+    content = orjson.dumps(records)
+    if _REPR_MISMATCH.search(content):
+        # Rare tiny or huge floats: fall back to the standard library encoder
+        content = json.dumps(
+            [dict(zip(columns, map(_clean, row))) for row in rows],
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+    return content
+
+
+def records_json_response(columns: Sequence[str], rows: Sequence[tuple]) -> Response:
+    return Response(
+        content=encode_records_json(columns, rows), media_type="application/json"
+    )
+
+
+def numpy_json_response(content: dict) -> Response:
+    # NumPy arrays are encoded natively, with NaN as null
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json",
+    )
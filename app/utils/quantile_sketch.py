@@ -0,0 +1,133 @@
+import math
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+# Values are counted in fixed, logarithmically spaced buckets (as in DDSketch):
+# bucket i > 0 holds (MIN_VALUE * GAMMA**(i - 1), MIN_VALUE * GAMMA**i], so any
+# value is within RELATIVE_ACCURACY of its bucket's representative. Because the
+# buckets never move, sketches merge and values are removed by adding and
+# subtracting counts, which is what lets them live in a table next to
+# air_quality_summary and follow every write.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Values at or below MIN_VALUE (including negative ones) share bucket 0 and
+# are reported as 0; values above MAX_VALUE share the last bucket
+MIN_VALUE = 0.01
+MAX_VALUE = 10_000.0
+BUCKET_COUNT = math.ceil(math.log(MAX_VALUE / MIN_VALUE) / LOG_GAMMA) + 1
+
+
+def bucket_index(values) -> np.ndarray:
+    """Bucket of each value; NaN must be dropped beforehand."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buckets = np.ceil(np.log(values / MIN_VALUE) / LOG_GAMMA)
+    buckets = np.where(values > MIN_VALUE, buckets, 0)
+    return np.clip(buckets, 0, BUCKET_COUNT - 1).astype(np.int64)
+
+
+def bucket_lower_bounds() -> np.ndarray:
+    """
+    Smallest float64 that bucket_index puts in each bucket, -inf for bucket 0.
+    Found by bisecting bucket_index itself, so comparing values against them
+    reproduces bucket_index exactly, float rounding at the edges included.
+    """
+    buckets = np.arange(1, BUCKET_COUNT)
+    estimates = MIN_VALUE * GAMMA ** (buckets - 1.0)
+    # Positive floats order like their bit patterns, so bisect those
+    low = (estimates / GAMMA).view(np.int64)
+    high = (estimates * GAMMA).view(np.int64)
+    while np.any(high - low > 1):
+        middle = low + (high - low) // 2
+        in_bucket = bucket_index(middle.view(np.float64)) >= buckets
+        high = np.where(in_bucket, middle, high)
+        low = np.where(in_bucket, low, middle)
+    return np.concatenate([[-np.inf], high.view(np.float64)])
+
+
+BUCKET_LOWER_BOUNDS = bucket_lower_bounds()
+
+
+def bucket_values() -> np.ndarray:
+    """
+    Representative value of every bucket: the point of the bucket at the
+    same relative distance, RELATIVE_ACCURACY, from both of its edges.
+    """
+    buckets = np.arange(BUCKET_COUNT)
+    values = 2 * MIN_VALUE * GAMMA**buckets / (GAMMA + 1)
+    values[0] = 0.0
+    return values
+
+
+BUCKET_VALUES = bucket_values()
+
+
+class QuantileSketch:
+    """
+    Bucket counts of a set of PM2.5 values, answering quantiles and
+    histograms in time independent of the number of values.
+
+    Error bounds: quantile(q) returns the representative of the bucket of
+    the nearest-rank value v (the ceil(q * count)-th smallest), so it lies
+    within RELATIVE_ACCURACY * v of v for MIN_VALUE < v <= MAX_VALUE; values
+    at or below MIN_VALUE are reported as 0. A histogram bin counts the
+    values whose representative falls in it, so only values within
+    RELATIVE_ACCURACY of a bin edge can land in the neighbouring bin.
+    """
+
+    def __init__(self, counts: Optional[np.ndarray] = None):
+        if counts is None:
+            counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self.counts = counts
+
+    @classmethod
+    def from_values(cls, values) -> "QuantileSketch":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        return cls(np.bincount(bucket_index(values), minlength=BUCKET_COUNT))
+
+    @classmethod
+    def from_bucket_counts(
+        cls, bucket_counts: Iterable[tuple[int, int]]
+    ) -> "QuantileSketch":
+        counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        for bucket, count in bucket_counts:
+            counts[bucket] += count
+        return cls(counts)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        return QuantileSketch(self.counts + other.counts)
+
+    @property
+    def count(self) -> int:
+        # Counts kept as deltas should never go negative; clamping keeps a
+        # drifted bucket from corrupting the ranks of the others
+        return int(np.maximum(self.counts, 0).sum())
+
+    def quantiles(self, qs: Sequence[float]) -> list[Optional[float]]:
+        """Values at the given quantiles in [0, 1], None when empty."""
+        cumulative = np.cumsum(np.maximum(self.counts, 0))
+        total = int(cumulative[-1])
+        if total == 0:
+            return [None for _ in qs]
+        ranks = np.clip(np.ceil(np.asarray(qs, dtype=np.float64) * total), 1, total)
+        buckets = np.searchsorted(cumulative, ranks)
+        return [float(value) for value in BUCKET_VALUES[buckets]]
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+    def histogram(self, bin_width: float) -> list[int]:
+        """
+        Counts of values in bins [i * bin_width, (i + 1) * bin_width), from 0
+        up to the highest non-empty bin.
+        """
+        counts = np.maximum(self.counts, 0)
+        occupied = np.flatnonzero(counts)
+        if occupied.size == 0:
+            return []
+        bins = np.floor(BUCKET_VALUES[occupied] / bin_width).astype(np.int64)
+        return np.bincount(bins, weights=counts[occupied]).astype(np.int64).tolist()
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.db.dataset_version import DatasetVersion
+
+# Results with more items than this are not worth the memory they would pin
+MAX_CACHED_ITEMS = 10_000
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache with a time-to-live for service read results, tied to a
+    dataset version that every write through the API bumps.
+
+    With a shared DatasetVersion, writes made by another worker, the bulk
+    loader or the ingestion pipeline clear the cache on the next lookup, and
+    ETags are derived from the shared version, so they validate on every
+    worker. Without one, the version is per process: other writers are only
+    picked up when entries expire, so ttl_seconds bounds how stale a response
+    can be, and ETags include a per-process token.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 60.0,
+        dataset_version: Optional[DatasetVersion] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.dataset_version = dataset_version
+        self.version = 0
+        self._token = uuid.uuid4().hex[:12]
+        self._shared_version = dataset_version.current() if dataset_version else None
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, resource: str) -> str:
+        """The validator of resource, e.g. a request's path and query string."""
+        digest = hashlib.blake2b(resource.encode(), digest_size=8).hexdigest()
+        if self.dataset_version is not None:
+            return f'"{self.dataset_version.current()}-{digest}"'
+        # Also rolls over every ttl_seconds, so clients revalidate against
+        # writes this process cannot see as promptly as cached entries do
+        if self.ttl_seconds > 0:
+            epoch = int(time.monotonic() // self.ttl_seconds)
+            return f'"{self._token}-{self.version}-{epoch}-{digest}"'
+        return f'"{self._token}-{self.version}-{digest}"'
+
+    def bump_version(self) -> None:
+        if self.dataset_version is not None:
+            self.dataset_version.bump()
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def _sync_shared_version(self) -> None:
+        # Called with the lock held: another process's write clears the cache
+        if self.dataset_version is None:
+            return
+        shared_version = self.dataset_version.current()
+        if shared_version != self._shared_version:
+            self._shared_version = shared_version
+            self.version += 1
+            self._entries.clear()
+
+    def _lookup(self, key: Hashable, now: float) -> tuple[Any, int]:
+        with self._lock:
+            self._sync_shared_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1], self.version
+            return _MISSING, self.version
+
+    def _store(self, key: Hashable, value: Any, version: int, now: float) -> None:
+        if isinstance(value, (list, tuple)) and len(value) > MAX_CACHED_ITEMS:
+            return
+        with self._lock:
+            # A write while computing makes the value stale before it is stored
+            if version == self.version:
+                self._entries[key] = (now + self.ttl_seconds, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self, key: Hashable, compute: Callable[..., Any], *args, **kwargs
+    ) -> Any:
+        if self.max_entries <= 0:
+            return compute(*args, **kwargs)
+        now = time.monotonic()
+        value, version = self._lookup(key, now)
+        if value is _MISSING:
+            value = compute(*args, **kwargs)
+            self._store(key, value, version, now)
+        return value
+
+    async def get_or_compute_async(
+        self, key: Hashable, compute: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        if self.max_entries <= 0:
+            return await compute(*args, **kwargs)
+        now = time.monotonic()
+        value, version = self._lookup(key, now)
+        if value is _MISSING:
+            value = await compute(*args, **kwargs)
+            self._store(key, value, version, now)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Size of the grid cells used as a coarse spatial key for bounding-box queries
+GRID_CELL_DEGREES = 0.5
+GRID_ROWS = int(180 / GRID_CELL_DEGREES)
+GRID_COLUMNS = int(360 / GRID_CELL_DEGREES)
+
+# Points outside these ranges, or with a NaN coordinate, have no grid cell
+LATITUDE_RANGE = (-90.0, 90.0)
+LONGITUDE_RANGE = (-180.0, 180.0)
+
+# Coarse latitude bands the per-year summaries are kept for, made of whole
+# grid cell rows so a band is a contiguous grid cell range
+LAT_BAND_DEGREES = 10
+GRID_ROWS_PER_LAT_BAND = int(LAT_BAND_DEGREES / GRID_CELL_DEGREES)
+
+
+def _grid_row(latitude):
+    row = np.floor((np.asarray(latitude, dtype=np.float64) + 90) / GRID_CELL_DEGREES)
+    return np.clip(row, 0, GRID_ROWS - 1).astype(np.int64)
+
+
+def _grid_column(longitude):
+    column = np.floor(
+        (np.asarray(longitude, dtype=np.float64) + 180) / GRID_CELL_DEGREES
+    )
+    return np.clip(column, 0, GRID_COLUMNS - 1).astype(np.int64)
+
+
+def valid_coordinates(latitude, longitude):
+    """Whether each point has finite coordinates within their ranges."""
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    # NaN compares false, so it is invalid without a separate check
+    with np.errstate(invalid="ignore"):
+        return (
+            (latitude >= LATITUDE_RANGE[0])
+            & (latitude <= LATITUDE_RANGE[1])
+            & (longitude >= LONGITUDE_RANGE[0])
+            & (longitude <= LONGITUDE_RANGE[1])
+        )
+
+
+def compute_grid_cell(latitude, longitude):
+    """
+    Row-major index of the grid cell containing each point. Accepts scalars or
+    arrays; a cell's neighbours along a latitude row have consecutive keys.
+    Points without valid coordinates have no cell: None for scalars, masked
+    entries of the returned masked array for arrays.
+    """
+    valid = valid_coordinates(latitude, longitude)
+    if np.ndim(valid) == 0:
+        if not valid:
+            return None
+        return int(_grid_row(latitude) * GRID_COLUMNS + _grid_column(longitude))
+    latitude = np.where(valid, latitude, 0.0)
+    longitude = np.where(valid, longitude, 0.0)
+    grid_cell = _grid_row(latitude) * GRID_COLUMNS + _grid_column(longitude)
+    return np.ma.masked_array(grid_cell, mask=~valid)
+
+
+def get_grid_cell_ranges(
+    lat_min: float, lat_max: float, long_min: float, long_max: float
+) -> list[tuple[int, int]]:
+    """
+    Inclusive grid cell key ranges covering a bounding box: one range per
+    latitude row, merged into a single range when the box spans every longitude.
+    """
+    row_min, row_max = int(_grid_row(lat_min)), int(_grid_row(lat_max))
+    column_min, column_max = int(_grid_column(long_min)), int(_grid_column(long_max))
+
+    ranges = []
+    for row in range(row_min, row_max + 1):
+        start = row * GRID_COLUMNS + column_min
+        end = row * GRID_COLUMNS + column_max
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def get_lat_band(grid_cell: int) -> int:
+    """Southern edge in degrees of the latitude band containing a grid cell."""
+    row = grid_cell // GRID_COLUMNS
+    return (row // GRID_ROWS_PER_LAT_BAND) * LAT_BAND_DEGREES - 90
+
+
+def get_latitude_lat_band(latitude: float) -> int:
+    """Latitude band containing a latitude, as for its grid cells."""
+    return get_lat_band(compute_grid_cell(latitude, 0.0))
+
+
+def get_lat_band_grid_cell_range(lat_band: int) -> tuple[int, int]:
+    first_row = (lat_band + 90) // LAT_BAND_DEGREES * GRID_ROWS_PER_LAT_BAND
+    return (
+        first_row * GRID_COLUMNS,
+        (first_row + GRID_ROWS_PER_LAT_BAND) * GRID_COLUMNS - 1,
+    )
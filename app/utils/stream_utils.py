@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import math
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional, Sequence
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+STREAM_MEDIA_TYPES = {"ndjson": NDJSON_MEDIA_TYPE, "csv": CSV_MEDIA_TYPE}
+
+
+def resolve_stream_format(
+    format: Optional[str] = None, accept: Optional[str] = None
+) -> Optional[str]:
+    """
+    Streaming format requested through the format parameter or, failing
+    that, the Accept header. None means a regular JSON array response.
+    """
+    if format is not None:
+        return None if format == "json" else format
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";", 1)[0].strip().lower()
+        for stream_format, stream_media_type in STREAM_MEDIA_TYPES.items():
+            if media_type == stream_media_type:
+                return stream_format
+    return None
+
+
+def _clean(value):
+    # NaN is not valid JSON; missing PM2.5 values are served as null
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _ndjson_batch(columns: Sequence[str], batch: list[tuple]) -> bytes:
+    lines = [
+        json.dumps(dict(zip(columns, map(_clean, row))), separators=(",", ":"))
+        for row in batch
+    ]
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+def _csv_rows(rows: Iterable[Iterable]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(
+    columns: Sequence[str], batches: Iterable[list[tuple]]
+) -> Iterator[bytes]:
+    for batch in batches:
+        chunk = _ndjson_batch(columns, batch)
+        if chunk:
+            yield chunk
+
+
+def encode_csv(
+    columns: Sequence[str], batches: Iterable[list[tuple]]
+) -> Iterator[bytes]:
+    yield _csv_rows([columns])
+    for batch in batches:
+        if batch:
+            yield _csv_rows(map(_clean, row) for row in batch)
+
+
+async def encode_stream_async(
+    stream_format: str, columns: Sequence[str], batches: AsyncIterable[list[tuple]]
+) -> AsyncIterator[bytes]:
+    """encode_ndjson or encode_csv over batches from an async iterable."""
+    if stream_format == "csv":
+        yield _csv_rows([columns])
+    async for batch in batches:
+        if stream_format == "csv":
+            chunk = _csv_rows(map(_clean, row) for row in batch)
+        else:
+            chunk = _ndjson_batch(columns, batch)
+        if chunk:
+            yield chunk
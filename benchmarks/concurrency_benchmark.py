@@ -0,0 +1,127 @@
+"""
+Compare throughput and latency of the API in sync and async DB_MODE under
+concurrent clients, in-process through ASGI so only the application and the
+database are measured. The database must already be loaded (see
+app.db.bulk_loader); a SQLite file stands in when PostgreSQL is not available.
+The response cache is disabled so every request reaches the database.
+
+python -m benchmarks.concurrency_benchmark \
+--database_url postgresql://air_quality_user:<password>@localhost:5433/air_quality_db
+python -m benchmarks.concurrency_benchmark --database_url sqlite:///air_quality.db
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from app.db.database_manager import DatabaseManager
+from app.db.grid_index import GridIndex
+from app.main import app
+from app.schemas.settings import Settings
+
+
+def make_settings(database_url: str, db_mode: str, **overrides) -> Settings:
+    url = make_url(database_url)
+    return Settings(
+        _env_file=None,
+        stage="benchmark",
+        db_user=url.username or "",
+        db_password=url.password or "",
+        db_host=url.host or "",
+        db_port=url.port or 0,
+        db_name=url.database or "",
+        db_url=database_url,
+        db_mode=db_mode,
+        response_cache_max_entries=0,
+        log_group_name="air_quality_api_benchmark",
+        **overrides,
+    )
+
+
+async def run_clients(
+    path: str, params: dict, concurrency: int, requests: int
+) -> tuple[float, list[float]]:
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+
+        async def worker(count: int):
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get(path, params=params)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        per_worker, extra = divmod(requests, concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(per_worker + (i < extra)) for i in range(concurrency))
+        )
+        return time.perf_counter() - start, latencies
+
+
+async def benchmark_mode(args, db_mode: str) -> None:
+    settings = make_settings(args.database_url, db_mode)
+    db_manager = DatabaseManager.from_settings(settings)
+    app.state.settings = settings
+    app.state.db_manager = db_manager
+    app.state.grid_index = GridIndex(settings.parquet_dataset_dir)
+
+    params = {}
+    if args.path == "/data/region":
+        params = dict(zip(("lat_min", "lat_max", "long_min", "long_max"), args.bbox))
+    elif args.path == "/data/top":
+        params = {"year": args.year, "n": 10}
+    try:
+        # One warm-up round fills the connection pools
+        await run_clients(args.path, params, 1, 2)
+        for concurrency in args.concurrency:
+            seconds, latencies = await run_clients(
+                args.path, params, concurrency, args.requests
+            )
+            latencies.sort()
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(
+                f"{db_mode:5}  concurrency {concurrency:4}  "
+                f"{len(latencies) / seconds:9,.1f} req/s  "
+                f"p50 {statistics.median(latencies) * 1000:8.1f} ms  "
+                f"p95 {p95 * 1000:8.1f} ms"
+            )
+    finally:
+        await db_manager.dispose_async()
+        db_manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database_url", required=True)
+    parser.add_argument(
+        "--path",
+        default="/data/region",
+        choices=["/data/region", "/data/stats", "/data/top", "/data/"],
+    )
+    parser.add_argument("--year", type=int, default=2020, help="Year for /data/top")
+    parser.add_argument(
+        "--bbox",
+        type=float,
+        nargs=4,
+        default=[40.0, 42.0, 10.0, 12.0],
+        metavar=("LAT_MIN", "LAT_MAX", "LONG_MIN", "LONG_MAX"),
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument(
+        "--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"]
+    )
+    args = parser.parse_args()
+
+    for db_mode in args.modes:
+        asyncio.run(benchmark_mode(args, db_mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare rows per second of the /data/region read path before and after the
+Core/orjson fast path, on a database already loaded with at least one year
+(see app.db.bulk_loader). Both paths must render the same bytes.
+
+python -m benchmarks.read_path_benchmark \
+--database_url postgresql://air_quality_user:<password>@localhost:5433/air_quality_db
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.db.database_manager import DatabaseManager
+from app.repositories.air_quality_repository import (
+    RECORD_COLUMNS,
+    AirQualityRepository,
+)
+from app.schemas.air_quality import AirQualityResponse
+from app.utils.json_utils import encode_records_json
+
+RESPONSE_ADAPTER = TypeAdapter(list[AirQualityResponse])
+
+
+def orm_path(repository: AirQualityRepository, bbox) -> bytes:
+    # ORM objects validated through the response model, as before
+    records = repository.get_data_within_region(*bbox)
+    validated = RESPONSE_ADAPTER.validate_python(records, from_attributes=True)
+    return JSONResponse(
+        content=RESPONSE_ADAPTER.dump_python(validated, mode="json")
+    ).body
+
+
+def row_path(repository: AirQualityRepository, bbox) -> bytes:
+    return encode_records_json(RECORD_COLUMNS, repository.get_rows_within_region(*bbox))
+
+
+def time_path(path, repository, bbox, repeats: int) -> tuple[float, bytes]:
+    timings = []
+    for _ in range(repeats):
+        repository.db.expunge_all()
+        start = time.perf_counter()
+        body = path(repository, bbox)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database_url", required=True)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--bbox",
+        type=float,
+        nargs=4,
+        default=[-35.0, 37.0, -18.0, 52.0],
+        metavar=("LAT_MIN", "LAT_MAX", "LONG_MIN", "LONG_MAX"),
+    )
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(database_url=args.database_url)
+    with db_manager.get_db() as db:
+        repository = AirQualityRepository(db)
+        orm_seconds, orm_body = time_path(orm_path, repository, args.bbox, args.repeats)
+        row_seconds, row_body = time_path(row_path, repository, args.bbox, args.repeats)
+        row_count = len(repository.get_rows_within_region(*args.bbox))
+
+    assert orm_body == row_body, "fast path output differs from the response model"
+    print(f"{row_count} rows, identical output ({len(row_body)} bytes)")
+    print(f"ORM + response model  {row_count / orm_seconds:12,.0f} rows/s")
+    print(f"Core rows + orjson    {row_count / row_seconds:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
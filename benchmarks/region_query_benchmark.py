@@ -0,0 +1,84 @@
+"""
+Compare /data/region query latency with the grid-cell index against a plain
+latitude/longitude scan on a database already loaded with a full-resolution
+year (see app.db.bulk_loader).
+
+python -m benchmarks.region_query_benchmark \
+--database_url postgresql://air_quality_user:<password>@localhost:5433/air_quality_db
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.db.database_manager import DatabaseManager
+from app.db.models.air_quality import AirQualityData
+from app.repositories.air_quality_repository import AirQualityRepository
+
+
+def random_bounding_boxes(count: int, size_degrees: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lat_min = rng.uniform(-90.0, 90.0 - size_degrees, count)
+    long_min = rng.uniform(-180.0, 180.0 - size_degrees, count)
+    return [
+        (lat, lat + size_degrees, lon, lon + size_degrees)
+        for lat, lon in zip(lat_min, long_min)
+    ]
+
+
+def coordinate_scan(db, lat_min, lat_max, long_min, long_max):
+    return (
+        db.query(AirQualityData)
+        .filter(
+            AirQualityData.latitude.between(lat_min, lat_max),
+            AirQualityData.longitude.between(long_min, long_max),
+        )
+        .all()
+    )
+
+
+def time_queries(query, bounding_boxes) -> list[float]:
+    timings = []
+    for bbox in bounding_boxes:
+        start = time.perf_counter()
+        query(*bbox)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name: str, timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"{name:<16} median {statistics.median(ordered) * 1000:8.2f} ms"
+        f"  p95 {p95 * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database_url", required=True)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--size_degrees", type=float, default=5.0)
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(database_url=args.database_url)
+    bounding_boxes = random_bounding_boxes(args.queries, args.size_degrees)
+
+    with db_manager.get_db() as db:
+        repository = AirQualityRepository(db)
+        # Warm up the buffer cache so both runs read the same pages from memory
+        time_queries(repository.get_data_within_region, bounding_boxes[:5])
+        grid_cell = time_queries(repository.get_data_within_region, bounding_boxes)
+        scan = time_queries(
+            lambda *bbox: coordinate_scan(db, *bbox), bounding_boxes
+        )
+
+    print(summarize("grid_cell index", grid_cell))
+    print(summarize("lat/lon scan", scan))
+
+
+if __name__ == "__main__":
+    main()
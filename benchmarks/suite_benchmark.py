@@ -0,0 +1,442 @@
+"""
+Time the ingestion pipeline and every read route of the API on a synthetic
+SEDAC-shaped dataset (see notebooks.synthetic_data), and write latency
+percentiles, throughput and peak RSS as a JSON baseline. Each ingestion stage
+runs in a fresh process so the peak RSS reported is its own. Routes are timed
+one request at a time under TestClient, then under concurrent clients through
+ASGI, with the response cache disabled. The database tables are recreated, so
+point --database_url at a scratch database (default: SQLite in --data_dir).
+
+With --compare, the run exits non-zero when a stage or route is slower, or
+uses more memory, than in the given baseline by more than --tolerance.
+Baselines are only comparable for the same resolution, years and database.
+
+python -m benchmarks.suite_benchmark --resolution 0.5 --years 3 \
+--output benchmark_baseline.json
+python -m benchmarks.suite_benchmark --resolution 0.5 --years 3 \
+--compare benchmark_baseline.json --output benchmark_results.json
+python -m benchmarks.suite_benchmark \
+--database_url postgresql://air_quality_user:<password>@localhost:5433/air_quality_bench
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import make_url
+
+from app.db.analytics_store import AnalyticsStore, write_analytics
+from app.db.bulk_loader import BulkLoader
+from app.db.database_manager import DatabaseManager
+from app.db.grid_index import GridIndex
+from app.db.grid_pyramid import GridPyramid, write_year_pyramid_from_file
+from app.db.parquet_handler import write_year_partitions_from_file
+from app.db.timeseries_store import TimeSeriesStore, write_timeseries_store
+from app.main import app
+from app.utils.response_cache import ResponseCache
+from benchmarks.concurrency_benchmark import make_settings, run_clients
+from notebooks.data_utils import (
+    get_netcdf_file,
+    process_netcdf_file,
+    process_netcdf_file_streaming,
+)
+from notebooks.synthetic_data import grid_shape, write_sedac_dataset
+
+# Lower is better for these metrics, higher for throughput
+STAGE_METRICS = ("seconds", "peak_rss_mb")
+ROUTE_METRICS = ("p50_ms", "p95_ms")
+THROUGHPUT_METRIC = "throughput_rps"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[round(q * (len(sorted_values) - 1))]
+
+
+def summarize_latencies(latencies: list[float], seconds: float) -> dict:
+    """Latency percentiles in milliseconds and throughput of a timed run."""
+    latencies = sorted(latencies)
+    summary = {"requests": len(latencies)}
+    for q in (50, 95, 99):
+        summary[f"p{q}_ms"] = round(percentile(latencies, q / 100) * 1000, 3)
+    summary[THROUGHPUT_METRIC] = round(len(latencies) / seconds, 1)
+    return summary
+
+
+def _processed_file(processed_dir: Path, year: int) -> Path:
+    return processed_dir / f"pm25_processed_{year}.parquet"
+
+
+# Ingestion stages run in a spawned process and return their row count
+
+
+def _process_netcdf_files(sedac_dir: Path, years: list[int]) -> int:
+    return sum(
+        len(process_netcdf_file(str(get_netcdf_file(sedac_dir, year)), year))
+        for year in years
+    )
+
+
+def _write_processed_files(
+    sedac_dir: Path, processed_dir: Path, years: list[int]
+) -> int:
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    return sum(
+        process_netcdf_file_streaming(
+            str(get_netcdf_file(sedac_dir, year)),
+            year,
+            _processed_file(processed_dir, year),
+        )
+        for year in years
+    )
+
+
+def _write_dataset(processed_dir: Path, years: list[int], dataset_dir: str) -> int:
+    return sum(
+        write_year_partitions_from_file(
+            _processed_file(processed_dir, year), year, dataset_dir
+        )
+        for year in years
+    )
+
+
+def _write_pyramid(processed_dir: Path, years: list[int], pyramid_dir: str) -> int:
+    for year in years:
+        write_year_pyramid_from_file(
+            _processed_file(processed_dir, year), year, pyramid_dir
+        )
+    return _row_count(processed_dir, years)
+
+
+def _write_timeseries(
+    processed_dir: Path, years: list[int], timeseries_dir: str
+) -> int:
+    year_files = {year: _processed_file(processed_dir, year) for year in years}
+    return write_timeseries_store(year_files, timeseries_dir)
+
+
+def _write_analytics(timeseries_dir: str, analytics_dir: str) -> int:
+    return write_analytics(timeseries_dir, analytics_dir)
+
+
+def _bulk_load(database_url: str, processed_dir: Path, years: list[int]) -> int:
+    db_manager = DatabaseManager(database_url=database_url)
+    try:
+        db_manager.recreate_tables()
+        return BulkLoader(db_manager).load_directory(
+            processed_dir, start_year=min(years), end_year=max(years)
+        )
+    finally:
+        db_manager.engine.dispose()
+
+
+def _row_count(processed_dir: Path, years: list[int]) -> int:
+    return sum(
+        pq.ParquetFile(_processed_file(processed_dir, year)).metadata.num_rows
+        for year in years
+    )
+
+
+def _run_timed(function: Callable[..., int], args: tuple) -> tuple[float, int, float]:
+    start = time.perf_counter()
+    rows = function(*args)
+    return time.perf_counter() - start, rows, peak_rss_mb()
+
+
+def run_stage(function: Callable[..., int], *args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        seconds, rows, rss = executor.submit(_run_timed, function, args).result()
+    return {
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_second": round(rows / seconds, 1),
+        "peak_rss_mb": round(rss, 1),
+    }
+
+
+def benchmark_ingestion(args, data_dir: Path, years: list[int]) -> dict:
+    sedac_dir = data_dir / "data"
+    processed_dir = data_dir / "processed_data"
+    dataset_dir = str(data_dir / "pm25_dataset")
+    pyramid_dir = str(data_dir / "pm25_pyramid")
+    timeseries_dir = str(data_dir / "pm25_timeseries")
+    analytics_dir = str(data_dir / "pm25_analytics")
+
+    write_sedac_dataset(sedac_dir, years, args.resolution, args.seed)
+    stages = {
+        "process_netcdf_file": (_process_netcdf_files, sedac_dir, years),
+        "process_netcdf_file_streaming": (
+            _write_processed_files,
+            sedac_dir,
+            processed_dir,
+            years,
+        ),
+        "write_year_partitions": (_write_dataset, processed_dir, years, dataset_dir),
+        "write_year_pyramid": (_write_pyramid, processed_dir, years, pyramid_dir),
+        "write_timeseries_store": (
+            _write_timeseries,
+            processed_dir,
+            years,
+            timeseries_dir,
+        ),
+        "write_analytics": (_write_analytics, timeseries_dir, analytics_dir),
+        "bulk_load": (_bulk_load, args.database_url, processed_dir, years),
+    }
+    results = {}
+    for name, (function, *stage_args) in stages.items():
+        results[name] = run_stage(function, *stage_args)
+        print(
+            f"{name:30}  {results[name]['seconds']:9.3f} s  "
+            f"{results[name]['rows_per_second']:12,.0f} rows/s  "
+            f"{results[name]['peak_rss_mb']:8.1f} MB"
+        )
+    return results
+
+
+def route_requests(year: int, resolution: float) -> dict[str, tuple[str, dict]]:
+    """Path and parameters of one request to each read route."""
+    # A cell centre, so exact-match filters find a record
+    latitude = 40 + resolution / 2
+    longitude = 10 + resolution / 2
+    bbox = {"lat_min": 40.0, "lat_max": 45.0, "long_min": 10.0, "long_max": 15.0}
+    return {
+        "/data/": ("/data/", {"limit": 100, "year": year}),
+        "/data/stats": ("/data/stats", {}),
+        "/data/stats?group_by=year": ("/data/stats", {"group_by": "year"}),
+        "/data/stats/percentiles": ("/data/stats/percentiles", {"year": year}),
+        "/data/region": ("/data/region", bbox),
+        "/data/top10": ("/data/top10", {"year": year}),
+        "/data/top": ("/data/top", {"year": year, "n": 100}),
+        "/data/filter": (
+            "/data/filter",
+            {"year": year, "lat": latitude, "long": longitude},
+        ),
+        "/data/normalized": ("/data/normalized", {"limit": 100, "year": year}),
+        "/data/nearest": (
+            "/data/nearest",
+            {"lat": latitude, "lon": longitude, "k": 10, "year": year},
+        ),
+        "/data/timeseries": ("/data/timeseries", {"lat": latitude, "lon": longitude}),
+        "/data/trend": ("/data/trend", bbox),
+        "/data/change": ("/data/change", {"year": year, **bbox}),
+        "/data/grid": ("/data/grid", {"resolution": 2.0, "year": year}),
+    }
+
+
+def benchmark_routes(args, data_dir: Path, years: list[int]) -> dict:
+    settings = make_settings(
+        args.database_url,
+        args.db_mode,
+        repository_backend=args.backend,
+        parquet_dataset_dir=str(data_dir / "pm25_dataset"),
+        pyramid_dir=str(data_dir / "pm25_pyramid"),
+        timeseries_dir=str(data_dir / "pm25_timeseries"),
+        analytics_dir=str(data_dir / "pm25_analytics"),
+    )
+    db_manager = DatabaseManager.from_settings(settings)
+    app.state.settings = settings
+    app.state.db_manager = db_manager
+    app.state.grid_pyramid = GridPyramid(settings.pyramid_dir)
+    app.state.grid_index = GridIndex(
+        settings.parquet_dataset_dir, grid_pyramid=app.state.grid_pyramid
+    )
+    app.state.timeseries_store = TimeSeriesStore(settings.timeseries_dir)
+    app.state.analytics_store = AnalyticsStore(settings.analytics_dir)
+    app.state.response_cache = ResponseCache(max_entries=0)
+
+    # Not used as a context manager, so the lifespan keeps the state above
+    client = TestClient(app)
+    requests = route_requests(max(years), args.resolution)
+    first_id = client.get("/data/", params={"limit": 1}).json()[0]["id"]
+    requests["/data/{record_id}"] = (f"/data/{first_id}", {})
+
+    results = {}
+    try:
+        for name, (path, params) in requests.items():
+            # Warm-up requests fill caches, memory maps and connection pools
+            for _ in range(2):
+                client.get(path, params=params).raise_for_status()
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                request_start = time.perf_counter()
+                client.get(path, params=params).raise_for_status()
+                latencies.append(time.perf_counter() - request_start)
+            results[name] = {
+                "sequential": summarize_latencies(
+                    latencies, time.perf_counter() - start
+                )
+            }
+
+        async def run_concurrent():
+            try:
+                for name, (path, params) in requests.items():
+                    seconds, latencies = await run_clients(
+                        path, params, args.concurrency, args.concurrent_requests
+                    )
+                    results[name]["concurrent"] = {
+                        "concurrency": args.concurrency,
+                        **summarize_latencies(latencies, seconds),
+                    }
+            finally:
+                await db_manager.dispose_async()
+
+        asyncio.run(run_concurrent())
+    finally:
+        db_manager.engine.dispose()
+
+    for name, result in results.items():
+        sequential, concurrent = result["sequential"], result["concurrent"]
+        print(
+            f"{name:28}  p50 {sequential['p50_ms']:8.2f} ms  "
+            f"p95 {sequential['p95_ms']:8.2f} ms  "
+            f"{concurrent['throughput_rps']:9,.1f} req/s "
+            f"at concurrency {concurrent['concurrency']}"
+        )
+    return results
+
+
+def run_suite(args) -> dict:
+    years = list(range(args.start_year, args.start_year + args.years))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = args.data_dir or Path(temp_dir)
+        if args.database_url is None:
+            args.database_url = f"sqlite:///{data_dir / 'air_quality.db'}"
+
+        ingestion = benchmark_ingestion(args, data_dir, years)
+        routes = benchmark_routes(args, data_dir, years)
+
+    n_lat, n_lon = grid_shape(args.resolution)
+    return {
+        "config": {
+            "resolution": args.resolution,
+            "grid_shape": [n_lat, n_lon],
+            "years": years,
+            "database": make_url(args.database_url).get_backend_name(),
+            "db_mode": args.db_mode,
+            "backend": args.backend,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "concurrent_requests": args.concurrent_requests,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": multiprocessing.cpu_count(),
+        },
+        "ingestion": ingestion,
+        "routes": routes,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def _compare(
+    label: str, baseline: float, current: float, tolerance: float, higher_is_better
+) -> Optional[str]:
+    if higher_is_better:
+        regressed = current * (1 + tolerance) < baseline
+    else:
+        regressed = current > baseline * (1 + tolerance)
+    if not regressed:
+        return None
+    return f"{label}: {baseline:g} -> {current:g}"
+
+
+def find_regressions(baseline: dict, results: dict, tolerance: float) -> list[str]:
+    """
+    Metrics worse than in the baseline by more than tolerance (a fraction),
+    as readable lines. Stages and routes missing from either side are skipped.
+    """
+    comparisons = []
+    for name, stage in results.get("ingestion", {}).items():
+        base_stage = baseline.get("ingestion", {}).get(name)
+        if base_stage:
+            comparisons += [
+                (f"{name} {metric}", base_stage[metric], stage[metric], False)
+                for metric in STAGE_METRICS
+            ]
+    for name, route in results.get("routes", {}).items():
+        for run, summary in route.items():
+            base_summary = baseline.get("routes", {}).get(name, {}).get(run)
+            if not base_summary:
+                continue
+            comparisons += [
+                (f"{name} {run} {metric}", base_summary[metric], summary[metric], False)
+                for metric in ROUTE_METRICS
+            ]
+            comparisons.append(
+                (
+                    f"{name} {run} {THROUGHPUT_METRIC}",
+                    base_summary[THROUGHPUT_METRIC],
+                    summary[THROUGHPUT_METRIC],
+                    True,
+                )
+            )
+
+    regressions = (
+        _compare(label, base, current, tolerance, higher_is_better)
+        for label, base, current, higher_is_better in comparisons
+    )
+    return [regression for regression in regressions if regression]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data_dir",
+        type=Path,
+        default=None,
+        help="Where to keep the synthetic data (default: a temporary directory)",
+    )
+    parser.add_argument("--resolution", type=float, default=0.5)
+    parser.add_argument("--start_year", type=int, default=1998)
+    parser.add_argument("--years", type=int, default=3, help="Number of years")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database_url", default=None)
+    parser.add_argument("--db_mode", default="sync", choices=["sync", "async"])
+    parser.add_argument(
+        "--backend", default="database", choices=["database", "parquet", "grid"]
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--concurrent_requests", type=int, default=256)
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline.get("config") != results["config"]:
+            print("Warning: the baseline was recorded with a different configuration")
+        regressions = find_regressions(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
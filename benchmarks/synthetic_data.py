@@ -0,0 +1,32 @@
+"""
+Write a synthetic SEDAC-shaped dataset for the benchmarks with
+notebooks.synthetic_data, the writer the test fixtures use.
+
+python -m benchmarks.synthetic_data --data_dir data/synthetic --resolution 0.1 \
+--start_year 1998 --years 5
+"""
+
+import argparse
+from pathlib import Path
+
+from notebooks.synthetic_data import write_sedac_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=Path, required=True)
+    parser.add_argument("--resolution", type=float, default=0.5)
+    parser.add_argument("--start_year", type=int, default=1998)
+    parser.add_argument("--years", type=int, default=3, help="Number of years")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    years = range(args.start_year, args.start_year + args.years)
+    for file_path in write_sedac_dataset(
+        args.data_dir, years, args.resolution, args.seed
+    ):
+        print(file_path)
+
+
+if __name__ == "__main__":
+    main()
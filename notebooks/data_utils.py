@@ -1,11 +1,22 @@
 import logging
+import os
 from pathlib import Path
+from typing import Iterator, Optional
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from netCDF4 import Dataset
 
 logger = logging.getLogger(__name__)
 
+PM25_VAR = "GWRPM25"
+LAT_VAR = "lat"
+LON_VAR = "lon"
+
+# Latitude rows read per band in streaming mode
+DEFAULT_BAND_SIZE = 100
+
 
 # @log_operation_decorator("Locate netCDF File")
 def get_netcdf_file(data_dir: Path, year: int):
@@ -54,37 +65,28 @@ def get_netcdf_file(data_dir: Path, year: int):
     return netcdf_file
 
 
+def _has_required_variables(ds: Dataset, file_path: str) -> bool:
+    for var in (PM25_VAR, LAT_VAR, LON_VAR):
+        if var not in ds.variables:
+            logger.error(f"Variable '{var}' not found in {file_path}.")
+            logger.debug(f"Available variables: {list(ds.variables.keys())}")
+            return False
+    return True
+
+
 # @log_operation_decorator("Process netCDF File")
 def process_netcdf_file(file_path: str, year: int):
     logger.debug(f"Opening netCDF file: {file_path}")
 
     try:
         with Dataset(file_path, "r") as ds:
-            # Correct variable name for PM2.5 data
-            pm25_var = "GWRPM25"
-            if pm25_var not in ds.variables:
-                logger.error(f"Variable '{pm25_var}' not found in {file_path}.")
-                logger.debug(f"Available variables: {list(ds.variables.keys())}")
-                return None
-
-            # Correct variable names for coordinates
-            lat_var = "lat"
-            lon_var = "lon"
-
-            if lat_var not in ds.variables:
-                logger.error(f"Variable '{lat_var}' not found in {file_path}.")
-                logger.debug(f"Available variables: {list(ds.variables.keys())}")
-                return None
-
-            if lon_var not in ds.variables:
-                logger.error(f"Variable '{lon_var}' not found in {file_path}.")
-                logger.debug(f"Available variables: {list(ds.variables.keys())}")
+            if not _has_required_variables(ds, file_path):
                 return None
 
             # Extract data
-            pm25 = ds.variables[pm25_var][:]
-            lat = ds.variables[lat_var][:]
-            lon = ds.variables[lon_var][:]
+            pm25 = ds.variables[PM25_VAR][:]
+            lat = ds.variables[LAT_VAR][:]
+            lon = ds.variables[LON_VAR][:]
 
             logger.debug(f"PM2.5 data shape: {pm25.shape}")
             logger.debug(f"Latitude data shape: {lat.shape}")
@@ -120,17 +122,96 @@ def process_netcdf_file(file_path: str, year: int):
         return None
 
 
-def save_processed_data_to_parquet(df: pd.DataFrame, output_dir: Path, year: int):
+def iter_netcdf_bands(
+    ds: Dataset, year: int, band_size: int = DEFAULT_BAND_SIZE
+) -> Iterator[pa.Table]:
+    pm25_var = ds.variables[PM25_VAR]
+    lat = ds.variables[LAT_VAR][:]
+    lon = ds.variables[LON_VAR][:]
+    pm25_dtype = np.result_type(pm25_var.dtype, np.float32)
+
+    for start in range(0, len(lat), band_size):
+        stop = min(start + band_size, len(lat))
+
+        # Only this band of the variable is read; masked cells become NaN
+        pm25_band = np.ma.filled(
+            np.ma.asarray(pm25_var[start:stop, :], dtype=pm25_dtype), np.nan
+        )
+
+        # Coordinates are broadcast views, copied only when flattened for this band
+        lat_band = np.broadcast_to(lat[start:stop, np.newaxis], pm25_band.shape)
+        lon_band = np.broadcast_to(lon[np.newaxis, :], pm25_band.shape)
+
+        yield pa.table(
+            {
+                "year": np.full(pm25_band.size, year, dtype=np.int64),
+                "latitude": np.ravel(lat_band),
+                "longitude": np.ravel(lon_band),
+                "pm25_level": pm25_band.ravel(),
+            }
+        )
+
+
+def process_netcdf_file_streaming(
+    file_path: str, year: int, output_file: Path, band_size: int = DEFAULT_BAND_SIZE
+) -> Optional[int]:
+    logger.debug(f"Streaming netCDF file {file_path} to {output_file}")
+
+    # Bands are written to a temporary file that only replaces the output when complete
+    tmp_file = Path(f"{output_file}.tmp")
+    row_count = 0
+
+    try:
+        with Dataset(file_path, "r") as ds:
+            if not _has_required_variables(ds, file_path):
+                return None
+
+            writer = None
+            try:
+                for table in iter_netcdf_bands(ds, year, band_size):
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_file, table.schema)
+                    # One row group per band keeps peak memory bounded by the band size
+                    writer.write_table(table, row_group_size=table.num_rows)
+                    row_count += table.num_rows
+            finally:
+                if writer is not None:
+                    writer.close()
+
+        if row_count == 0:
+            logger.error(f"No data found in {file_path}.")
+            return None
+
+        os.replace(tmp_file, output_file)
+        logger.info(f"Streamed {row_count} records for year {year} to {output_file}")
+        return row_count
+
+    except Exception as e:
+        logger.exception(f"Error streaming file {file_path}: {e}")
+        return None
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+
+def save_processed_data_to_parquet(
+    df: pd.DataFrame, output_dir: Path, year: int, overwrite: bool = False
+):
     output_file = output_dir / f"pm25_processed_{year}.parquet"
 
     # Check if the file already exists
-    if output_file.exists():
+    if output_file.exists() and not overwrite:
         logger.warning(f"File already exists: {output_file}. Aborting save operation.")
         return  # Avoid overwriting
 
     logger.info(f"Saving DataFrame to Parguet: {output_file}")
 
-    with open(output_file, "wb") as f:
-        df.to_parquet(f, engine="fastparquet")
+    # Write next to the target and swap it in, so readers never see a partial file
+    tmp_file = Path(f"{output_file}.tmp")
+    try:
+        with open(tmp_file, "wb") as f:
+            df.to_parquet(f, engine="fastparquet")
+        os.replace(tmp_file, output_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
 
     logger.info(f"Data for year {year} saved to {output_file}")
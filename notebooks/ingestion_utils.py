@@ -0,0 +1,563 @@
+import argparse
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import pyarrow.parquet as pq
+from netCDF4 import Dataset
+
+from app.db.analytics_store import write_analytics
+from app.db.database_manager import DatabaseManager
+from app.db.dataset_version import DatasetVersion
+from app.db.grid_pyramid import write_year_pyramid_from_file
+from app.db.parquet_handler import write_year_partitions_from_file
+from app.db.timeseries_store import write_timeseries_store
+from app.repositories.ingestion_manifest_repository import IngestionManifestRepository
+from notebooks.data_utils import (
+    DEFAULT_BAND_SIZE,
+    get_netcdf_file,
+    process_netcdf_file,
+    process_netcdf_file_streaming,
+    save_processed_data_to_parquet,
+)
+from notebooks.errors.no_data_found_error import NoDataFoundError
+from notebooks.log_utils import LogUtils, log_operation
+
+logger = logging.getLogger(__name__)
+
+# Rough peak bytes per grid cell while process_netcdf_file runs: the masked
+# GWRPM25 variable, two meshgrid arrays, their flattened copies and the final
+# DataFrame all coexist for a moment. In streaming mode the same holds for a
+# single latitude band.
+BYTES_PER_GRID_CELL = 72
+
+# Fraction of the available memory the pool is allowed to plan for.
+MEMORY_BUDGET_RATIO = 0.8
+
+CHECKSUM_CHUNK_SIZE = 8 << 20
+
+
+@dataclass
+class YearResult:
+    year: int
+    status: str
+    row_count: int = 0
+    output_file: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+    source_file: Optional[str] = None
+    source_size: Optional[int] = None
+    source_mtime_ns: Optional[int] = None
+    source_checksum: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status in ("completed", "unchanged")
+
+
+def get_output_file(processed_data_dir: Path, year: int) -> Path:
+    return processed_data_dir / f"pm25_processed_{year}.parquet"
+
+
+def get_output_files(processed_data_dir: Path) -> dict[int, str]:
+    """
+    Every year with a processed Parquet file. Outputs are swapped in whole, so
+    each file is complete, including those of years outside this run or whose
+    reprocessing failed and left the earlier file in place.
+    """
+    output_files = {}
+    for output_file in processed_data_dir.glob("pm25_processed_*.parquet"):
+        year = output_file.stem.rsplit("_", 1)[-1]
+        if year.isdigit():
+            output_files[int(year)] = str(output_file)
+    return output_files
+
+
+def compute_file_checksum(file_path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def process_data(
+    year: int,
+    data_dir: Path,
+    processed_data_dir: Path,
+    streaming: bool = False,
+    band_size: int = DEFAULT_BAND_SIZE,
+    overwrite: bool = False,
+) -> int:
+    # Locate the netCDF file for the specified year
+    file_path = log_operation(
+        "Locate netCDF File", lambda: get_netcdf_file(data_dir, year)
+    )
+
+    if not file_path:
+        raise FileNotFoundError(f"No netCDF file found for the year {year}")
+
+    if streaming:
+        return _stream_data(file_path, year, processed_data_dir, band_size, overwrite)
+
+    # Process the netCDF file to get a DataFrame
+    df = log_operation(
+        "Process netCDF File", lambda: process_netcdf_file(file_path, year)
+    )
+
+    if df is None or df.empty:
+        raise NoDataFoundError(year)
+
+    log_operation(
+        "Save processed data to Parquet",
+        lambda: save_processed_data_to_parquet(
+            df, processed_data_dir, year, overwrite=overwrite
+        ),
+    )
+    return len(df)
+
+
+def _stream_data(
+    file_path: Path,
+    year: int,
+    processed_data_dir: Path,
+    band_size: int,
+    overwrite: bool,
+) -> int:
+    output_file = get_output_file(processed_data_dir, year)
+
+    if output_file.exists() and not overwrite:
+        logger.warning(f"File already exists: {output_file}. Aborting save operation.")
+        return pq.ParquetFile(output_file).metadata.num_rows
+
+    row_count = log_operation(
+        "Stream netCDF File to Parquet",
+        lambda: process_netcdf_file_streaming(file_path, year, output_file, band_size),
+    )
+
+    if not row_count:
+        raise NoDataFoundError(year)
+
+    return row_count
+
+
+def process_year(
+    year: int,
+    data_dir: Path,
+    processed_data_dir: Path,
+    streaming: bool = False,
+    band_size: int = DEFAULT_BAND_SIZE,
+    known_checksum: Optional[str] = None,
+    track_changes: bool = False,
+    dataset_dir: Optional[Path] = None,
+    pyramid_dir: Optional[Path] = None,
+) -> YearResult:
+    # Runs inside a worker process, so every failure is reported as a result
+    # instead of an exception that would have to be pickled back.
+    start_time = time.time()
+    output_file = get_output_file(processed_data_dir, year)
+    result = YearResult(year=year, status="completed", output_file=str(output_file))
+
+    try:
+        if track_changes:
+            file_path = get_netcdf_file(data_dir, year)
+            if not file_path:
+                raise FileNotFoundError(f"No netCDF file found for the year {year}")
+
+            stat = os.stat(file_path)
+            result.source_file = str(file_path)
+            result.source_size = stat.st_size
+            result.source_mtime_ns = stat.st_mtime_ns
+            result.source_checksum = compute_file_checksum(file_path)
+
+            # The file was touched but its content did not change
+            if result.source_checksum == known_checksum and output_file.exists():
+                result.status = "unchanged"
+                result.row_count = pq.ParquetFile(output_file).metadata.num_rows
+                if dataset_dir and not (dataset_dir / f"year={year}").exists():
+                    write_year_partitions_from_file(output_file, year, dataset_dir)
+                if pyramid_dir and not (pyramid_dir / f"year={year}").exists():
+                    write_year_pyramid_from_file(output_file, year, pyramid_dir)
+                result.elapsed_seconds = time.time() - start_time
+                return result
+
+        result.row_count = process_data(
+            year,
+            data_dir,
+            processed_data_dir,
+            streaming,
+            band_size,
+            overwrite=track_changes,
+        )
+
+        # Repartition the yearly file by latitude band for predicate pushdown
+        if dataset_dir:
+            log_operation(
+                "Write partitioned dataset",
+                lambda: write_year_partitions_from_file(output_file, year, dataset_dir),
+            )
+
+        # Coarsened grids for zoomed-out queries, from the same yearly file
+        if pyramid_dir:
+            log_operation(
+                "Build aggregation pyramid",
+                lambda: write_year_pyramid_from_file(output_file, year, pyramid_dir),
+            )
+    except Exception as e:
+        result.status = "failed"
+        result.error = f"{type(e).__name__}: {e}"
+
+    result.elapsed_seconds = time.time() - start_time
+    return result
+
+
+def get_available_memory() -> Optional[int]:
+    # MemAvailable accounts for reclaimable page cache, unlike SC_AVPHYS_PAGES
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimate_year_memory(file_path: Path, band_size: Optional[int] = None) -> int:
+    with Dataset(file_path, "r") as ds:
+        lat_rows = ds.variables["lat"].size
+        if band_size:
+            lat_rows = min(lat_rows, band_size)
+        grid_cells = lat_rows * ds.variables["lon"].size
+    return grid_cells * BYTES_PER_GRID_CELL
+
+
+def resolve_max_workers(
+    max_workers: Optional[int],
+    year_memory_bytes: Optional[int],
+    memory_limit_bytes: Optional[int] = None,
+) -> int:
+    workers = max_workers or os.cpu_count() or 1
+
+    if memory_limit_bytes is None:
+        available_memory = get_available_memory()
+        if available_memory is not None:
+            memory_limit_bytes = int(available_memory * MEMORY_BUDGET_RATIO)
+
+    if memory_limit_bytes and year_memory_bytes:
+        memory_workers = max(1, memory_limit_bytes // year_memory_bytes)
+        if memory_workers < workers:
+            logger.info(
+                f"Capping workers from {workers} to {memory_workers}: each year needs "
+                f"~{year_memory_bytes / 2**30:.1f} GiB of a "
+                f"{memory_limit_bytes / 2**30:.1f} GiB budget."
+            )
+            workers = memory_workers
+
+    return workers
+
+
+def _is_unchanged(
+    entry,
+    file_path: Path,
+    output_file: Path,
+    dataset_dir: Optional[Path],
+    pyramid_dir: Optional[Path],
+) -> bool:
+    # Cheap check on size and mtime so unchanged sources are never re-hashed
+    if entry is None or entry.parquet_status != "completed":
+        return False
+    if not output_file.exists():
+        return False
+    if dataset_dir and not (dataset_dir / f"year={entry.year}").exists():
+        return False
+    if pyramid_dir and not (pyramid_dir / f"year={entry.year}").exists():
+        return False
+    stat = os.stat(file_path)
+    return (
+        entry.source_size == stat.st_size
+        and entry.source_mtime_ns == stat.st_mtime_ns
+    )
+
+
+def _record_result(
+    manifest_repository: IngestionManifestRepository, entry, result: YearResult
+):
+    if result.status == "failed":
+        manifest_repository.upsert(result.year, {"parquet_status": "failed"})
+        return
+
+    updates = {
+        "source_file": result.source_file,
+        "source_size": result.source_size,
+        "source_mtime_ns": result.source_mtime_ns,
+        "source_checksum": result.source_checksum,
+        "row_count": result.row_count,
+        "parquet_file": result.output_file,
+        "parquet_status": "completed",
+    }
+    if entry is None or entry.db_checksum != result.source_checksum:
+        updates["db_status"] = "pending"
+    manifest_repository.upsert(result.year, updates)
+
+
+def process_years(
+    years: Iterable[int],
+    data_dir: Path,
+    processed_data_dir: Path,
+    max_workers: Optional[int] = None,
+    memory_limit_bytes: Optional[int] = None,
+    progress_callback: Optional[Callable[[YearResult, int, int], None]] = None,
+    streaming: bool = False,
+    band_size: int = DEFAULT_BAND_SIZE,
+    db_manager: Optional[DatabaseManager] = None,
+    force: bool = False,
+    dataset_dir: Optional[Path] = None,
+    pyramid_dir: Optional[Path] = None,
+    timeseries_dir: Optional[Path] = None,
+    analytics_dir: Optional[Path] = None,
+    baseline: Optional[tuple[int, int]] = None,
+    dataset_version: Optional[DatasetVersion] = None,
+) -> list[YearResult]:
+    """
+    Convert each year's netCDF file to Parquet in a pool of worker processes.
+    With a db_manager, the ingestion manifest is used to skip years whose
+    source file has not changed and to mark changed years for reloading.
+    With a dataset_dir, each year is also written to the partitioned dataset,
+    and with a pyramid_dir to the aggregation pyramid. With a timeseries_dir,
+    the cell-major time-series store is rebuilt from every processed year in
+    processed_data_dir once all are processed, not only from this run's
+    years, and with an analytics_dir the per-cell trends and changes are
+    recomputed from it. A dataset_version is bumped once any year's output
+    is rewritten, so the API's workers drop cached responses and ETags.
+    """
+    if analytics_dir and not timeseries_dir:
+        raise ValueError("analytics_dir requires timeseries_dir")
+    years = list(years)
+    os.makedirs(processed_data_dir, exist_ok=True)
+
+    manifest = {}
+    if db_manager is not None:
+        db_manager.create_tables()
+        with db_manager.get_db() as db:
+            manifest = IngestionManifestRepository(db).get_all()
+
+    results = []
+    pending_years = []
+    year_memory_bytes = 0
+    for year in years:
+        file_path = get_netcdf_file(data_dir, year)
+        if not file_path:
+            pending_years.append(year)
+            continue
+
+        entry = manifest.get(year)
+        output_file = get_output_file(processed_data_dir, year)
+        if db_manager is not None and not force:
+            if _is_unchanged(
+                entry, file_path, output_file, dataset_dir, pyramid_dir
+            ):
+                logger.info(f"Year {year} is unchanged since the last run. Skipping.")
+                results.append(
+                    YearResult(
+                        year=year,
+                        status="unchanged",
+                        row_count=entry.row_count or 0,
+                        output_file=str(output_file),
+                    )
+                )
+                continue
+
+        pending_years.append(year)
+        # Size the pool for the largest grid we are about to open
+        try:
+            year_memory_bytes = max(
+                year_memory_bytes,
+                estimate_year_memory(file_path, band_size if streaming else None),
+            )
+        except Exception as e:
+            logger.warning(f"Could not estimate memory for year {year}: {e}")
+
+    if not pending_years:
+        logger.info("All years are up to date.")
+        if timeseries_dir and not timeseries_dir.exists():
+            _write_timeseries_store(processed_data_dir, timeseries_dir)
+        if analytics_dir and not analytics_dir.exists():
+            _write_analytics(timeseries_dir, analytics_dir, baseline)
+        return sorted(results, key=lambda result: result.year)
+
+    workers = min(
+        resolve_max_workers(max_workers, year_memory_bytes, memory_limit_bytes),
+        len(pending_years),
+    )
+    logger.info(
+        f"Processing {len(pending_years)} years with {workers} worker processes."
+    )
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for year in pending_years:
+            entry = manifest.get(year)
+            future = executor.submit(
+                process_year,
+                year,
+                data_dir,
+                processed_data_dir,
+                streaming,
+                band_size,
+                None if force or entry is None else entry.source_checksum,
+                db_manager is not None,
+                dataset_dir,
+                pyramid_dir,
+            )
+            futures[future] = year
+
+        for completed, future in enumerate(as_completed(futures), start=1):
+            year = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died, e.g. it was killed for running out of memory
+                result = YearResult(
+                    year=year, status="failed", error=f"{type(e).__name__}: {e}"
+                )
+
+            if result.succeeded:
+                logger.info(
+                    f"[{completed}/{len(pending_years)}] Year {year} {result.status}: "
+                    f"{result.row_count} records in {result.elapsed_seconds:.2f} seconds."
+                )
+            else:
+                logger.error(
+                    f"[{completed}/{len(pending_years)}] Year {year} failed: "
+                    f"{result.error}"
+                )
+
+            if db_manager is not None:
+                with db_manager.get_db() as db:
+                    _record_result(
+                        IngestionManifestRepository(db), manifest.get(year), result
+                    )
+
+            if progress_callback:
+                progress_callback(result, completed, len(pending_years))
+            results.append(result)
+
+    failed_years = [result.year for result in results if not result.succeeded]
+    if failed_years:
+        logger.warning(f"Failed years: {sorted(failed_years)}")
+
+    if timeseries_dir:
+        _write_timeseries_store(processed_data_dir, timeseries_dir)
+    if analytics_dir:
+        _write_analytics(timeseries_dir, analytics_dir, baseline)
+
+    if dataset_version is not None and any(
+        result.status == "completed" for result in results
+    ):
+        dataset_version.bump()
+
+    return sorted(results, key=lambda result: result.year)
+
+
+def _write_timeseries_store(processed_data_dir: Path, timeseries_dir: Path) -> None:
+    # Every processed year goes into the store, so a run over some of the
+    # years or with a failed year does not drop the others' history
+    year_files = get_output_files(processed_data_dir)
+    if not year_files:
+        return
+    cell_count = log_operation(
+        "Write time-series store",
+        lambda: write_timeseries_store(year_files, timeseries_dir),
+    )
+    logger.info(
+        f"Time-series store written for {len(year_files)} years and "
+        f"{cell_count} grid cells."
+    )
+
+
+def _write_analytics(
+    timeseries_dir: Path, analytics_dir: Path, baseline: Optional[tuple[int, int]]
+) -> None:
+    if not timeseries_dir.exists():
+        logger.warning("No time-series store to compute trends and changes from.")
+        return
+    trend_count = log_operation(
+        "Compute trends and changes",
+        lambda: write_analytics(str(timeseries_dir), str(analytics_dir), baseline),
+    )
+    logger.info(f"Trends computed for {trend_count} grid cells.")
+
+
+def get_ingestion_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stage", default="development")
+    parser.add_argument("--data_dir", default="data")
+    parser.add_argument("--processed_data_dir", default="processed_data")
+    parser.add_argument("--start_year", type=int, default=1998)
+    parser.add_argument("--end_year", type=int, default=2022)
+    parser.add_argument("--max_workers", type=int, default=None)
+    parser.add_argument("--memory_limit_gb", type=float, default=None)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--band_size", type=int, default=DEFAULT_BAND_SIZE)
+    parser.add_argument("--database_url", default=None)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--dataset_dir", default=None)
+    parser.add_argument("--pyramid_dir", default=None)
+    parser.add_argument("--timeseries_dir", default=None)
+    parser.add_argument("--analytics_dir", default=None)
+    parser.add_argument("--dataset_version_file", default=None)
+    parser.add_argument(
+        "--baseline", type=int, nargs=2, default=None, metavar=("START", "END")
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_ingestion_args()
+    LogUtils(stage=args.stage).configure_logging()
+
+    memory_limit_bytes = (
+        int(args.memory_limit_gb * 2**30) if args.memory_limit_gb else None
+    )
+    db_manager = (
+        DatabaseManager(database_url=args.database_url) if args.database_url else None
+    )
+    results = process_years(
+        range(args.start_year, args.end_year + 1),
+        Path(args.data_dir),
+        Path(args.processed_data_dir),
+        max_workers=args.max_workers,
+        memory_limit_bytes=memory_limit_bytes,
+        streaming=args.streaming,
+        band_size=args.band_size,
+        db_manager=db_manager,
+        force=args.force,
+        dataset_dir=Path(args.dataset_dir) if args.dataset_dir else None,
+        pyramid_dir=Path(args.pyramid_dir) if args.pyramid_dir else None,
+        timeseries_dir=Path(args.timeseries_dir) if args.timeseries_dir else None,
+        analytics_dir=Path(args.analytics_dir) if args.analytics_dir else None,
+        baseline=tuple(args.baseline) if args.baseline else None,
+        dataset_version=(
+            DatasetVersion(args.dataset_version_file)
+            if args.dataset_version_file
+            else None
+        ),
+    )
+
+    failed = [result for result in results if not result.succeeded]
+    logger.info(f"{len(results) - len(failed)}/{len(results)} years processed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
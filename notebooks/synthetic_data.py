@@ -0,0 +1,71 @@
+"""
+Write synthetic netCDF files shaped like the SEDAC GWRPM25 grids, in the same
+directory layout (see notebooks.data_utils.get_netcdf_file), so the pipeline
+and the API can be exercised without downloading the real dataset. Levels are
+uniform in [0, 100) and every 5th row and 7th column is a fill value, like
+the oceans of the source files. A resolution of 0.01 matches the real grids.
+
+Used by the test fixtures and by the benchmarks (see benchmarks.synthetic_data).
+"""
+
+from pathlib import Path
+
+import numpy as np
+from netCDF4 import Dataset
+
+NETCDF_DIR_PREFIX = "sdei-global-annual-gwr-pm2-5-modis-misr-seawifs-viirs-aod-v5-gl-04"
+FILL_VALUE = -999.0
+DEFAULT_BAND_ROWS = 512
+
+
+def grid_shape(resolution: float) -> tuple[int, int]:
+    """Latitude and longitude cell counts of a global grid."""
+    return round(180 / resolution), round(360 / resolution)
+
+
+def write_sedac_netcdf(
+    data_dir,
+    year: int,
+    n_lat: int = 18,
+    n_lon: int = 36,
+    seed: int = 0,
+    band_rows: int = DEFAULT_BAND_ROWS,
+) -> Path:
+    """
+    Write one year's grid of n_lat x n_lon cells centred in the globe, a band
+    of rows at a time so memory stays bounded at any resolution. The levels
+    depend only on seed + year, not on band_rows.
+    """
+    netcdf_dir = Path(data_dir) / f"{NETCDF_DIR_PREFIX}-{year}-netcdf"
+    netcdf_dir.mkdir(parents=True, exist_ok=True)
+    file_path = netcdf_dir / f"{NETCDF_DIR_PREFIX}-{year}-netcdf.nc"
+
+    lat_step = 180 / n_lat
+    lon_step = 360 / n_lon
+    lat = -90 + lat_step / 2 + np.arange(n_lat) * lat_step
+    lon = -180 + lon_step / 2 + np.arange(n_lon) * lon_step
+
+    rng = np.random.default_rng(seed + year)
+    with Dataset(file_path, "w") as ds:
+        ds.createDimension("lat", n_lat)
+        ds.createDimension("lon", n_lon)
+        ds.createVariable("lat", "f8", ("lat",))[:] = lat
+        ds.createVariable("lon", "f8", ("lon",))[:] = lon
+        pm25_var = ds.createVariable(
+            "GWRPM25", "f4", ("lat", "lon"), fill_value=FILL_VALUE
+        )
+        for start in range(0, n_lat, band_rows):
+            rows = min(band_rows, n_lat - start)
+            pm25 = rng.uniform(0, 100, size=(rows, n_lon)).astype(np.float32)
+            # Oceans are stored as fill values in the source files
+            pm25[-start % 5 :: 5, ::7] = FILL_VALUE
+            pm25_var[start : start + rows] = np.ma.masked_equal(pm25, FILL_VALUE)
+
+    return file_path
+
+
+def write_sedac_dataset(
+    data_dir, years, resolution: float, seed: int = 0
+) -> list[Path]:
+    n_lat, n_lon = grid_shape(resolution)
+    return [write_sedac_netcdf(data_dir, year, n_lat, n_lon, seed) for year in years]
@@ -0,0 +1,103 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.analytics_store import AnalyticsStore
+from app.db.database_manager import DatabaseManager
+from app.db.dataset_version import DatasetVersion
+from app.db.grid_index import GridIndex
+from app.db.grid_pyramid import GridPyramid
+from app.db.timeseries_store import TimeSeriesStore
+from app.db.parquet_handler import write_year_partitions_from_file
+from app.main import app
+from app.schemas.settings import Settings
+from app.utils.response_cache import ResponseCache
+from notebooks.data_utils import get_netcdf_file, process_netcdf_file_streaming
+from notebooks.synthetic_data import write_sedac_netcdf
+
+
+@pytest.fixture
+def sedac_data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    for year in (1998, 1999):
+        write_sedac_netcdf(data_dir, year)
+    return data_dir
+
+
+@pytest.fixture
+def processed_data_dir(sedac_data_dir, tmp_path):
+    processed_data_dir = tmp_path / "processed_data"
+    processed_data_dir.mkdir()
+    for year in (1998, 1999):
+        process_netcdf_file_streaming(
+            str(get_netcdf_file(sedac_data_dir, year)),
+            year,
+            processed_data_dir / f"pm25_processed_{year}.parquet",
+        )
+    return processed_data_dir
+
+
+@pytest.fixture
+def dataset_dir(processed_data_dir):
+    dataset_dir = str(processed_data_dir / "pm25_dataset")
+    for year in (1998, 1999):
+        write_year_partitions_from_file(
+            processed_data_dir / f"pm25_processed_{year}.parquet", year, dataset_dir
+        )
+    return dataset_dir
+
+
+def make_settings(**overrides) -> Settings:
+    values = {
+        "stage": "test",
+        "db_user": "air_quality_user",
+        "db_password": "air_quality_password",
+        "db_host": "localhost",
+        "db_port": 5432,
+        "db_name": "air_quality_db",
+        "db_url": "sqlite://",
+        "log_group_name": "air_quality_api_test",
+    }
+    values.update(overrides)
+    return Settings(_env_file=None, **values)
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    """Build a TestClient against the app with the given settings in app state."""
+
+    def _make_client(**overrides) -> TestClient:
+        overrides.setdefault("db_url", f"sqlite:///{tmp_path / 'air_quality.db'}")
+        overrides.setdefault("dataset_version_file", str(tmp_path / "dataset_version"))
+        settings = make_settings(**overrides)
+        db_manager = DatabaseManager.from_settings(settings)
+        db_manager.create_tables()
+        app.state.settings = settings
+        app.state.db_manager = db_manager
+        app.state.grid_pyramid = GridPyramid(settings.pyramid_dir)
+        app.state.grid_index = GridIndex(
+            settings.parquet_dataset_dir,
+            max_years=settings.grid_index_max_years,
+            grid_pyramid=app.state.grid_pyramid,
+        )
+        app.state.timeseries_store = TimeSeriesStore(settings.timeseries_dir)
+        app.state.analytics_store = AnalyticsStore(settings.analytics_dir)
+        app.state.response_cache = ResponseCache(
+            max_entries=settings.response_cache_max_entries,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            dataset_version=DatasetVersion(settings.dataset_version_file),
+        )
+        return TestClient(app)
+
+    yield _make_client
+
+    for name in (
+        "settings",
+        "db_manager",
+        "grid_index",
+        "grid_pyramid",
+        "timeseries_store",
+        "analytics_store",
+        "response_cache",
+    ):
+        if hasattr(app.state, name):
+            delattr(app.state, name)
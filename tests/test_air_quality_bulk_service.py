@@ -0,0 +1,131 @@
+import io
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import select
+
+from app.db.models.air_quality_pm25_histogram import AirQualityPM25Histogram
+from app.db.models.air_quality_summary import AirQualitySummary
+from app.repositories.air_quality_summary_repository import (
+    rebuild_air_quality_summary,
+)
+
+ROWS = [
+    {"year": 2020, "latitude": 12.5, "longitude": 40.25, "pm25_level": 31.0},
+    {"year": 2020, "latitude": -33.0, "longitude": 151.0, "pm25_level": None},
+    {"year": 2021, "latitude": 51.5, "longitude": -0.25, "pm25_level": 9.5},
+    {"year": 2021, "latitude": 52.0, "longitude": 0.5, "pm25_level": 14.0},
+    {"year": 2021, "latitude": 48.5, "longitude": 2.25, "pm25_level": 22.5},
+]
+
+
+def encode_body(media_type: str) -> bytes:
+    table = pa.Table.from_pylist(ROWS)
+    if media_type == "application/json":
+        return orjson.dumps(ROWS)
+    if media_type == "application/x-ndjson":
+        return b"\n".join(orjson.dumps(row) for row in ROWS)
+    sink = io.BytesIO()
+    if media_type == "application/vnd.apache.arrow.stream":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return sink.getvalue()
+
+
+def summary_rows(db_manager) -> list[tuple]:
+    with db_manager.engine.connect() as conn:
+        query = select(AirQualitySummary.__table__).order_by(
+            AirQualitySummary.year, AirQualitySummary.lat_band
+        )
+        rows = [tuple(row) for row in conn.execute(query)]
+        query = select(AirQualityPM25Histogram.__table__).order_by(
+            *AirQualityPM25Histogram.__table__.primary_key.columns
+        )
+        return rows + [tuple(row) for row in conn.execute(query)]
+
+
+@pytest.mark.parametrize(
+    "media_type",
+    [
+        "application/json",
+        "application/x-ndjson",
+        "application/vnd.apache.arrow.stream",
+        "application/vnd.apache.parquet",
+    ],
+)
+def test_bulk_insert_formats(make_client, media_type):
+    client = make_client()
+    response = client.post(
+        "/data/bulk",
+        params={"batch_size": 2},
+        content=encode_body(media_type),
+        headers={"Content-Type": media_type},
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "inserted": 5,
+        "batches": 3,
+        "first_id": None,
+        "last_id": None,
+    }
+    records = client.get("/data/", params={"limit": 10}).json()
+    assert [{k: r[k] for k in ROWS[0]} for r in records] == ROWS
+
+    # The incrementally maintained summary matches one rebuilt from scratch
+    db_manager = client.app.state.db_manager
+    incremental = summary_rows(db_manager)
+    with db_manager.engine.begin() as conn:
+        rebuild_air_quality_summary(conn)
+    assert incremental == pytest.approx(summary_rows(db_manager))
+
+
+def test_bulk_insert_returns_id_range(make_client):
+    client = make_client()
+    response = client.post(
+        "/data/bulk",
+        params={"return_ids": True, "batch_size": 3},
+        content=orjson.dumps(ROWS),
+        headers={"Content-Type": "application/json"},
+    )
+
+    result = response.json()
+    ids = [record["id"] for record in client.get("/data/").json()]
+    assert (result["first_id"], result["last_id"]) == (min(ids), max(ids))
+
+
+def test_bulk_insert_rejects_invalid_rows_without_inserting(make_client):
+    client = make_client()
+    rows = [*ROWS, {"year": 0, "latitude": 95.0, "longitude": 10.0}]
+    response = client.post(
+        "/data/bulk",
+        content=orjson.dumps(rows),
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [
+        ["body", 5, "year"],
+        ["body", 5, "latitude"],
+    ]
+    assert client.get("/data/stats").json()["count"] == 0
+
+    response = client.post(
+        "/data/bulk", content=b"year,latitude", headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 415
+
+
+def test_bulk_insert_invalidates_cached_reads(make_client):
+    client = make_client()
+    assert client.get("/data/stats").json()["count"] == 0
+    client.post(
+        "/data/bulk",
+        content=orjson.dumps(ROWS),
+        headers={"Content-Type": "application/json"},
+    )
+    assert client.get("/data/stats").json()["count"] == 5
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db.bulk_loader import BulkLoader
+from app.db.database_manager import DatabaseManager
+from app.db.models.air_quality import AirQualityData
+from app.repositories.air_quality_repository import AirQualityRepository
+from app.utils.spatial_utils import compute_grid_cell, get_grid_cell_ranges
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+    db_manager.create_tables()
+    return db_manager
+
+
+@pytest.fixture
+def loaded_db_manager(db_manager, processed_data_dir):
+    BulkLoader(db_manager).load_directory(processed_data_dir)
+    return db_manager
+
+
+def test_grid_cell_is_maintained_on_create_and_update(db_manager):
+    with db_manager.get_db() as db:
+        repository = AirQualityRepository(db)
+        record = repository.create(
+            AirQualityData(year=2023, latitude=37.7749, longitude=-122.4194)
+        )
+        assert record.grid_cell == compute_grid_cell(37.7749, -122.4194)
+
+        record = repository.update(record, {"latitude": -33.9, "longitude": 18.4})
+        assert record.grid_cell == compute_grid_cell(-33.9, 18.4)
+
+
+def test_get_grid_cell_ranges_merges_full_rows():
+    assert len(get_grid_cell_ranges(10.0, 20.0, -5.0, 5.0)) == 21
+    assert len(get_grid_cell_ranges(-90.0, 90.0, -180.0, 180.0)) == 1
+
+
+def test_get_data_within_region_matches_coordinate_scan(loaded_db_manager):
+    bbox = (-25.0, 15.0, -40.0, 60.0)
+
+    with loaded_db_manager.get_db() as db:
+        records = AirQualityRepository(db).get_data_within_region(*bbox)
+        expected = (
+            db.query(AirQualityData)
+            .filter(
+                AirQualityData.latitude.between(bbox[0], bbox[1]),
+                AirQualityData.longitude.between(bbox[2], bbox[3]),
+            )
+            .all()
+        )
+
+    assert len(records) > 0
+    assert {record.id for record in records} == {record.id for record in expected}
+
+
+def read_all_pages(client, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get(
+            "/data/", params={**params, **({"cursor": cursor} if cursor else {})}
+        )
+        assert response.status_code == 200
+        ids.extend(record["id"] for record in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("repository_backend", ["database", "parquet"])
+def test_cursor_pages_cover_every_record_once(
+    make_client, processed_data_dir, dataset_dir, repository_backend
+):
+    client = make_client(
+        repository_backend=repository_backend, parquet_dataset_dir=dataset_dir
+    )
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+
+    ids = read_all_pages(client, limit=97)
+    assert len(ids) == len(set(ids)) == 2 * 18 * 36
+
+    region_ids = read_all_pages(
+        client, limit=5, year=1999, lat_min=-25, lat_max=15, long_min=-40, long_max=60
+    )
+    region = client.get(
+        "/data/region",
+        params={"lat_min": -25, "lat_max": 15, "long_min": -40, "long_max": 60},
+    ).json()
+    assert sorted(region_ids) == sorted(r["id"] for r in region if r["year"] == 1999)
+
+
+def test_invalid_cursor_is_rejected(make_client):
+    client = make_client()
+
+    assert client.get("/data/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/data/", params={"skip": 10, "year": 1999}).status_code == 400
+
+
+@pytest.mark.parametrize("repository_backend", ["database", "parquet"])
+@pytest.mark.parametrize("bounds", ["global", "year"])
+def test_normalized_endpoint_pages_with_precomputed_bounds(
+    make_client, processed_data_dir, dataset_dir, repository_backend, bounds
+):
+    client = make_client(
+        repository_backend=repository_backend, parquet_dataset_dir=dataset_dir
+    )
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+    frames = {
+        year: pd.read_parquet(processed_data_dir / f"pm25_processed_{year}.parquet")
+        for year in (1998, 1999)
+    }
+    everything = pd.concat(frames.values())
+
+    records, cursor = [], None
+    while True:
+        params = {"limit": 250, "bounds": bounds}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/data/normalized", params=params)
+        records.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(records) == len(everything)
+    for record in records[:: len(records) // 20]:
+        frame = frames[record["year"]] if bounds == "year" else everything
+        low, high = frame["pm25_level"].min(), frame["pm25_level"].max()
+        match = frames[record["year"]].query(
+            "latitude == @record['latitude'] and longitude == @record['longitude']"
+        )["pm25_level"].iloc[0]
+        if np.isnan(match):
+            assert record["pm25_level_normalized"] is None
+        else:
+            assert record["pm25_level_normalized"] == pytest.approx(
+                (match - low) / (high - low)
+            )
+
+
+def test_normalized_bounds_follow_writes(make_client, processed_data_dir):
+    client = make_client()
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+    created = client.post(
+        "/data/",
+        json={"year": 1999, "latitude": 1.0, "longitude": 2.0, "pm25_level": 1000.0},
+    ).json()
+
+    records = client.get(
+        "/data/normalized", params={"year": 1999, "limit": 10_000}
+    ).json()
+    assert {r["id"]: r for r in records}[created["id"]]["pm25_level_normalized"] == 1.0
+
+
+@pytest.mark.parametrize("repository_backend", ["database", "parquet"])
+def test_top_endpoint_with_n_and_region(
+    make_client, processed_data_dir, dataset_dir, repository_backend
+):
+    client = make_client(
+        repository_backend=repository_backend, parquet_dataset_dir=dataset_dir
+    )
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+    frame = pd.read_parquet(processed_data_dir / "pm25_processed_1999.parquet")
+
+    top = client.get("/data/top", params={"year": 1999, "n": 25}).json()
+    assert [r["pm25_level"] for r in top] == pytest.approx(
+        frame.nlargest(25, "pm25_level")["pm25_level"].tolist()
+    )
+
+    region = {"lat_min": -25, "lat_max": 15, "long_min": -40, "long_max": 60}
+    top = client.get("/data/top", params={"year": 1999, "n": 7, **region}).json()
+    in_region = frame[
+        frame["latitude"].between(region["lat_min"], region["lat_max"])
+        & frame["longitude"].between(region["long_min"], region["long_max"])
+    ]
+    assert [r["pm25_level"] for r in top] == pytest.approx(
+        in_region.nlargest(7, "pm25_level")["pm25_level"].tolist()
+    )
+    assert len(client.get("/data/top10", params={"year": 1999}).json()) == 10
@@ -0,0 +1,190 @@
+import math
+
+import numpy as np
+import pytest
+from sqlalchemy import event, func, insert, select
+
+from app.db.bulk_loader import BulkLoader
+from app.db.database_manager import DatabaseManager
+from app.db.models.air_quality import AirQualityData
+from app.repositories.air_quality_repository import AirQualityRepository
+from app.repositories.air_quality_summary_repository import (
+    HISTOGRAM_TABLE,
+    SUMMARY_TABLE,
+    aggregate_buckets,
+    rebuild_air_quality_summary,
+)
+from app.utils import quantile_sketch
+from app.utils.spatial_utils import compute_grid_cell
+
+
+@pytest.fixture
+def db_manager(tmp_path, processed_data_dir):
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+    db_manager.create_tables()
+    BulkLoader(db_manager).load_directory(processed_data_dir)
+    return db_manager
+
+
+def scan_stats(db, year=None):
+    query = select(
+        func.count(AirQualityData.id),
+        func.avg(AirQualityData.pm25_level),
+        func.min(AirQualityData.pm25_level),
+        func.max(AirQualityData.pm25_level),
+    )
+    if year is not None:
+        query = query.where(AirQualityData.year == year)
+    count, average, min_pm25, max_pm25 = db.execute(query).one()
+    return {
+        "count": count,
+        "average_pm25": pytest.approx(average or 0.0),
+        "min_pm25": min_pm25 or 0.0,
+        "max_pm25": max_pm25 or 0.0,
+    }
+
+
+def summary_rows(db):
+    rows = db.execute(
+        select(SUMMARY_TABLE).order_by(SUMMARY_TABLE.c.year, SUMMARY_TABLE.c.lat_band)
+    ).all()
+    rows = [row[:2] + (row[2], row[3], pytest.approx(row[4])) + row[5:] for row in rows]
+    histogram = db.execute(
+        select(HISTOGRAM_TABLE).order_by(*HISTOGRAM_TABLE.primary_key.columns)
+    ).all()
+    return rows + histogram
+
+
+def test_bulk_load_builds_summary(db_manager):
+    with db_manager.get_db() as db:
+        repository = AirQualityRepository(db)
+        assert repository.get_stats() == scan_stats(db)
+        assert repository.get_stats(year=1999) == scan_stats(db, year=1999)
+        assert [stats["year"] for stats in repository.get_stats_by_year()] == [
+            1998,
+            1999,
+        ]
+
+
+def test_writes_keep_summary_in_sync(db_manager):
+    with db_manager.get_db() as db:
+        repository = AirQualityRepository(db)
+        top = repository.get_top_polluted_locations(year=1999, top_n=1)[0]
+        some = repository.get_by_id(5)
+
+        created = repository.create(
+            AirQualityData(year=2000, latitude=12.3, longitude=45.6, pm25_level=500.0)
+        )
+        repository.create(AirQualityData(year=2000, latitude=-70.0, longitude=1.0))
+        repository.update(top, {"pm25_level": 1.0})
+        repository.update(some, {"latitude": 80.1, "pm25_level": None})
+        repository.update(created, {"pm25_level": 2.0})
+        repository.delete(repository.get_by_id(6))
+
+        # Removing the 1999 maximum only marked its group stale
+        stale = db.execute(
+            select(SUMMARY_TABLE.c.year).where(SUMMARY_TABLE.c.pm25_bounds_stale)
+        ).scalars()
+        assert 1999 in set(stale)
+        assert repository.get_stats() == scan_stats(db)
+        assert repository.get_stats(year=2000)["max_pm25"] == 2.0
+        incremental = summary_rows(db)
+
+        rebuild_air_quality_summary(db.connection())
+        assert summary_rows(db) == incremental
+
+
+def boundary_values() -> np.ndarray:
+    # Every bucket edge, the values either side of it and the clamped ranges
+    edges = quantile_sketch.MIN_VALUE * quantile_sketch.GAMMA ** np.arange(
+        quantile_sketch.BUCKET_COUNT
+    )
+    edges = np.append(edges, [quantile_sketch.MIN_VALUE, quantile_sketch.MAX_VALUE])
+    return np.concatenate(
+        [
+            edges,
+            np.nextafter(edges, 0),
+            np.nextafter(edges, np.inf),
+            [-5.0, 0.0, 1e-9, 2 * quantile_sketch.MAX_VALUE, 1e12],
+        ]
+    )
+
+
+@pytest.mark.parametrize("ln_error", [0.0, 1e-12, -1e-12])
+def test_rebuilt_histogram_buckets_values_like_bucket_index(tmp_path, ln_error):
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+
+    # A database whose ln() rounds differently must still match bucket_index
+    @event.listens_for(db_manager.engine, "connect")
+    def replace_ln(dbapi_connection, connection_record):
+        dbapi_connection.create_function(
+            "ln", 1, lambda value: math.log(value) * (1 + ln_error)
+        )
+
+    db_manager.create_tables()
+    values = boundary_values()
+    grid_cell = compute_grid_cell(1.0, 1.0)
+    with db_manager.engine.begin() as conn:
+        conn.execute(
+            insert(AirQualityData),
+            [
+                {"year": 2000, "grid_cell": grid_cell, "pm25_level": value}
+                for value in values.tolist()
+            ],
+        )
+        rebuild_air_quality_summary(conn)
+        rebuilt = {
+            (year, lat_band, bucket): count
+            for year, lat_band, bucket, count in conn.execute(select(HISTOGRAM_TABLE))
+        }
+
+    grid_cells = np.full(len(values), grid_cell)
+    assert rebuilt == aggregate_buckets(np.full(len(values), 2000), grid_cells, values)
+
+
+def test_stats_endpoint_options(make_client, processed_data_dir):
+    client = make_client()
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+
+    overall = client.get("/data/stats").json()
+    by_year = client.get("/data/stats", params={"group_by": "year"}).json()
+    year_1999 = client.get("/data/stats", params={"year": 1999}).json()
+
+    assert overall["count"] == sum(stats["count"] for stats in by_year)
+    assert by_year[1] == {"year": 1999, **year_1999}
+    assert overall["max_pm25"] == max(stats["max_pm25"] for stats in by_year)
+
+
+@pytest.mark.parametrize("db_mode", ["sync", "async"])
+def test_predicate_update_and_delete_keep_summary_current(
+    make_client, processed_data_dir, db_mode
+):
+    client = make_client(db_mode=db_mode)
+    db_manager = client.app.state.db_manager
+    BulkLoader(db_manager).load_directory(processed_data_dir)
+    region = {"lat_min": -25, "lat_max": 15, "long_min": -40, "long_max": 60}
+
+    in_region = len(client.get("/data/region", params=region).json())
+    dry_run = client.patch(
+        "/data/", params={"year": 1998, **region, "dry_run": True}, json={"year": 2005}
+    ).json()
+    assert dry_run == {"affected": in_region // 2, "dry_run": True}
+    assert client.get("/data/stats", params={"year": 2005}).json()["count"] == 0
+
+    moved = client.patch(
+        "/data/", params={"year": 1998, **region}, json={"year": 2005}
+    ).json()
+    assert moved == {"affected": in_region // 2, "dry_run": False}
+    deleted = client.delete(
+        "/data/", params={"year": 1999, "pm25_min": 20, "pm25_max": 60}
+    ).json()
+    assert deleted["affected"] > 0
+
+    with db_manager.get_db() as db:
+        incremental = summary_rows(db)
+        assert AirQualityRepository(db).get_stats(year=2005) == scan_stats(db, 2005)
+        rebuild_air_quality_summary(db.connection())
+        assert summary_rows(db) == incremental
+
+    assert client.delete("/data/").status_code == 400
+    assert client.patch("/data/", params={"year": 1999}, json={}).status_code == 400
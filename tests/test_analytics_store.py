@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db.analytics_store import (
+    AnalyticsStore,
+    anomalies,
+    trend_slopes,
+    write_analytics,
+    year_over_year,
+)
+from app.db.timeseries_store import write_timeseries_store
+from notebooks.ingestion_utils import process_years
+
+WORLD = {"lat_min": -90, "lat_max": 90, "long_min": -180, "long_max": 180}
+
+
+@pytest.fixture
+def analytics_dir(processed_data_dir):
+    timeseries_dir = str(processed_data_dir / "pm25_timeseries")
+    write_timeseries_store(
+        {
+            year: processed_data_dir / f"pm25_processed_{year}.parquet"
+            for year in (1998, 1999)
+        },
+        timeseries_dir,
+    )
+    analytics_dir = str(processed_data_dir / "pm25_analytics")
+    write_analytics(timeseries_dir, analytics_dir)
+    return analytics_dir
+
+
+def test_trend_slopes_match_polyfit_and_skip_missing_years():
+    rng = np.random.default_rng(0)
+    years = np.array([2000, 2001, 2002, 2004, 2005])
+    series = rng.uniform(0, 50, size=(20, years.size))
+    series[::3, 1] = np.nan
+    series[5, 1:] = np.nan
+
+    slopes, n_years = trend_slopes(series, years)
+
+    for row in range(series.shape[0]):
+        valid = ~np.isnan(series[row])
+        assert n_years[row] == valid.sum()
+        if valid.sum() < 2:
+            assert np.isnan(slopes[row])
+        else:
+            expected = np.polyfit(years[valid], series[row, valid], 1)[0]
+            assert slopes[row] == pytest.approx(expected)
+
+
+def test_year_over_year_and_anomalies():
+    years = np.array([2000, 2001, 2003])
+    series = np.array([[1.0, 3.0, 6.0], [np.nan, 2.0, 5.0]])
+
+    np.testing.assert_array_equal(
+        year_over_year(series, years),
+        [[np.nan, 2.0, np.nan], [np.nan, np.nan, np.nan]],
+    )
+    np.testing.assert_array_equal(
+        anomalies(series, np.array([True, True, False])),
+        [[-1.0, 1.0, 4.0], [np.nan, 0.0, 3.0]],
+    )
+
+
+def test_trend_and_change_endpoints(make_client, processed_data_dir, analytics_dir):
+    frames = [
+        pd.read_parquet(processed_data_dir / f"pm25_processed_{year}.parquet")
+        for year in (1998, 1999)
+    ]
+    levels = pd.concat(
+        [frame.set_index(["latitude", "longitude"])["pm25_level"] for frame in frames],
+        axis=1,
+        keys=[1998, 1999],
+    ).dropna()
+    client = make_client(analytics_dir=analytics_dir)
+
+    trends = client.get("/data/trend", params=WORLD).json()
+    assert len(trends) == len(levels)
+    trend = trends[0]
+    expected = levels.loc[(trend["latitude"], trend["longitude"])]
+    assert trend["n_years"] == 2
+    assert trend["slope"] == pytest.approx(expected[1999] - expected[1998], rel=1e-5)
+
+    changes = client.get("/data/change", params={"year": 1999, **WORLD}).json()
+    assert len(changes) == frames[1]["pm25_level"].notna().sum()
+    cell = (trend["latitude"], trend["longitude"])
+    (change,) = [c for c in changes if (c["latitude"], c["longitude"]) == cell]
+    assert change["yoy_delta"] == pytest.approx(trend["slope"], rel=1e-5)
+    assert change["anomaly"] == pytest.approx(trend["slope"] / 2, rel=1e-4)
+
+    region = {"lat_min": 0, "lat_max": 20, "long_min": 0, "long_max": 20}
+    changes = client.get("/data/change", params={"year": 1998, **region}).json()
+    assert all(change["yoy_delta"] is None for change in changes)
+    assert {(change["latitude"], change["longitude"]) for change in changes} <= {
+        (5.0, 5.0),
+        (5.0, 15.0),
+        (15.0, 5.0),
+        (15.0, 15.0),
+    }
+
+    response = client.get("/data/change", params={"year": 2005, **WORLD})
+    assert response.status_code == 404
+
+
+def test_process_years_computes_analytics(sedac_data_dir, tmp_path):
+    process_years(
+        [1998, 1999],
+        sedac_data_dir,
+        tmp_path / "processed_data",
+        max_workers=2,
+        timeseries_dir=tmp_path / "pm25_timeseries",
+        analytics_dir=tmp_path / "pm25_analytics",
+        baseline=(1998, 1998),
+    )
+
+    metadata = AnalyticsStore(str(tmp_path / "pm25_analytics")).get_metadata()
+    assert metadata == {"years": [1998, 1999], "baseline": [1998, 1998]}
@@ -0,0 +1,62 @@
+import pytest
+
+from app.db.bulk_loader import BulkLoader
+
+REGION = {"lat_min": -25, "lat_max": 15, "long_min": -40, "long_max": 60}
+RECORD = {"year": 2020, "latitude": 12.5, "longitude": 40.25, "pm25_level": 31.0}
+
+
+@pytest.fixture
+def sync_and_async_clients(make_client, processed_data_dir):
+    sync_client = make_client()
+    BulkLoader(sync_client.app.state.db_manager).load_directory(processed_data_dir)
+    sync_responses = {}
+
+    def get(client, url, **params):
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        return response.content
+
+    requests = [
+        ("/data/", {"limit": 50, "year": 1999}),
+        ("/data/region", REGION),
+        ("/data/region", {**REGION, "format": "csv"}),
+        ("/data/filter", {"year": 1998}),
+        ("/data/stats", {"group_by": "year"}),
+        ("/data/normalized", {"limit": 20, "bounds": "year"}),
+        ("/data/top", {"year": 1998, "n": 5, **REGION}),
+    ]
+    for url, params in requests:
+        sync_responses[url, tuple(params.items())] = get(sync_client, url, **params)
+
+    # Same database file, now served through the aiosqlite engine
+    async_client = make_client(db_mode="async")
+    async_responses = {
+        (url, tuple(params.items())): get(async_client, url, **params)
+        for url, params in requests
+    }
+    return async_client, sync_responses, async_responses
+
+
+def test_async_mode_serves_the_same_responses(sync_and_async_clients):
+    _, sync_responses, async_responses = sync_and_async_clients
+    assert async_responses == sync_responses
+
+
+def test_async_mode_writes_keep_summary_current(sync_and_async_clients):
+    client, _, _ = sync_and_async_clients
+    count = client.get("/data/stats", params={"year": 2020}).json()["count"]
+    assert count == 0
+
+    created = client.post("/data/", json=RECORD).json()
+    assert created["id"] is not None
+    assert client.get(f"/data/{created['id']}").json() == created
+
+    updated = client.put(f"/data/{created['id']}", json={"pm25_level": 45.0}).json()
+    assert updated["pm25_level"] == 45.0
+    stats = client.get("/data/stats", params={"year": 2020}).json()
+    assert (stats["count"], stats["max_pm25"]) == (1, 45.0)
+
+    assert client.delete(f"/data/{created['id']}").status_code == 200
+    assert client.get(f"/data/{created['id']}").status_code == 404
+    assert client.get("/data/stats", params={"year": 2020}).json()["count"] == 0
@@ -0,0 +1,50 @@
+import numpy as np
+from netCDF4 import Dataset
+
+from benchmarks.suite_benchmark import find_regressions, summarize_latencies
+from notebooks.synthetic_data import grid_shape, write_sedac_netcdf
+
+
+def test_synthetic_grids_do_not_depend_on_the_band_size(tmp_path):
+    n_lat, n_lon = grid_shape(10.0)
+    whole = write_sedac_netcdf(tmp_path / "whole", 2000, n_lat, n_lon)
+    banded = write_sedac_netcdf(tmp_path / "banded", 2000, n_lat, n_lon, band_rows=4)
+
+    with Dataset(whole) as expected, Dataset(banded) as actual:
+        pm25 = actual.variables["GWRPM25"][:]
+        np.testing.assert_array_equal(pm25, expected.variables["GWRPM25"][:])
+        assert pm25.shape == (18, 36)
+        assert pm25.mask[::5, ::7].all() and pm25.mask.sum() == 4 * 6
+
+
+def test_find_regressions_flags_slower_and_leaner_results():
+    route = summarize_latencies([0.001] * 19 + [0.01], seconds=0.5)
+    assert route == {
+        "requests": 20,
+        "p50_ms": 1.0,
+        "p95_ms": 1.0,
+        "p99_ms": 10.0,
+        "throughput_rps": 40.0,
+    }
+    baseline = {
+        "ingestion": {"bulk_load": {"seconds": 2.0, "peak_rss_mb": 200.0}},
+        "routes": {"/data/region": {"sequential": route}},
+    }
+    results = {
+        "ingestion": {
+            "bulk_load": {"seconds": 2.4, "peak_rss_mb": 300.0},
+            "write_analytics": {"seconds": 9.0, "peak_rss_mb": 900.0},
+        },
+        "routes": {
+            "/data/region": {
+                "sequential": {**route, "p95_ms": 1.5, "throughput_rps": 30.0}
+            }
+        },
+    }
+
+    assert find_regressions(baseline, results, tolerance=0.25) == [
+        "bulk_load peak_rss_mb: 200 -> 300",
+        "/data/region sequential p95_ms: 1 -> 1.5",
+        "/data/region sequential throughput_rps: 40 -> 30",
+    ]
+    assert find_regressions(baseline, baseline, tolerance=0.0) == []
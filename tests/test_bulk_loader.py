@@ -0,0 +1,98 @@
+import struct
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+
+from app.db.bulk_loader import (
+    BulkLoader,
+    batch_to_columns,
+    encode_binary_rows,
+    encode_csv_rows,
+)
+from app.db.database_manager import DatabaseManager
+from app.db.dataset_version import DatasetVersion
+from app.db.models.air_quality import AirQualityData
+from app.utils.spatial_utils import compute_grid_cell
+
+
+def test_encode_binary_rows_writes_nulls_for_nan():
+    columns = {
+        "year": np.array([1998, 1999], dtype=np.int64),
+        "latitude": np.array([10.5, -20.25]),
+        "longitude": np.array([30.0, 40.0]),
+        "pm25_level": np.array([12.5, np.nan], dtype=np.float32),
+        "grid_cell": np.array([1, 2]),
+    }
+
+    encoded = encode_binary_rows(columns)
+
+    complete_format, null_format = "!hiiidididii", "!hiiididiii"
+    complete_size = struct.calcsize(complete_format)
+    complete_row = struct.unpack_from(complete_format, encoded)
+    null_row = struct.unpack_from(null_format, encoded, complete_size)
+    assert complete_row == (5, 4, 1998, 8, 10.5, 8, 30.0, 8, 12.5, 4, 1)
+    assert null_row == (5, 4, 1999, 8, -20.25, 8, 40.0, -1, 4, 2)
+    assert len(encoded) == complete_size + struct.calcsize(null_format)
+
+
+def test_load_directory_loads_every_row(processed_data_dir, tmp_path):
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+    db_manager.create_tables()
+
+    dataset_version = DatasetVersion(tmp_path / "dataset_version")
+    version = dataset_version.current()
+
+    row_count = BulkLoader(
+        db_manager, batch_size=100, dataset_version=dataset_version
+    ).load_directory(processed_data_dir, drop_indexes=True)
+
+    # API workers sharing the version drop what they cached before the load
+    assert dataset_version.current() != version
+
+    with db_manager.get_db() as db:
+        total_count = db.scalar(select(func.count(AirQualityData.id)))
+        assert total_count == row_count == 2 * 18 * 36
+        null_count = db.scalar(
+            select(func.count()).where(AirQualityData.pm25_level.is_(None))
+        )
+        assert null_count == 2 * 4 * 6  # masked ocean cells become NULL
+
+
+def invalid_coordinates_table() -> pa.Table:
+    return pa.table(
+        {
+            "year": [2000, 2000, 2000, 2000],
+            "latitude": [10.0, np.nan, 95.0, -20.0],
+            "longitude": [30.0, 40.0, 0.0, np.inf],
+            "pm25_level": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+
+
+def test_rows_without_valid_coordinates_get_a_null_grid_cell(tmp_path):
+    columns = batch_to_columns(invalid_coordinates_table().to_batches()[0])
+    assert compute_grid_cell(np.nan, 30.0) is None
+    assert compute_grid_cell(10.0, 181.0) is None
+    assert columns["grid_cell"].mask.tolist() == [False, True, True, True]
+    assert encode_csv_rows(columns).decode().splitlines()[:2] == [
+        f"2000,10.0,30.0,1.0,{compute_grid_cell(10.0, 30.0)}",
+        "2000,,40.0,2.0,",
+    ]
+    out_of_range = encode_binary_rows({k: v[2:3] for k, v in columns.items()})
+    assert struct.unpack("!hiiidididi", out_of_range) == (
+        (5, 4, 2000, 8, 95.0, 8, 0.0, 8, 3.0, -1)
+    )
+
+    file_path = tmp_path / "pm25_processed_2000.parquet"
+    pq.write_table(invalid_coordinates_table(), file_path)
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+    db_manager.create_tables()
+    BulkLoader(db_manager).load_file(file_path)
+
+    with db_manager.get_db() as db:
+        grid_cells = db.scalars(
+            select(AirQualityData.grid_cell).order_by(AirQualityData.pm25_level)
+        ).all()
+    assert grid_cells == [compute_grid_cell(10.0, 30.0), None, None, None]
@@ -1,8 +1,13 @@
 import pytest
 import pandas as pd
+import pyarrow.parquet as pq
 from pathlib import Path
 
-from notebooks.data_utils import get_netcdf_file, process_netcdf_file
+from notebooks.data_utils import (
+    get_netcdf_file,
+    process_netcdf_file,
+    process_netcdf_file_streaming,
+)
 
 
 def test_get_netcdf_file_valid():
@@ -47,3 +52,18 @@ def test_process_netcdf_file_missing_variable():
 
     df = process_netcdf_file(str(file_path), year)
     assert df is None
+
+
+def test_process_netcdf_file_streaming_matches_in_memory(sedac_data_dir, tmp_path):
+    file_path = get_netcdf_file(sedac_data_dir, 1998)
+    output_file = tmp_path / "pm25_processed_1998.parquet"
+
+    row_count = process_netcdf_file_streaming(
+        str(file_path), 1998, output_file, band_size=5
+    )
+
+    expected = process_netcdf_file(str(file_path), 1998)
+    parquet_file = pq.ParquetFile(output_file)
+    assert row_count == len(expected)
+    assert parquet_file.num_row_groups == 4  # 18 latitude rows in bands of 5
+    pd.testing.assert_frame_equal(parquet_file.read().to_pandas(), expected)
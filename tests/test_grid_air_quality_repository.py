@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.db.grid_pyramid import GridPyramid, write_year_pyramid_from_file
+from app.repositories.grid_air_quality_repository import GridAirQualityRepository
+from app.repositories.parquet_air_quality_repository import (
+    ParquetAirQualityRepository,
+)
+
+
+@pytest.fixture
+def pyramid_dir(processed_data_dir):
+    pyramid_dir = str(processed_data_dir / "pm25_pyramid")
+    for year in (1998, 1999):
+        write_year_pyramid_from_file(
+            processed_data_dir / f"pm25_processed_{year}.parquet", year, pyramid_dir
+        )
+    return pyramid_dir
+
+
+@pytest.fixture
+def repositories(pyramid_dir, dataset_dir):
+    return (
+        GridAirQualityRepository(GridPyramid(pyramid_dir)),
+        ParquetAirQualityRepository(dataset_dir),
+    )
+
+
+def normalized(rows: list[tuple]) -> list[tuple]:
+    # The Parquet backend returns missing PM2.5 levels as NaN
+    return [
+        tuple(None if isinstance(v, float) and math.isnan(v) else v for v in row)
+        for row in rows
+    ]
+
+
+def test_reads_match_the_parquet_backend(repositories):
+    grid, parquet = repositories
+    region = (-10.0, 10.0, 0.0, 30.0)
+
+    # The fixture grid runs south to north, so ids agree as well
+    assert grid.get_all_rows(skip=640, limit=20) == normalized(
+        parquet.get_page_rows(limit=660)[640:]
+    )
+    assert grid.get_rows_within_region(*region) == normalized(
+        parquet.get_rows_within_region(*region)
+    )
+    assert grid.filter_rows(year=1999, latitude=25.0) == normalized(
+        parquet.filter_rows(year=1999, latitude=25.0)
+    )
+    assert grid.filter_rows(latitude=25.0, longitude=-5.0) == normalized(
+        parquet.filter_rows(latitude=25.0, longitude=-5.0)
+    )
+    assert grid.filter_rows(latitude=20.0) == []
+
+    first = grid.get_page_rows(limit=4, bbox=region)
+    second = grid.get_page_rows(limit=4, after=(1998, first[-1][4]), bbox=region)
+    expected = normalized(parquet.get_page_rows(limit=12, bbox=region))
+    assert first + second == expected[:8]
+    assert grid.get_page_rows(limit=4, year=1999, bbox=region) == expected[6:10]
+
+    record = grid.get_by_id(first[3][4])
+    assert (record.year, record.latitude, record.longitude) == first[3][:3]
+    assert grid.get_by_id(1999 * 10**10 + 18 * 36) is None
+
+
+def test_aggregates_match_the_parquet_backend(repositories):
+    grid, parquet = repositories
+
+    for year in (None, 1998):
+        grid_stats, parquet_stats = grid.get_stats(year), parquet.get_stats(year)
+        assert grid_stats == pytest.approx(parquet_stats)
+        assert grid.get_pm25_bounds(year) == parquet.get_pm25_bounds(year)
+    assert [stats["year"] for stats in grid.get_stats_by_year()] == [1998, 1999]
+
+    top = grid.get_top_polluted_locations(year=1999, top_n=5, bbox=None)
+    expected = parquet.get_top_polluted_locations(year=1999, top_n=5)
+    assert [(r.id, r.pm25_level) for r in top] == [
+        (r.id, r.pm25_level) for r in expected
+    ]
+    np.testing.assert_array_equal(
+        grid.get_pm25_sketch(years=[1999], lat_bands=(-30, 10)).counts,
+        parquet.get_pm25_sketch(years=[1999], lat_bands=(-30, 10)).counts,
+    )
+
+
+def test_iter_record_batches_covers_the_window(repositories):
+    grid, _ = repositories
+
+    batches = list(grid.iter_record_batches(year=1998, batch_size=50))
+
+    assert max(len(batch) for batch in batches) <= 50
+    rows = [row for batch in batches for row in batch]
+    assert [row[4] for row in rows] == [1998 * 10**10 + cell for cell in range(648)]
+
+
+def test_grid_backend_serves_reads_and_rejects_writes(make_client, pyramid_dir):
+    client = make_client(repository_backend="grid", pyramid_dir=pyramid_dir)
+
+    streamed = client.get("/data/", params={"format": "ndjson", "year": 1999})
+    assert len(streamed.text.splitlines()) == 18 * 36
+    # Streams read through the app's GridPyramid and its cached memory maps
+    assert 1999 in client.app.state.grid_pyramid._pyramids
+
+    assert len(client.get("/data/", params={"limit": 5}).json()) == 5
+    assert client.get("/data/stats").json()["count"] == 2 * 18 * 36
+    response = client.post(
+        "/data/",
+        json={"year": 2000, "latitude": 1.0, "longitude": 2.0, "pm25_level": 3.0},
+    )
+    assert response.status_code == 405
@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.db import grid_index
+from app.db.grid_index import GridIndex, YearGrid, haversine_km
+from app.db.grid_pyramid import GridPyramid, write_year_pyramid_from_file
+from app.db.parquet_handler import write_year_partitions
+
+
+@pytest.fixture
+def frame_1999(processed_data_dir):
+    return pd.read_parquet(
+        processed_data_dir / "pm25_processed_1999.parquet"
+    ).dropna(subset=["pm25_level"])
+
+
+def brute_force_nearest(frame, latitude, longitude, k):
+    distances = haversine_km(
+        latitude, longitude, frame["latitude"].values, frame["longitude"].values
+    )
+    return np.sort(distances)[:k]
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude", [(0.0, 0.0), (37.77, -122.42), (89.9, 179.9), (-85.0, 3.0)]
+)
+def test_nearest_matches_brute_force(dataset_dir, frame_1999, latitude, longitude):
+    locations = GridIndex(dataset_dir).nearest(latitude, longitude, k=7, year=1999)
+
+    assert [location["distance_km"] for location in locations] == pytest.approx(
+        brute_force_nearest(frame_1999, latitude, longitude, 7)
+    )
+    assert all(not np.isnan(location["pm25_level"]) for location in locations)
+
+
+def test_nearest_returns_the_cell_containing_a_grid_coordinate(
+    dataset_dir, frame_1999
+):
+    row = frame_1999.iloc[100]
+
+    (location,) = GridIndex(dataset_dir).nearest(
+        row["latitude"] + 0.1, row["longitude"] - 0.1, year=1999
+    )
+
+    assert location["latitude"] == pytest.approx(row["latitude"])
+    assert location["longitude"] == pytest.approx(row["longitude"])
+    assert location["pm25_level"] == pytest.approx(row["pm25_level"])
+
+
+def test_nearest_wraps_across_the_antimeridian():
+    values = np.full((3, 36), np.nan, dtype=np.float32)
+    values[1, 0] = 1.0
+    values[1, 35] = 2.0
+    grid = YearGrid(2000, lat0=-10.0, dlat=10.0, lon0=-175.0, dlon=10.0, values=values)
+
+    locations = grid.nearest(0.0, 179.0, k=2)
+
+    assert [location["pm25_level"] for location in locations] == [2.0, 1.0]
+
+
+def test_pyramid_years_are_served_from_its_memory_map(
+    dataset_dir, processed_data_dir, tmp_path
+):
+    pyramid_dir = str(tmp_path / "pm25_pyramid")
+    write_year_pyramid_from_file(
+        processed_data_dir / "pm25_processed_1999.parquet", 1999, pyramid_dir
+    )
+    index = GridIndex(dataset_dir, grid_pyramid=GridPyramid(pyramid_dir))
+
+    assert isinstance(index.get_year_grid(1999).values, np.memmap)
+    assert not isinstance(index.get_year_grid(1998).values, np.memmap)
+    assert index.nearest(37.77, -122.42, k=5, year=1999) == GridIndex(
+        dataset_dir
+    ).nearest(37.77, -122.42, k=5, year=1999)
+
+
+def test_rewritten_years_are_rebuilt(dataset_dir, frame_1999):
+    index = GridIndex(dataset_dir)
+    before = index.nearest(0.0, 0.0, year=1999)[0]
+
+    rows = frame_1999.assign(pm25_level=frame_1999["pm25_level"] + 1000)
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    write_year_partitions([table], 1999, dataset_dir)
+
+    after = index.nearest(0.0, 0.0, year=1999)[0]
+    assert after["pm25_level"] == pytest.approx(before["pm25_level"] + 1000)
+
+
+def test_building_a_year_does_not_block_other_years(dataset_dir, monkeypatch):
+    index = GridIndex(dataset_dir)
+    index.get_year_grid(1999)
+    release = threading.Event()
+    build_year_grid = grid_index.build_year_grid
+
+    def slow_build(year, dataset_dir):
+        release.wait(timeout=10)
+        return build_year_grid(year, dataset_dir)
+
+    monkeypatch.setattr(grid_index, "build_year_grid", slow_build)
+    thread = threading.Thread(target=index.get_year_grid, args=(1998,))
+    thread.start()
+    try:
+        # Served while the 1998 build is still waiting
+        assert index.nearest(0.0, 0.0, year=1999)
+        assert thread.is_alive()
+    finally:
+        release.set()
+        thread.join()
+    assert index.get_year_grid(1998) is not None
+
+
+def test_builds_are_bounded_by_max_years(dataset_dir, monkeypatch):
+    index = GridIndex(dataset_dir, max_years=1)
+    building = []
+    concurrent_builds = []
+    overlapped = threading.Event()
+    build_year_grid = grid_index.build_year_grid
+
+    def counting_build(year, dataset_dir):
+        building.append(year)
+        concurrent_builds.append(len(building))
+        try:
+            # Give the other year's build the chance to start alongside
+            if len(building) > 1:
+                overlapped.set()
+            overlapped.wait(timeout=0.5)
+            return build_year_grid(year, dataset_dir)
+        finally:
+            building.remove(year)
+
+    monkeypatch.setattr(grid_index, "build_year_grid", counting_build)
+    threads = [
+        threading.Thread(target=index.get_year_grid, args=(year,))
+        for year in (1998, 1999)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert concurrent_builds == [1, 1]
+    assert len(index._grids) == 1
+
+
+def test_years_without_a_pyramid_are_unavailable_without_max_years(
+    make_client, dataset_dir, processed_data_dir, tmp_path
+):
+    pyramid_dir = str(tmp_path / "pm25_pyramid")
+    write_year_pyramid_from_file(
+        processed_data_dir / "pm25_processed_1999.parquet", 1999, pyramid_dir
+    )
+    client = make_client(
+        parquet_dataset_dir=dataset_dir,
+        pyramid_dir=pyramid_dir,
+        grid_index_max_years=0,
+    )
+
+    response = client.get("/data/nearest", params={"lat": 10, "lon": 20})
+    assert response.status_code == 200
+    response = client.get("/data/nearest", params={"lat": 10, "lon": 20, "year": 1998})
+    assert response.status_code == 503
+    assert client.app.state.grid_index._grids == {}
+
+
+def test_nearest_endpoint(make_client, dataset_dir):
+    client = make_client(parquet_dataset_dir=dataset_dir)
+
+    response = client.get("/data/nearest", params={"lat": 10, "lon": 20, "k": 3})
+    assert response.status_code == 200
+    locations = response.json()
+    assert len(locations) == 3
+    assert {location["year"] for location in locations} == {1999}
+
+    response = client.get("/data/nearest", params={"lat": 10, "lon": 20, "year": 1950})
+    assert response.status_code == 404
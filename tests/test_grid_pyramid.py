@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db.grid_index import GridIndex
+from app.db.grid_pyramid import (
+    GridPyramid,
+    load_year_pyramid,
+    write_year_pyramid_from_file,
+)
+from app.errors.grid_too_large_error import GridTooLargeError
+from app.services.grid_service import GridService
+from notebooks.ingestion_utils import process_years
+
+
+@pytest.fixture
+def pyramid_dir(processed_data_dir):
+    pyramid_dir = str(processed_data_dir / "pm25_pyramid")
+    for year in (1998, 1999):
+        write_year_pyramid_from_file(
+            processed_data_dir / f"pm25_processed_{year}.parquet", year, pyramid_dir
+        )
+    return pyramid_dir
+
+
+@pytest.fixture
+def grid_1999(processed_data_dir):
+    frame = pd.read_parquet(processed_data_dir / "pm25_processed_1999.parquet")
+    grid = frame.pivot(index="latitude", columns="longitude", values="pm25_level")
+    return grid.to_numpy(dtype=np.float64)
+
+
+def brute_force_level(grid: np.ndarray, factor: int):
+    n_lat, n_lon = -(-grid.shape[0] // factor), -(-grid.shape[1] // factor)
+    mean = np.full((n_lat, n_lon), np.nan)
+    maximum = np.full((n_lat, n_lon), np.nan)
+    for row in range(n_lat):
+        for column in range(n_lon):
+            block = grid[
+                row * factor : (row + 1) * factor,
+                column * factor : (column + 1) * factor,
+            ]
+            if not np.isnan(block).all():
+                mean[row, column] = np.nanmean(block)
+                maximum[row, column] = np.nanmax(block)
+    return mean, maximum
+
+
+def test_levels_match_block_reductions_of_the_native_grid(pyramid_dir, grid_1999):
+    pyramid = load_year_pyramid(f"{pyramid_dir}/year=1999")
+    world = (-90.0, 90.0, -180.0, 180.0)
+
+    # 18 x 36 halves down to a single cell, padding the odd 9 x 18 level
+    assert pyramid.shapes == [
+        (18, 36),
+        (9, 18),
+        (5, 9),
+        (3, 5),
+        (2, 3),
+        (1, 2),
+        (1, 1),
+    ]
+    for level in range(len(pyramid.shapes)):
+        mean, maximum = brute_force_level(grid_1999, 2**level)
+        rows, columns = pyramid.cell_ranges(level, world)
+        window = pyramid.read(level, "mean", rows, columns)
+        np.testing.assert_allclose(window.values, mean, rtol=1e-5)
+        window = pyramid.read(level, "max", rows, columns)
+        np.testing.assert_allclose(window.values, maximum, rtol=1e-6)
+
+
+def test_select_level_picks_the_coarsest_level_within_the_resolution(pyramid_dir):
+    pyramid = load_year_pyramid(f"{pyramid_dir}/year=1999")
+
+    # Native cells are 10 degrees on a side
+    assert pyramid.select_level(5.0) == 0
+    assert pyramid.select_level(10.0) == 0
+    assert pyramid.select_level(39.9) == 1
+    assert pyramid.select_level(40.0) == 2
+    assert pyramid.select_level(360.0) == 5
+
+
+def test_read_returns_cells_intersecting_the_bounding_box(pyramid_dir, grid_1999):
+    pyramid = load_year_pyramid(f"{pyramid_dir}/year=1999")
+
+    rows, columns = pyramid.cell_ranges(1, (0.0, 15.0, -180.0, -150.0))
+    window = pyramid.read(1, "mean", rows, columns)
+
+    # Level 1 cells are 20 degrees, from -90 and -180
+    assert window.latitudes.tolist() == [0.0, 20.0]
+    assert window.longitudes.tolist() == [-170.0, -150.0]
+    mean, _ = brute_force_level(grid_1999, 2)
+    np.testing.assert_allclose(window.values, mean[4:6, 0:2], rtol=1e-5)
+
+
+def test_grid_endpoint(make_client, pyramid_dir):
+    client = make_client(pyramid_dir=pyramid_dir)
+
+    response = client.get(
+        "/data/grid",
+        params={
+            "resolution": 45,
+            "agg": "max",
+            "lat_min": -10,
+            "lat_max": 10,
+            "long_min": -180,
+            "long_max": 180,
+        },
+    )
+
+    assert response.status_code == 200
+    grid = response.json()
+    assert (grid["year"], grid["agg"], grid["level"]) == (1999, "max", 2)
+    assert (grid["cell_lat"], grid["cell_lon"]) == (40.0, 40.0)
+    assert len(grid["values"]) == len(grid["latitudes"]) == 1
+    assert len(grid["values"][0]) == len(grid["longitudes"]) == 9
+
+    response = client.get("/data/grid", params={"resolution": 10, "year": 2005})
+    assert response.status_code == 404
+
+
+def test_get_grid_rejects_grids_that_are_too_large(pyramid_dir):
+    service = GridService(GridIndex(), GridPyramid(pyramid_dir))
+
+    with pytest.raises(GridTooLargeError):
+        service.get_grid(resolution=10, max_cells=18 * 36 - 1)
+    window = service.get_grid(resolution=20, max_cells=18 * 36 - 1)
+    assert window.values.shape == (9, 18)
+
+
+def test_process_years_builds_the_pyramid(sedac_data_dir, tmp_path):
+    pyramid_dir = tmp_path / "pm25_pyramid"
+
+    results = process_years(
+        [1998, 1999],
+        sedac_data_dir,
+        tmp_path / "processed_data",
+        max_workers=2,
+        pyramid_dir=pyramid_dir,
+    )
+
+    assert all(result.succeeded for result in results)
+    assert GridPyramid(str(pyramid_dir)).get_latest_year() == 1999
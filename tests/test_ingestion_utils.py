@@ -0,0 +1,107 @@
+import shutil
+
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+
+from app.db.bulk_loader import BulkLoader
+from app.db.database_manager import DatabaseManager
+from app.db.models.air_quality import AirQualityData
+from app.db.timeseries_store import TimeSeriesStore
+from notebooks.ingestion_utils import process_years, resolve_max_workers
+from notebooks.synthetic_data import write_sedac_netcdf
+
+
+def test_process_years_writes_each_year(sedac_data_dir, tmp_path):
+    processed_data_dir = tmp_path / "processed_data"
+
+    results = process_years(
+        [1998, 1999], sedac_data_dir, processed_data_dir, max_workers=2
+    )
+
+    assert [result.year for result in results] == [1998, 1999]
+    assert all(result.succeeded for result in results)
+    df = pd.read_parquet(processed_data_dir / "pm25_processed_1999.parquet")
+    assert len(df) == results[1].row_count == 18 * 36
+
+
+def test_process_years_reports_failed_year_without_aborting(
+    sedac_data_dir, tmp_path
+):
+    processed_data_dir = tmp_path / "processed_data"
+
+    results = process_years(
+        [1998, 2050], sedac_data_dir, processed_data_dir, max_workers=2
+    )
+
+    assert results[0].succeeded
+    assert results[1].status == "failed"
+    assert "FileNotFoundError" in results[1].error
+
+
+def test_resolve_max_workers_caps_by_memory():
+    assert resolve_max_workers(8, year_memory_bytes=3, memory_limit_bytes=10) == 3
+    assert resolve_max_workers(2, year_memory_bytes=3, memory_limit_bytes=100) == 2
+    assert resolve_max_workers(8, year_memory_bytes=30, memory_limit_bytes=10) == 1
+
+
+def test_process_years_with_manifest_only_reloads_changed_years(
+    sedac_data_dir, tmp_path
+):
+    processed_data_dir = tmp_path / "processed_data"
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+    db_manager.create_tables()
+    loader = BulkLoader(db_manager)
+
+    first_run = process_years(
+        [1998, 1999], sedac_data_dir, processed_data_dir, db_manager=db_manager
+    )
+    assert [result.status for result in first_run] == ["completed", "completed"]
+    assert loader.load_changed_years() == 2 * 18 * 36
+
+    second_run = process_years(
+        [1998, 1999], sedac_data_dir, processed_data_dir, db_manager=db_manager
+    )
+    assert [result.status for result in second_run] == ["unchanged", "unchanged"]
+    assert loader.load_changed_years() == 0
+
+    write_sedac_netcdf(sedac_data_dir, 1999, seed=42)
+    third_run = process_years(
+        [1998, 1999], sedac_data_dir, processed_data_dir, db_manager=db_manager
+    )
+    assert [result.status for result in third_run] == ["unchanged", "completed"]
+    assert loader.load_changed_years() == 18 * 36
+
+    expected = pd.read_parquet(processed_data_dir / "pm25_processed_1999.parquet")
+    with db_manager.get_db() as db:
+        assert db.query(AirQualityData).count() == 2 * 18 * 36
+        loaded_sum = db.scalar(
+            select(func.sum(AirQualityData.pm25_level)).where(
+                AirQualityData.year == 1999
+            )
+        )
+    assert loaded_sum == pytest.approx(expected["pm25_level"].sum(), rel=1e-6)
+
+
+def test_partial_runs_keep_every_processed_year_in_the_timeseries_store(
+    sedac_data_dir, tmp_path
+):
+    processed_data_dir = tmp_path / "processed_data"
+    timeseries_dir = tmp_path / "pm25_timeseries"
+    store_dirs = {
+        "timeseries_dir": timeseries_dir,
+        "analytics_dir": tmp_path / "pm25_analytics",
+    }
+    process_years([1998, 1999], sedac_data_dir, processed_data_dir, **store_dirs)
+    assert TimeSeriesStore(str(timeseries_dir)).get_years() == [1998, 1999]
+
+    results = process_years([1998], sedac_data_dir, processed_data_dir, **store_dirs)
+    assert [result.status for result in results] == ["completed"]
+    assert TimeSeriesStore(str(timeseries_dir)).get_years() == [1998, 1999]
+
+    # 1999 fails to reprocess, but its earlier output is still complete
+    for netcdf_dir in sedac_data_dir.glob("*-1999-netcdf"):
+        shutil.rmtree(netcdf_dir)
+    results = process_years([1999], sedac_data_dir, processed_data_dir, **store_dirs)
+    assert [result.status for result in results] == ["failed"]
+    assert TimeSeriesStore(str(timeseries_dir)).get_years() == [1998, 1999]
@@ -0,0 +1,38 @@
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.db.models.air_quality import AirQualityData
+from app.repositories.air_quality_repository import RECORD_COLUMNS
+from app.schemas.air_quality import AirQualityResponse
+from app.utils.json_utils import encode_records_json
+
+
+def render_with_response_model(rows: list[tuple]) -> bytes:
+    # What FastAPI renders for ORM records with response_model=list[...]
+    records = [AirQualityData(**dict(zip(RECORD_COLUMNS, row))) for row in rows]
+    adapter = TypeAdapter(list[AirQualityResponse])
+    content = adapter.dump_python(
+        adapter.validate_python(records, from_attributes=True), mode="json"
+    )
+    return JSONResponse(content=content).body
+
+
+def test_encode_records_json_matches_response_model_output():
+    rows = [
+        (1998, -89.995, -179.995, 12.5, 1),
+        (1998, 0.005, 10.0, float("nan"), 2),
+        (1999, 45.125, 7.5, None, 3),
+        (1999, 1.0, 2.0, 3.0000000000000004, 4),
+    ]
+    assert encode_records_json(RECORD_COLUMNS, rows) == render_with_response_model(
+        rows
+    )
+
+
+def test_encode_records_json_falls_back_for_exponent_floats():
+    rows = [(1998, 1.0, 2.0, 1e-05, 1), (1998, 1.0, 2.0, 2.5e16, 2)]
+
+    assert encode_records_json(RECORD_COLUMNS, rows) == render_with_response_model(
+        rows
+    )
+    assert encode_records_json(RECORD_COLUMNS, []) == b"[]"
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.repositories.parquet_air_quality_repository import (
+    ParquetAirQualityRepository,
+)
+
+
+@pytest.fixture
+def frames(processed_data_dir):
+    return pd.concat(
+        pd.read_parquet(processed_data_dir / f"pm25_processed_{year}.parquet")
+        for year in (1998, 1999)
+    )
+
+
+def test_get_stats_ignores_missing_values(dataset_dir, frames):
+    stats = ParquetAirQualityRepository(dataset_dir).get_stats()
+
+    assert stats["count"] == len(frames)
+    assert stats["average_pm25"] == pytest.approx(frames["pm25_level"].mean())
+    assert stats["min_pm25"] == pytest.approx(frames["pm25_level"].min())
+    assert stats["max_pm25"] == pytest.approx(frames["pm25_level"].max())
+
+
+def test_get_top_polluted_locations_orders_by_pm25(dataset_dir, frames):
+    top = ParquetAirQualityRepository(dataset_dir).get_top_polluted_locations(
+        year=1999, top_n=5
+    )
+
+    expected = frames[frames["year"] == 1999].nlargest(5, "pm25_level")
+    assert [record.pm25_level for record in top] == pytest.approx(
+        expected["pm25_level"].tolist()
+    )
+
+
+def test_get_by_id_round_trips_region_records(dataset_dir):
+    repository = ParquetAirQualityRepository(dataset_dir)
+
+    region = repository.get_data_within_region(-10.0, 10.0, 0.0, 30.0)
+    record = repository.get_by_id(region[0].id)
+
+    assert len(region) == 2 * 2 * 3
+    assert all(-10 <= r.latitude <= 10 and 0 <= r.longitude <= 30 for r in region)
+    assert (record.year, record.latitude, record.longitude) == (
+        region[0].year,
+        region[0].latitude,
+        region[0].longitude,
+    )
+    assert np.isnan(record.pm25_level) == np.isnan(region[0].pm25_level)
+
+
+def test_parquet_backend_serves_reads_and_rejects_writes(make_client, dataset_dir):
+    client = make_client(repository_backend="parquet", parquet_dataset_dir=dataset_dir)
+
+    assert len(client.get("/data/", params={"limit": 5}).json()) == 5
+    assert client.get("/data/stats").json()["count"] == 2 * 18 * 36
+    response = client.post(
+        "/data/",
+        json={"year": 2023, "latitude": 1.0, "longitude": 2.0, "pm25_level": 3.0},
+    )
+    assert response.status_code == 405
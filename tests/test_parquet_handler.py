@@ -0,0 +1,82 @@
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.db.parquet_handler import (
+    build_filter,
+    get_available_years,
+    get_column_bounds,
+    get_dataset,
+    get_partition_sketch,
+    query_dataset,
+    write_year_partitions,
+)
+
+
+def test_query_dataset_matches_full_scan(dataset_dir, processed_data_dir):
+    bbox = (-25.0, 15.0, -40.0, 60.0)
+
+    table = query_dataset(
+        year=1999,
+        bbox=bbox,
+        columns=["latitude", "longitude", "pm25_level"],
+        dataset_dir=dataset_dir,
+    )
+
+    df = pd.read_parquet(processed_data_dir / "pm25_processed_1999.parquet")
+    expected = df[
+        df["latitude"].between(bbox[0], bbox[1])
+        & df["longitude"].between(bbox[2], bbox[3])
+    ]
+    assert table.column_names == ["latitude", "longitude", "pm25_level"]
+    assert table.num_rows == len(expected) > 0
+    assert sorted(table.column("latitude").to_pylist()) == sorted(expected["latitude"])
+
+
+def test_build_filter_prunes_partitions(dataset_dir):
+    dataset = get_dataset(dataset_dir)
+    all_fragments = list(dataset.get_fragments())
+
+    fragments = list(
+        dataset.get_fragments(filter=build_filter(1998, (-25.0, 15.0, -40.0, 60.0)))
+    )
+
+    assert get_available_years(dataset_dir) == [1998, 1999]
+    assert len(all_fragments) == 2 * 18
+    assert len(fragments) == 5  # lat bands -30, -20, -10, 0 and 10 of one year
+
+
+def year_table(latitudes, pm25_levels) -> pa.Table:
+    return pa.table(
+        {
+            "year": np.full(len(latitudes), 2000, dtype=np.int64),
+            "latitude": np.asarray(latitudes, dtype=np.float64),
+            "longitude": np.zeros(len(latitudes)),
+            "pm25_level": np.asarray(pm25_levels, dtype=np.float32),
+        }
+    )
+
+
+def test_caches_follow_a_year_rewritten_elsewhere(tmp_path):
+    dataset_dir = str(tmp_path / "pm25_dataset")
+    # Two batches write part-0-* and part-1-* files
+    tables = [year_table([-5.0, 5.0], [1.0, 2.0]), year_table([-6.0], [3.0])]
+    write_year_partitions(tables, 2000, dataset_dir)
+    assert query_dataset(year=2000, dataset_dir=dataset_dir).num_rows == 3
+    assert get_column_bounds("pm25_level", 2000, dataset_dir) == (1.0, 3.0)
+    assert get_partition_sketch("pm25_level", 2000, -10, dataset_dir).count == 2
+
+    # Ingestion rewrites the year in its own process, as a single batch
+    script = (
+        "from tests.test_parquet_handler import year_table\n"
+        "from app.db.parquet_handler import write_year_partitions\n"
+        f"write_year_partitions([year_table([-5.0], [7.0])], 2000, {dataset_dir!r})"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+    assert query_dataset(year=2000, dataset_dir=dataset_dir).num_rows == 1
+    assert get_column_bounds("pm25_level", 2000, dataset_dir) == (7.0, 7.0)
+    assert get_partition_sketch("pm25_level", 2000, -10, dataset_dir).count == 1
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import exc
+
+from app.db.database_manager import DatabaseManager
+
+
+def test_prewarm_and_wait_statistics(tmp_path):
+    db_manager = DatabaseManager(
+        f"sqlite:///{tmp_path / 'air_quality.db'}",
+        pool_size=2,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    assert db_manager.prewarm_pool() == 2
+    status = db_manager.get_pool_status()["sync"]
+    assert (status["checked_in"], status["checked_out"], status["checkouts"]) == (
+        2,
+        0,
+        2,
+    )
+
+    with db_manager.engine.connect(), db_manager.engine.connect():
+        status = db_manager.get_pool_status()["sync"]
+        assert (status["checked_in"], status["checked_out"]) == (0, 2)
+        with pytest.raises(exc.TimeoutError):
+            db_manager.engine.connect()
+
+    status = db_manager.get_pool_status()["sync"]
+    assert status["timeouts"] == 1
+    assert status["wait_seconds_max"] >= 0.05
+    assert db_manager.get_pool_status()["async"] is None
+
+    # Counters survive the pool being recreated
+    db_manager.engine.dispose()
+    assert db_manager.get_pool_status()["sync"]["checkouts"] == 4
+
+
+def test_in_memory_sqlite_keeps_default_pool():
+    status = DatabaseManager("sqlite://").get_pool_status()["sync"]
+    assert status == {"pool_class": "SingletonThreadPool"}
+
+
+def test_pool_health_endpoint(make_client):
+    client = make_client()
+    client.get("/data/stats")
+
+    status = client.get("/health/pool").json()
+    assert status["sync"]["checkouts"] >= 1
+    assert status["sync"]["checked_out"] == 0
+    assert status["async"] is None
@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db.bulk_loader import BulkLoader
+from app.db.database_manager import DatabaseManager
+from app.db.models.air_quality import AirQualityData
+from app.repositories.air_quality_repository import AirQualityRepository
+from app.utils.quantile_sketch import (
+    BUCKET_COUNT,
+    RELATIVE_ACCURACY,
+    QuantileSketch,
+    bucket_index,
+)
+from app.utils.spatial_utils import compute_grid_cell, get_lat_band
+
+
+def exact_quantile(values: np.ndarray, q: float) -> float:
+    # Nearest rank: the ceil(q * n)-th smallest value
+    values = np.sort(values)
+    return float(values[max(math.ceil(q * values.size), 1) - 1])
+
+
+def test_quantiles_are_within_the_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(mean=2.5, sigma=1.0, size=100_000)
+    sketch = QuantileSketch.from_values(values)
+
+    qs = [0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 0.999, 1.0]
+    for q, estimate in zip(qs, sketch.quantiles(qs)):
+        exact = exact_quantile(values, q)
+        assert abs(estimate - exact) <= RELATIVE_ACCURACY * exact * (1 + 1e-9)
+    assert sketch.count == values.size
+
+
+def test_sketches_merge_and_build_histograms():
+    rng = np.random.default_rng(1)
+    first, second = rng.uniform(0, 100, 5_000), rng.uniform(50, 200, 5_000)
+
+    merged = QuantileSketch.from_values(first).merge(
+        QuantileSketch.from_values(second)
+    )
+    union = QuantileSketch.from_values(np.concatenate([first, second]))
+    np.testing.assert_array_equal(merged.counts, union.counts)
+
+    # Values at bin centres are far enough from the edges to be binned exactly
+    centres = np.repeat([2.5, 7.5, 22.5], [3, 1, 2])
+    assert QuantileSketch.from_values(centres).histogram(5.0) == [3, 1, 0, 0, 2]
+    assert QuantileSketch.from_values([np.nan, -1.0, 0.0]).quantile(0.5) == 0.0
+    assert QuantileSketch().quantiles([0.5]) == [None]
+    assert QuantileSketch().histogram(5.0) == []
+    assert bucket_index([1e9])[0] == BUCKET_COUNT - 1
+
+
+@pytest.fixture
+def db_manager(tmp_path, processed_data_dir):
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'air_quality.db'}")
+    db_manager.create_tables()
+    BulkLoader(db_manager).load_directory(processed_data_dir)
+    return db_manager
+
+
+def scan_sketch(db, years=None, lat_bands=None) -> QuantileSketch:
+    columns = ["year", "grid_cell", "pm25_level"]
+    rows = db.query(*(getattr(AirQualityData, name) for name in columns)).all()
+    df = pd.DataFrame(rows, columns=columns)
+    if years is not None:
+        df = df[df["year"].isin(years)]
+    if lat_bands is not None:
+        lat_band = get_lat_band(df["grid_cell"].to_numpy())
+        df = df[(lat_band >= lat_bands[0]) & (lat_band <= lat_bands[1])]
+    return QuantileSketch.from_values(df["pm25_level"].to_numpy(dtype=np.float64))
+
+
+def test_writes_keep_the_database_sketches_current(db_manager):
+    with db_manager.get_db() as db:
+        repository = AirQualityRepository(db)
+        top = repository.get_top_polluted_locations(year=1999, top_n=1)[0]
+
+        created = repository.create(
+            AirQualityData(year=1999, latitude=12.3, longitude=45.6, pm25_level=500.0)
+        )
+        repository.update(top, {"pm25_level": 1.0})
+        repository.update(repository.get_by_id(5), {"latitude": -80.0})
+        repository.update(created, {"pm25_level": 2.0})
+        repository.delete(repository.get_by_id(6))
+
+        for years, lat_bands in [(None, None), ([1999], None), ([1998], (-30, 20))]:
+            np.testing.assert_array_equal(
+                repository.get_pm25_sketch(years=years, lat_bands=lat_bands).counts,
+                scan_sketch(db, years, lat_bands).counts,
+            )
+
+
+@pytest.mark.parametrize("backend", ["sync", "async", "parquet"])
+def test_percentiles_endpoint(make_client, processed_data_dir, dataset_dir, backend):
+    if backend == "parquet":
+        client = make_client(
+            repository_backend="parquet", parquet_dataset_dir=dataset_dir
+        )
+    else:
+        client = make_client(db_mode=backend)
+        BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+    frame = pd.read_parquet(processed_data_dir / "pm25_processed_1999.parquet")
+    latitudes = frame["latitude"].to_numpy()
+    grid_cells = compute_grid_cell(latitudes, frame["longitude"].to_numpy())
+    in_bands = (get_lat_band(grid_cells) >= -30) & (get_lat_band(grid_cells) <= 10)
+    values = frame["pm25_level"].to_numpy(dtype=np.float64)[in_bands]
+    values = values[~np.isnan(values)]
+
+    response = client.get(
+        "/data/stats/percentiles",
+        params={
+            "year": 1999,
+            "lat_min": -25,
+            "lat_max": 15,
+            "percentiles": [50, 99],
+            "bin_width": 10,
+        },
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["years"], result["lat_min"], result["lat_max"]) == (
+        [1999],
+        -30,
+        20,
+    )
+    assert result["count"] == values.size == sum(result["histogram"])
+    for entry in result["percentiles"]:
+        exact = exact_quantile(values, entry["percentile"] / 100)
+        assert entry["pm25_level"] == pytest.approx(exact, rel=RELATIVE_ACCURACY)
+
+    merged = client.get("/data/stats/percentiles", params={"year": [1998, 1999]})
+    assert merged.json()["count"] == client.get("/data/stats/percentiles").json()[
+        "count"
+    ]
+    assert (
+        client.get("/data/stats/percentiles", params={"percentiles": 101}).status_code
+        == 400
+    )
+    assert (
+        client.get("/data/stats/percentiles", params={"lat_min": 0}).status_code
+        == 400
+    )
@@ -0,0 +1,174 @@
+import asyncio
+import inspect
+from unittest import mock
+
+from app.db.dataset_version import DatasetVersion
+from app.repositories.air_quality_repository import RECORD_COLUMNS
+from app.services.air_quality_service import AirQualityService
+from app.services.async_air_quality_service import AsyncAirQualityService
+from app.services.cached_air_quality_service import (
+    CACHED_READS,
+    CachedAirQualityService,
+    CachedAsyncAirQualityService,
+    cache_key,
+)
+from app.utils.response_cache import ResponseCache
+
+RECORD = {"year": 2020, "latitude": 12.5, "longitude": 40.25, "pm25_level": 31.0}
+
+
+def test_get_or_compute_caches_until_version_bump():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60.0)
+    compute = mock.Mock(side_effect=lambda value: [value])
+
+    assert cache.get_or_compute("a", compute, 1) == [1]
+    assert cache.get_or_compute("a", compute, 2) == [1]
+    assert compute.call_count == 1
+
+    etag = cache.etag("/data/stats?")
+    assert cache.etag("/data/stats?year=1999") != etag
+    cache.bump_version()
+    assert cache.etag("/data/stats?") != etag
+    assert cache.get_or_compute("a", compute, 2) == [2]
+    assert compute.call_count == 2
+
+
+def test_get_or_compute_expires_and_evicts_entries():
+    cache = ResponseCache(max_entries=2, ttl_seconds=10.0)
+    compute = mock.Mock(side_effect=lambda value: value)
+
+    with mock.patch("app.utils.response_cache.time.monotonic", return_value=100.0):
+        for key in ("a", "b", "c"):
+            cache.get_or_compute(key, compute, key)
+        # "a" was evicted as least recently used
+        cache.get_or_compute("a", compute, "a")
+        assert compute.call_count == 4
+
+    with mock.patch("app.utils.response_cache.time.monotonic", return_value=111.0):
+        cache.get_or_compute("a", compute, "a")
+        assert compute.call_count == 5
+
+
+def test_reads_are_cached_and_writes_invalidate(make_client):
+    client = make_client()
+    created = client.post("/data/", json=RECORD).json()
+
+    repository = "app.repositories.air_quality_repository.AirQualityRepository"
+    with mock.patch(f"{repository}.get_stats", autospec=True) as get_stats:
+        get_stats.return_value = {
+            "count": 1,
+            "average_pm25": 31.0,
+            "min_pm25": 31.0,
+            "max_pm25": 31.0,
+        }
+        assert client.get("/data/stats").json()["count"] == 1
+        assert client.get("/data/stats").json()["count"] == 1
+        assert get_stats.call_count == 1
+
+        client.put(f"/data/{created['id']}", json={"pm25_level": 45.0})
+        client.get("/data/stats")
+        assert get_stats.call_count == 2
+
+
+def test_workers_sharing_a_dataset_version_invalidate_each_other(tmp_path):
+    # Two workers, and the bulk loader, on the same host
+    version_file = tmp_path / "dataset_version"
+    worker = ResponseCache(dataset_version=DatasetVersion(version_file))
+    other_worker = ResponseCache(dataset_version=DatasetVersion(version_file))
+    compute = mock.Mock(side_effect=lambda value: [value])
+
+    assert worker.get_or_compute("a", compute, 1) == [1]
+    etag = worker.etag("/data/stats?")
+    assert other_worker.etag("/data/stats?") == etag
+
+    other_worker.bump_version()
+    assert worker.etag("/data/stats?") != etag
+    assert worker.get_or_compute("a", compute, 2) == [2]
+
+    DatasetVersion(version_file).bump()
+    assert worker.get_or_compute("a", compute, 3) == [3]
+    assert compute.call_count == 3
+
+
+def test_sync_and_async_services_share_cache_entries():
+    for name in CACHED_READS:
+        assert str(inspect.signature(getattr(AsyncAirQualityService, name))) == str(
+            inspect.signature(getattr(AirQualityService, name))
+        )
+    assert cache_key("get_data_page", 10, bbox=[1, 2, 3, 4]) == cache_key(
+        "get_data_page", limit=10, cursor=None, bbox=(1.0, 2.0, 3.0, 4.0)
+    )
+
+    cache = ResponseCache()
+    stats = {"count": 1, "average_pm25": 31.0, "min_pm25": 31.0, "max_pm25": 31.0}
+    async_repository = mock.AsyncMock()
+    async_repository.get_stats.return_value = stats
+    service = CachedAsyncAirQualityService(async_repository, cache)
+    assert asyncio.run(service.get_statistics(1999)) == stats
+
+    sync_repository = mock.Mock()
+    service = CachedAirQualityService(sync_repository, cache)
+    assert service.get_statistics(year=1999) == stats
+    sync_repository.get_stats.assert_not_called()
+
+
+def test_cached_records_are_plain_rows(make_client):
+    client = make_client()
+    created = client.post("/data/", json=RECORD).json()
+    cache = client.app.state.response_cache
+
+    for _ in range(2):
+        assert client.get(f"/data/{created['id']}").json() == created
+        top = client.get("/data/top", params={"year": 2020, "n": 1}).json()
+        assert top == [RECORD]
+
+    # Nothing bound to a request's session outlives the request in the cache
+    cached = [value for _, value in cache._entries.values()]
+    row = tuple(created[name] for name in RECORD_COLUMNS)
+    assert sorted(cached, key=len) == [[row], row]
+
+
+def test_conditional_get_returns_304_until_a_write(make_client):
+    client = make_client()
+    client.post("/data/", json=RECORD)
+
+    response = client.get("/data/filter", params={"year": 2020})
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    response = client.get(
+        "/data/filter", params={"year": 2020}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    client.post("/data/", json={**RECORD, "latitude": 13.5})
+    response = client.get(
+        "/data/filter", params={"year": 2020}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_conditional_get_only_covers_cached_reads(make_client, tmp_path):
+    client = make_client()
+    client.post("/data/", json=RECORD)
+
+    response = client.get("/data/stats")
+    etag = response.headers["ETag"]
+    assert client.get("/data/stats", params={"year": 2020}).headers["ETag"] != etag
+    # A validator of one URL does not validate another
+    response = client.get(
+        "/data/stats", params={"year": 2020}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    # File-backed stores change with re-ingestion, not with the dataset version
+    assert "ETag" not in client.get("/data/timeseries?lat=0&lon=0").headers
+
+    # A write by another process, e.g. the bulk loader, invalidates the ETag
+    DatasetVersion(tmp_path / "dataset_version").bump()
+    response = client.get("/data/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
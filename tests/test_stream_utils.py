@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.db.bulk_loader import BulkLoader
+from app.utils.stream_utils import encode_csv, encode_ndjson, resolve_stream_format
+
+REGION = {"lat_min": -25, "lat_max": 15, "long_min": -40, "long_max": 60}
+
+
+def test_resolve_stream_format():
+    assert resolve_stream_format("csv", "application/x-ndjson") == "csv"
+    assert resolve_stream_format("json", "text/csv") is None
+    assert resolve_stream_format(None, "text/csv; charset=utf-8") == "csv"
+    assert resolve_stream_format(None, "application/json, application/x-ndjson") == (
+        "ndjson"
+    )
+    assert resolve_stream_format(None, "*/*") is None
+
+
+def test_encoders_write_missing_values_as_null():
+    batches = [[(1998, 1.5, 2.5, float("nan"), 1)], [(1999, 3.0, 4.0, 5.0, 2)]]
+    columns = ("year", "latitude", "longitude", "pm25_level", "id")
+
+    ndjson = b"".join(encode_ndjson(columns, batches)).decode().splitlines()
+    csv_text = b"".join(encode_csv(columns, batches)).decode()
+
+    assert json.loads(ndjson[0])["pm25_level"] is None
+    assert csv_text.splitlines() == [
+        "year,latitude,longitude,pm25_level,id",
+        "1998,1.5,2.5,,1",
+        "1999,3.0,4.0,5.0,2",
+    ]
+
+
+@pytest.mark.parametrize("repository_backend", ["database", "parquet"])
+def test_streamed_region_matches_json_response(
+    make_client, processed_data_dir, dataset_dir, repository_backend
+):
+    client = make_client(
+        repository_backend=repository_backend, parquet_dataset_dir=dataset_dir
+    )
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+    expected = client.get("/data/region", params=REGION).json()
+
+    response = client.get(
+        "/data/region", params=REGION, headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(streamed, key=lambda r: r["id"]) == sorted(
+        expected, key=lambda r: r["id"]
+    )
+
+    response = client.get("/data/region", params={**REGION, "format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == len(expected)
+
+
+def test_streamed_filter_and_all_data(make_client, processed_data_dir):
+    client = make_client()
+    BulkLoader(client.app.state.db_manager).load_directory(processed_data_dir)
+
+    response = client.get("/data/", params={"format": "ndjson", "year": 1999})
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 18 * 36
+    assert [r["id"] for r in records] == sorted(r["id"] for r in records)
+
+    latitude = records[0]["latitude"]
+    response = client.get("/data/filter", params={"lat": latitude, "format": "csv"})
+    assert len(response.text.splitlines()) == 1 + 2 * 36
+
+    response = client.get("/data/", params={"format": "csv", "skip": 10})
+    assert response.status_code == 400
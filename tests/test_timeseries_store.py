@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from app.db.timeseries_store import TimeSeriesStore, write_timeseries_store
+from notebooks.ingestion_utils import process_years
+
+
+@pytest.fixture
+def timeseries_dir(processed_data_dir):
+    timeseries_dir = str(processed_data_dir / "pm25_timeseries")
+    write_timeseries_store(
+        {
+            year: processed_data_dir / f"pm25_processed_{year}.parquet"
+            for year in (1998, 1999)
+        },
+        timeseries_dir,
+    )
+    return timeseries_dir
+
+
+def expected_series(processed_data_dir, latitude, longitude) -> list:
+    levels = []
+    for year in (1998, 1999):
+        frame = pd.read_parquet(processed_data_dir / f"pm25_processed_{year}.parquet")
+        row = frame[(frame["latitude"] == latitude) & (frame["longitude"] == longitude)]
+        levels.append(row["pm25_level"].iloc[0])
+    return levels
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude, cell",
+    [
+        (37.77, -122.42, (35.0, -125.0)),
+        (-85.0, -175.0, (-85.0, -175.0)),
+        # Masked every 5th latitude row and 7th longitude column
+        (-85.0, -105.0, (-85.0, -105.0)),
+    ],
+)
+def test_get_series_returns_the_history_of_the_containing_cell(
+    processed_data_dir, timeseries_dir, latitude, longitude, cell
+):
+    series = TimeSeriesStore(timeseries_dir).get_series(latitude, longitude)
+
+    assert (series["latitude"], series["longitude"]) == cell
+    assert series["years"] == [1998, 1999]
+    assert series["pm25_levels"].tolist() == pytest.approx(
+        expected_series(processed_data_dir, *cell), nan_ok=True
+    )
+
+
+def test_get_series_outside_the_grid_or_without_a_store(timeseries_dir, tmp_path):
+    assert TimeSeriesStore(timeseries_dir).get_series(90.0, 0.0) is None
+    assert TimeSeriesStore(str(tmp_path / "missing")).get_series(0.0, 0.0) is None
+
+
+def test_timeseries_endpoint(make_client, processed_data_dir, timeseries_dir):
+    client = make_client(timeseries_dir=timeseries_dir)
+
+    response = client.get("/data/timeseries", params={"lat": 5.0, "lon": 5.0})
+
+    assert response.status_code == 200
+    time_series = response.json()
+    assert (time_series["latitude"], time_series["longitude"]) == (5.0, 5.0)
+    assert [entry["year"] for entry in time_series["series"]] == [1998, 1999]
+    assert [entry["pm25_level"] for entry in time_series["series"]] == pytest.approx(
+        expected_series(processed_data_dir, 5.0, 5.0)
+    )
+
+    response = client.get("/data/timeseries", params={"lat": 90.0, "lon": 0.0})
+    assert response.status_code == 404
+
+
+def test_process_years_writes_the_timeseries_store(sedac_data_dir, tmp_path):
+    timeseries_dir = tmp_path / "pm25_timeseries"
+
+    process_years(
+        [1998, 1999],
+        sedac_data_dir,
+        tmp_path / "processed_data",
+        max_workers=2,
+        timeseries_dir=timeseries_dir,
+    )
+
+    assert TimeSeriesStore(str(timeseries_dir)).get_years() == [1998, 1999]